@@ -1,23 +1,22 @@
 import streamlit as st
-from openai import OpenAI
 import os
 import ui
 import time
-import asyncio
-import nest_asyncio
-import json
-import re
-from agents import Agent, Runner
-from feedback_utils import initialize_feedback_session, reset_feedback_session
+import openai
+from agents import Agent, set_default_openai_client
+from llm_client import get_async_client, run_async, create_chat_completion
+from structured_output import BMIAssessment, create_structured_agent, run_structured_agent
+from response_cache import get_response_cache, is_cacheable_question
+from feedback_utils import initialize_feedback_session, reset_feedback_session, generate_session_id
+from document_index import CorpusIndex, chunk_chars
+from record_store import get_record_store, load_chunk_texts
+from lab_results import LabTable, find_tests, format_lab_row, is_latest_result_question
 from serp_service import SerpService
-from serp_utils import initialize_serp_service, enhance_with_serp, get_latest_medical_news
+from serp_utils import initialize_serp_service, enhance_with_serp, start_serp_prefetch, get_latest_medical_news, track_news_topics
 from bayesian_integration import BayesianDoctorIntegration
 from systems_medicine import SystemsMedicineModel
 from systems_medicine_integration import SystemsMedicineIntegration
 
-# Apply nest_asyncio to allow nested event loops (required for Streamlit)
-nest_asyncio.apply()
-
 # Initialize UI
 ui.set_page_config()
 ui.load_custom_css()
@@ -25,13 +24,13 @@ ui.load_custom_css()
 # Initialize feedback session
 initialize_feedback_session()
 
-# Function to calculate BMI using Agent and Runner
+# Function to calculate BMI using a structured-output agent
 def calculate_bmi(client, height, weight, height_unit="cm", weight_unit="kg"):
     """
-    Calculate BMI and provide health assessment using Agent and Runner.
+    Calculate BMI and provide health assessment using a structured-output agent.
     
     Args:
-        client: OpenAI client instance
+        client: Shared async OpenAI client instance
         height (float): Height value
         weight (float): Weight value
         height_unit (str): Unit of height ('cm' or 'ft')
@@ -45,8 +44,8 @@ def calculate_bmi(client, height, weight, height_unit="cm", weight_unit="kg"):
             - recommendations: General health recommendations
     """
     try:
-        # Create a BMI calculation agent
-        bmi_agent = Agent(
+        # Create a BMI calculation agent with a structured response schema
+        bmi_agent = create_structured_agent(
             name="BMI Calculator",
             instructions=f"""You are a BMI calculator. Calculate the BMI for a person with:
             - Height: {height} {height_unit}
@@ -58,50 +57,18 @@ def calculate_bmi(client, height, weight, height_unit="cm", weight_unit="kg"):
             4. Provide a health assessment based on the BMI category
             5. Suggest health recommendations based on the BMI category
             
-            Format your response as a JSON object with these keys:
-            - bmi_value: The calculated BMI value (rounded to 1 decimal place)
-            - bmi_category: The BMI category
-            - health_assessment: A brief health assessment
-            - recommendations: General health recommendations
+            Fill in every field of the structured response.
             """,
-            model="o4-mini-2025-04-16"
+            output_type=BMIAssessment
         )
         
-        # Run the agent
+        # Run the agent on the shared event loop, subject to the global admission limits
         prompt = f"Calculate BMI for height: {height} {height_unit}, weight: {weight} {weight_unit}"
-        result = Runner.run_sync(bmi_agent, prompt)
-        
-        # Parse the response
-        response = result.final_output
-        
-        try:
-            # Try to parse as JSON
-            bmi_data = json.loads(response)
-            return bmi_data
-        except json.JSONDecodeError:
-            # If not valid JSON, extract information using regex
-            # Extract BMI value
-            bmi_value_match = re.search(r'bmi_value"?\s*:?\s*(\d+\.?\d*)', response)
-            bmi_value = float(bmi_value_match.group(1)) if bmi_value_match else 0.0
-            
-            # Extract BMI category
-            bmi_category_match = re.search(r'bmi_category"?\s*:?\s*"([^"]+)"', response)
-            bmi_category = bmi_category_match.group(1) if bmi_category_match else "Unknown"
-            
-            # Extract health assessment
-            health_assessment_match = re.search(r'health_assessment"?\s*:?\s*"([^"]+)"', response)
-            health_assessment = health_assessment_match.group(1) if health_assessment_match else ""
-            
-            # Extract recommendations
-            recommendations_match = re.search(r'recommendations"?\s*:?\s*"([^"]+)"', response)
-            recommendations = recommendations_match.group(1) if recommendations_match else ""
-            
-            return {
-                "bmi_value": round(bmi_value, 1),
-                "bmi_category": bmi_category,
-                "health_assessment": health_assessment,
-                "recommendations": recommendations
-            }
+        assessment = run_structured_agent(bmi_agent, prompt, st.session_state.get('llm_session_id', 'default'))
+        
+        bmi_data = assessment.model_dump()
+        bmi_data["bmi_value"] = round(bmi_data["bmi_value"], 1)
+        return bmi_data
     except Exception as e:
         # Return a default response in case of error
         return {
@@ -122,6 +89,10 @@ if 'intake_completed' not in st.session_state:
 if 'current_view' not in st.session_state:
     st.session_state.current_view = "input_data"  # Default view
 
+# Identify this session for fair queuing of LLM calls
+if 'llm_session_id' not in st.session_state:
+    st.session_state.llm_session_id = generate_session_id()
+
 # Initialize empty patient info structure
 def initialize_patient_info():
     return {
@@ -136,14 +107,16 @@ def initialize_patient_info():
 if 'patient_info' not in st.session_state:
     st.session_state.patient_info = initialize_patient_info()
 
-# Initialize OpenAI client in session state
+# Attach the process-wide async OpenAI client to the session
 if 'client' not in st.session_state:
     try:
         api_key = st.secrets["OPENAI_API_KEY"]
         if not api_key or api_key == "your-api-key-here":
             st.error("OpenAI API key not found in .streamlit/secrets.toml")
         else:
-            st.session_state.client = OpenAI(api_key=api_key)
+            st.session_state.client = get_async_client(api_key)
+            # Let the Agents SDK share the same connection pool
+            set_default_openai_client(st.session_state.client, use_for_tracing=False)
     except Exception as e:
         st.error(f"Error initializing OpenAI client: {e}")
 
@@ -155,6 +128,10 @@ if 'serp_service' not in st.session_state:
 if 'bayesian_integration' not in st.session_state:
     st.session_state.bayesian_integration = BayesianDoctorIntegration()
 
+# Initialize the table of lab results found in uploaded records
+if 'lab_table' not in st.session_state:
+    st.session_state.lab_table = LabTable()
+
 # Initialize Systems Medicine integration
 if 'systems_medicine_integration' not in st.session_state:
     st.session_state.systems_medicine_integration = SystemsMedicineIntegration(
@@ -386,7 +363,7 @@ if 'agent' not in st.session_state:
 
         ## Medical Record References
         When a user uploads medical records, you can reference information from these documents in your responses. When doing so:
-        - Cite the specific page number where information is found using [Page X] format
+        - Cite the file name and page number where information is found using [filename, Page X] format
         - Explain medical terminology in plain language
         - Connect information from the records to the user's current concerns
         - Acknowledge when information might be unclear or incomplete
@@ -565,12 +542,108 @@ def format_patient_summary():
     
     return summary
 
+# Maximum number of record pages/sections injected into the prompt for a document question
+TOP_K_RECORD_CHUNKS = 8
+
+# Maximum estimated tokens of record excerpts injected into the prompt
+RECORD_CONTEXT_TOKEN_BUDGET = 3000
+
+# Marks the temporary system message that carries record excerpts
+DOCUMENT_CONTEXT_MARKER = "Here are the most relevant pages of the user's documents"
+
+# Get the session's corpus index, adding any records uploaded since the last question
+def get_record_corpus():
+    if 'record_corpus' not in st.session_state:
+        st.session_state.record_corpus = CorpusIndex()
+    
+    corpus = st.session_state.record_corpus
+    for record in st.session_state.get('medical_records', []):
+        if record.get("index") is not None:
+            document_id = record["metadata"].get("sha256") or record["metadata"]["filename"]
+            corpus.add_document(document_id, record["metadata"]["filename"], record["index"])
+    return corpus
+
+# Select the pages across all uploaded records that are most relevant to a question
+def get_relevant_record_chunks(query, k=TOP_K_RECORD_CHUNKS, token_budget=RECORD_CONTEXT_TOKEN_BUDGET):
+    corpus = get_record_corpus()
+    if len(corpus) == 0:
+        return []
+    
+    chunks = corpus.search_within_budget(query, token_budget, k)
+    
+    # If nothing matches lexically, fall back to the opening page of each record (usually the summary)
+    if not chunks:
+        used = 0
+        for chunk in corpus.chunks:
+            if chunk["page"] != 1 or chunk["section"] != 1:
+                continue
+            tokens = chunk_chars(chunk) // 4 + 1
+            if used + tokens <= token_budget:
+                chunks.append(chunk)
+                used += tokens
+    
+    # Load the selected excerpts from the record store
+    chunks = load_chunk_texts(chunks, get_record_store())
+    
+    # Present the excerpts grouped by record, in document order
+    document_order = {document_id: i for i, document_id in enumerate(corpus.documents)}
+    return sorted(chunks, key=lambda chunk: (document_order[chunk["document_id"]], chunk["page"], chunk["section"]))
+
+# Maximum number of past results of a test included in the model's context
+MAX_LAB_HISTORY = 5
+
+# Answer "what was my last A1c?"-style questions directly from the lab table
+def answer_latest_lab_question(user_input):
+    lab_table = st.session_state.get('lab_table')
+    if not lab_table:
+        return None
+    
+    if not is_latest_result_question(user_input):
+        return None
+    tests = find_tests(user_input)
+    
+    latest_rows = [lab_table.latest(test) for test in tests]
+    if any(row is None for row in latest_rows):
+        # Let the model search the records for tests that were not parsed
+        return None
+    
+    lines = [f"- {format_lab_row(row)}" for row in latest_rows]
+    return (
+        "Here is the most recent result I found in your uploaded records:\n\n" + "\n".join(lines) +
+        "\n\nIf you would like, I can explain what this result means or how it compares with your earlier results."
+    )
+
+# Lab results from the table for the tests mentioned in a question
+def get_lab_context(user_input):
+    lab_table = st.session_state.get('lab_table')
+    if not lab_table:
+        return ""
+    
+    lines = []
+    for test in find_tests(user_input):
+        lines.extend(f"- {format_lab_row(row)}" for row in lab_table.history(test)[:MAX_LAB_HISTORY])
+    return "\n".join(lines)
+
+# Check whether the shared response cache has been enabled in secrets
+def response_cache_enabled():
+    try:
+        return bool(st.secrets.get("ENABLE_RESPONSE_CACHE", False))
+    except Exception:
+        return False
+
 # Function to call the OpenAI API
 def call_openai_api(user_input, model="o4-mini-2025-04-16"):
     try:
         if 'client' not in st.session_state or 'agent_messages' not in st.session_state:
             return "Error: OpenAI client or agent not properly initialized."
         
+        # Questions about the latest value of a lab test are a table lookup
+        lab_answer = answer_latest_lab_question(user_input)
+        if lab_answer:
+            st.session_state.agent_messages.append({"role": "user", "content": user_input})
+            st.session_state.agent_messages.append({"role": "assistant", "content": lab_answer})
+            return lab_answer
+        
         # Check if the query might be related to uploaded medical records
         document_query = False
         document_context = ""
@@ -581,21 +654,34 @@ def call_openai_api(user_input, model="o4-mini-2025-04-16"):
         
         if ('medical_records' in st.session_state and
             st.session_state.medical_records and
-            any(keyword in user_input.lower() for keyword in doc_keywords)):
+            (any(keyword in user_input.lower() for keyword in doc_keywords) or find_tests(user_input))):
             
             document_query = True
             
-            # Get the most recent medical record
-            latest_record = st.session_state.medical_records[-1]
+            # Retrieve only the pages relevant to the question, across all records, to bound the prompt size
+            relevant_chunks = get_relevant_record_chunks(user_input)
+            record_excerpt = "\n\n".join(
+                f"[{chunk['filename']}, Page {chunk['page']}]\n{chunk['text']}" for chunk in relevant_chunks
+            )
+            record_list = ", ".join(
+                f"'{record['metadata']['filename']}' ({record['metadata']['page_count']} pages)"
+                for record in st.session_state.medical_records
+            )
             
             # Add document context as a system message
             document_context = (
-                f"The user is asking about their medical record '{latest_record['metadata']['filename']}'. "
-                f"Here is the content of the document:\n\n{latest_record['text']}\n\n"
-                f"When answering, reference specific parts of the document by mentioning the page number "
-                f"where the information is found. Format as [Page X]."
+                f"The user is asking about their medical records: {record_list}. "
+                f"{DOCUMENT_CONTEXT_MARKER}:\n\n{record_excerpt}\n\n"
+                f"When answering, reference specific parts of the documents by mentioning the file name and "
+                f"page number where the information is found. Format as [filename, Page X]. If the excerpts "
+                f"do not contain the answer, say so rather than guessing about the other pages."
             )
             
+            # Include the structured lab results for any tests the question mentions
+            lab_context = get_lab_context(user_input)
+            if lab_context:
+                document_context += f"\n\nLab results extracted from the records (most recent first):\n{lab_context}"
+            
             # Add the document context as a system message
             st.session_state.agent_messages.append({
                 "role": "system",
@@ -611,22 +697,40 @@ def call_openai_api(user_input, model="o4-mini-2025-04-16"):
         # Call the API using the model specified in the agent
         model_to_use = st.session_state.agent.model if hasattr(st.session_state.agent, 'model') and st.session_state.agent.model else model
         
-        # Call the API
-        response = st.session_state.client.chat.completions.create(
-            model=model_to_use,
-            messages=st.session_state.agent_messages,
-            #temperature=0
-        )
+        # Start the SERP lookup speculatively so it runs while the model is generating
+        serp_prefetch = start_serp_prefetch(user_input)
+        
+        # General medical questions can be answered from the shared cache (opt-in)
+        use_cache = response_cache_enabled() and not document_query and is_cacheable_question(user_input)
+        assistant_response = get_response_cache().get(user_input, model_to_use) if use_cache else None
         
-        # Get the assistant's response
-        assistant_response = response.choices[0].message.content
+        if assistant_response is None:
+            # A shared answer is generated from the system prompt and the question only, so it
+            # carries no patient details from the intake form or the conversation
+            if use_cache:
+                completion_messages = [st.session_state.system_message, {"role": "user", "content": user_input}]
+            else:
+                completion_messages = list(st.session_state.agent_messages)
+            
+            # Call the API on the shared event loop
+            assistant_response = run_async(create_chat_completion(
+                st.session_state.client,
+                model_to_use,
+                completion_messages,
+                session_id=st.session_state.llm_session_id
+            ))
+            
+            if use_cache:
+                get_response_cache().put(user_input, model_to_use, assistant_response)
         
         # Enhance the response with SERP data if appropriate
-        serp_enhanced_response = enhance_with_serp(user_input, assistant_response)
+        serp_enhanced_response = enhance_with_serp(user_input, assistant_response, prefetch=serp_prefetch)
         
         # Enhance the response with Bayesian diagnostic information
         if 'bayesian_integration' in st.session_state:
             bayesian_enhanced_response = st.session_state.bayesian_integration.enhance_response(user_input, serp_enhanced_response)
+            # Keep news for the conditions under discussion prefetched in the background
+            track_news_topics(st.session_state.bayesian_integration.get_active_topics())
         else:
             bayesian_enhanced_response = serp_enhanced_response
         
@@ -648,11 +752,15 @@ def call_openai_api(user_input, model="o4-mini-2025-04-16"):
             # Find and remove the document context message
             st.session_state.agent_messages = [
                 msg for msg in st.session_state.agent_messages
-                if not (msg["role"] == "system" and "Here is the content of the document" in msg.get("content", ""))
+                if not (msg["role"] == "system" and DOCUMENT_CONTEXT_MARKER in msg.get("content", ""))
             ]
         
         return systems_medicine_enhanced_response
     
+    except openai.RateLimitError:
+        # Retries were exhausted by the admission controller
+        st.warning("The virtual doctor is handling a lot of requests right now. Please try again in a moment.")
+        return "Error: The service is busy right now. Please try again in a moment."
     except Exception as e:
         st.error(f"Error calling OpenAI API: {e}")
         return f"Error: {str(e)}"
@@ -696,6 +804,12 @@ if reset_button:
         st.session_state.medical_records = []
     if 'last_uploaded_file' in st.session_state:
         st.session_state.last_uploaded_file = None
+    if 'ingestion_jobs' in st.session_state:
+        st.session_state.ingestion_jobs = []
+    if 'record_corpus' in st.session_state:
+        st.session_state.record_corpus = CorpusIndex()
+    if 'lab_table' in st.session_state:
+        st.session_state.lab_table = LabTable()
     
     st.rerun()
 
@@ -1,5 +1,6 @@
 import streamlit as st
 from bayesian_engine import BayesianDiagnosisEngine
+from lab_results import format_lab_row, lab_findings_to_observations
 import re
 
 class BayesianDoctorIntegration:
@@ -20,7 +21,8 @@ class BayesianDoctorIntegration:
                 'observed_symptoms': {},  # Symptoms observed so far
                 'current_beliefs': self.engine.beliefs.copy(),  # Current belief state
                 'diagnosis_history': [],  # History of diagnoses
-                'suggested_questions': []  # Suggested questions to ask
+                'suggested_questions': [],  # Suggested questions to ask
+                'lab_findings': []  # Abnormal lab results from uploaded records
             }
     
     def extract_symptoms_from_text(self, text):
@@ -186,6 +188,37 @@ class BayesianDoctorIntegration:
         
         return self.engine.beliefs
     
+    def update_from_lab_results(self, lab_rows):
+        """
+        Update the Bayesian engine with abnormal findings from uploaded lab results.
+        Findings that correspond to a known symptom (e.g. blood in the urine) are added
+        as observations; all abnormal findings are kept for the diagnostic summary.
+        
+        Args:
+            lab_rows (list): Lab result rows (see lab_results.LabTable)
+        
+        Returns:
+            dict: Updated belief state
+        """
+        abnormal_rows = [row for row in lab_rows if row["flag"]]
+        st.session_state.bayesian_engine_state.setdefault('lab_findings', []).extend(
+            format_lab_row(row) for row in abnormal_rows
+        )
+        
+        # Update the Bayesian engine with each finding that maps to a symptom
+        for symptom, has_symptom in lab_findings_to_observations(abnormal_rows).items():
+            if st.session_state.bayesian_engine_state['observed_symptoms'].get(symptom) != has_symptom:
+                self.engine.update_belief(symptom, has_symptom)
+                st.session_state.bayesian_engine_state['observed_symptoms'][symptom] = has_symptom
+        
+        # Update current beliefs in session state
+        st.session_state.bayesian_engine_state['current_beliefs'] = self.engine.beliefs.copy()
+        
+        # Update suggested questions
+        st.session_state.bayesian_engine_state['suggested_questions'] = self.engine.suggest_questions(3)
+        
+        return self.engine.beliefs
+    
     def get_diagnostic_summary(self):
         """
         Get a summary of the current diagnostic state.
@@ -212,6 +245,12 @@ class BayesianDoctorIntegration:
                 status = "Present" if has_symptom else "Absent"
                 summary += f"- {symptom}: {status}\n"
         
+        # Add abnormal lab findings
+        if st.session_state.bayesian_engine_state.get('lab_findings'):
+            summary += "\n### Abnormal Lab Findings\n"
+            for finding in st.session_state.bayesian_engine_state['lab_findings']:
+                summary += f"- {finding}\n"
+        
         # Add suggested questions
         if st.session_state.bayesian_engine_state['suggested_questions']:
             summary += "\n### Suggested Follow-up Questions\n"
@@ -220,6 +259,21 @@ class BayesianDoctorIntegration:
         
         return summary
     
+    def get_active_topics(self, n=3, min_probability=0.1):
+        """
+        Get the conditions this session is currently discussing, for news prefetching.
+        
+        Args:
+            n (int, optional): Maximum number of topics. Defaults to 3.
+            min_probability (float, optional): Minimum probability of a diagnosis. Defaults to 0.1.
+        
+        Returns:
+            list: Names of the top diagnoses, or an empty list before any symptom is observed
+        """
+        if not st.session_state.bayesian_engine_state['observed_symptoms']:
+            return []
+        return [disease for disease, probability in self.engine.get_top_diagnoses(n) if probability >= min_probability]
+    
     def get_detailed_diagnosis(self, disease=None):
         """
         Get a detailed explanation of a specific diagnosis.
@@ -351,5 +405,6 @@ class BayesianDoctorIntegration:
             'observed_symptoms': {},
             'current_beliefs': self.engine.beliefs.copy(),
             'diagnosis_history': [],
-            'suggested_questions': []
+            'suggested_questions': [],
+            'lab_findings': []
         }
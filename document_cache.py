@@ -0,0 +1,158 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+# Default location and size limit of the processed document cache
+DOCUMENT_CACHE_DIR = os.path.join(".cache", "documents")
+DOCUMENT_CACHE_MAX_BYTES = 500 * 1024 * 1024
+
+# Size of the chunks read when hashing an upload
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Number of locks that serialize document processing; each digest maps to one of them
+DOCUMENT_LOCK_STRIPES = 64
+
+def hash_upload(uploaded_file):
+    """
+    Compute the SHA-256 digest of an uploaded file without reading it into memory at once.
+
+    Args:
+        uploaded_file: The uploaded file from Streamlit (any binary file-like object)
+
+    Returns:
+        str: Hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    uploaded_file.seek(0)
+    for chunk in iter(lambda: uploaded_file.read(HASH_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    uploaded_file.seek(0)
+    return digest.hexdigest()
+
+class DocumentCache:
+    """
+    Content-addressed on-disk cache of processed documents.
+    Entries are keyed by the SHA-256 of the original file, so the same PDF is processed
+    once no matter who uploads it or under which name. The cache directory is kept under
+    a size limit by evicting the least recently used entries.
+    """
+
+    def __init__(self, directory=DOCUMENT_CACHE_DIR, max_bytes=DOCUMENT_CACHE_MAX_BYTES):
+        """
+        Initialize the document cache.
+
+        Args:
+            directory (str, optional): Directory holding the cache entries
+            max_bytes (int, optional): Maximum total size of the cache on disk
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._digest_locks = [threading.Lock() for _ in range(DOCUMENT_LOCK_STRIPES)]
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, digest):
+        return os.path.join(self.directory, digest[:2], f"{digest}.json.gz")
+
+    def lock_for(self, digest):
+        """
+        Get a lock that serializes processing of one document, so concurrent uploads
+        of the same file within this process wait for a single extraction.
+        Digests share a fixed set of locks, so memory use does not grow with the
+        number of documents seen; two different documents rarely wait on each other.
+
+        Args:
+            digest (str): SHA-256 digest of the document
+
+        Returns:
+            threading.Lock: The lock for this digest
+        """
+        return self._digest_locks[int(digest[:8], 16) % len(self._digest_locks)]
+
+    def get(self, digest):
+        """
+        Load a processed document from the cache.
+
+        Args:
+            digest (str): SHA-256 digest of the document
+
+        Returns:
+            dict or None: The cached entry, or None if it is not cached
+        """
+        path = self._path(digest)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        # Record the access for least-recently-used eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def put(self, digest, entry):
+        """
+        Store a processed document in the cache and evict old entries if needed.
+
+        Args:
+            digest (str): SHA-256 digest of the document
+            entry (dict): JSON-serializable processed document
+        """
+        path = self._path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temporary file first so readers never see a partial entry
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(temp_path, "wt", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(temp_path, path)
+
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits within max_bytes."""
+        with self._lock:
+            entries = []
+            total = 0
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    if not name.endswith(".json.gz"):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+                    total += stat.st_size
+
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+
+# Shared document cache, created on first use
+_document_cache = None
+_document_cache_lock = threading.Lock()
+
+def get_document_cache():
+    """
+    Get the process-wide document cache.
+
+    Returns:
+        DocumentCache: The shared document cache
+    """
+    global _document_cache
+    with _document_cache_lock:
+        if _document_cache is None:
+            _document_cache = DocumentCache()
+        return _document_cache
@@ -0,0 +1,274 @@
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+
+# BM25 ranking parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Longest chunk (in characters) before a page is split into sections
+MAX_CHUNK_CHARS = 3000
+
+# Common words that carry no retrieval signal
+INDEX_STOP_WORDS = {
+    "the", "and", "is", "in", "it", "to", "a", "an", "of", "for", "on", "with", "as", "at",
+    "by", "be", "was", "were", "are", "this", "that", "or", "from", "my", "me", "i", "you",
+    "your", "what", "how", "when", "which", "who", "do", "does", "did", "can", "about", "tell"
+}
+
+def tokenize(text):
+    """
+    Split text into index terms.
+
+    Args:
+        text (str): The text to tokenize
+
+    Returns:
+        list: Lowercase terms with stop words removed
+    """
+    return [term for term in re.findall(r"[a-z0-9]+(?:\.[0-9]+)?", text.lower()) if term not in INDEX_STOP_WORDS]
+
+def chunk_page(page_number, text, max_chars=MAX_CHUNK_CHARS):
+    """
+    Split a page into retrieval chunks.
+    Short pages are a single chunk; long pages are split into sections at blank lines
+    (or at line breaks if a paragraph alone is too long).
+
+    Args:
+        page_number (int): 1-based page number
+        text (str): The page text
+        max_chars (int, optional): Maximum characters per chunk. Defaults to MAX_CHUNK_CHARS.
+
+    Returns:
+        list: Chunks as dicts with page, section and text
+    """
+    text = text.strip()
+    if len(text) <= max_chars:
+        return [{"page": page_number, "section": 1, "text": text}] if text else []
+
+    chunks = []
+    current = ""
+    for block in re.split(r"\n\s*\n", text):
+        pieces = [block] if len(block) <= max_chars else block.splitlines()
+        for piece in pieces:
+            # Hard split anything that is still too long (e.g. text without line breaks),
+            # after the text before it so chunks stay in page order
+            if len(piece) > max_chars and current:
+                chunks.append(current)
+                current = ""
+            while len(piece) > max_chars:
+                chunks.append(piece[:max_chars])
+                piece = piece[max_chars:]
+            if current and len(current) + len(piece) + 1 > max_chars:
+                chunks.append(current)
+                current = ""
+            current = f"{current}\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+
+    return [{"page": page_number, "section": i, "text": chunk.strip()} for i, chunk in enumerate(chunks, 1)]
+
+class BM25Index:
+    """
+    Lexical BM25 index over the page/section chunks of a medical record.
+    Used to select only the most relevant pages for a question instead of
+    sending the whole document to the model.
+    """
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self.chunks = []
+        self.postings = defaultdict(dict)  # term -> {chunk_id: term frequency}
+        self.total_length = 0
+
+    def add_chunk(self, chunk):
+        """
+        Add a chunk to the index.
+
+        Args:
+            chunk (dict): Chunk with at least page and text keys
+
+        Returns:
+            int: The chunk's id
+        """
+        chunk_id = len(self.chunks)
+        terms = Counter(tokenize(chunk["text"]))
+        for term, count in terms.items():
+            self.postings[term][chunk_id] = count
+        length = sum(terms.values())
+        self.chunks.append({**chunk, "length": length})
+        self.total_length += length
+        return chunk_id
+
+    def search(self, query, k=4):
+        """
+        Find the chunks most relevant to a query.
+
+        Args:
+            query (str): The search query
+            k (int, optional): Maximum number of chunks to return. Defaults to 4.
+
+        Returns:
+            list: Matching chunks (with a score key added), best first
+        """
+        if not self.chunks:
+            return []
+
+        n = len(self.chunks)
+        avg_length = self.total_length / n or 1
+        scores = defaultdict(float)
+
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, tf in postings.items():
+                length = self.chunks[chunk_id]["length"]
+                scores[chunk_id] += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length))
+
+        ranked = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [{**self.chunks[chunk_id], "score": score} for chunk_id, score in ranked]
+
+    def without_text(self):
+        """
+        Get a copy of the index without chunk texts, for keeping in session state
+        while the texts live in the record store. Postings are shared, not copied.
+
+        Returns:
+            BM25Index: Index whose chunks have page, section, length and chars (text size) keys
+        """
+        index = BM25Index()
+        for chunk in self.chunks:
+            compact = {key: value for key, value in chunk.items() if key != "text"}
+            compact["chars"] = chunk_chars(chunk)
+            index.chunks.append(compact)
+        index.postings = self.postings
+        index.total_length = self.total_length
+        return index
+
+    def to_dict(self):
+        """
+        Convert the index to a JSON-serializable dictionary.
+
+        Returns:
+            dict: The chunks and postings of the index
+        """
+        return {
+            "chunks": self.chunks,
+            "postings": {term: list(postings.items()) for term, postings in self.postings.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Rebuild an index from the output of to_dict.
+
+        Args:
+            data (dict): Serialized index
+
+        Returns:
+            BM25Index: The restored index
+        """
+        index = cls()
+        index.chunks = data["chunks"]
+        for term, postings in data["postings"].items():
+            index.postings[term] = {chunk_id: tf for chunk_id, tf in postings}
+        index.total_length = sum(chunk["length"] for chunk in index.chunks)
+        return index
+
+    def __len__(self):
+        return len(self.chunks)
+
+def chunk_chars(chunk):
+    """
+    Get the size of a chunk's text, whether or not the text is loaded.
+
+    Args:
+        chunk (dict): An index chunk
+
+    Returns:
+        int: Number of characters in the chunk's text
+    """
+    return len(chunk["text"]) if "text" in chunk else chunk.get("chars", 0)
+
+class CorpusIndex(BM25Index):
+    """
+    BM25 index over every medical record uploaded in a session.
+    Each record's page index is merged in when the record is added (its postings are
+    reused, so nothing is re-tokenized), and every chunk carries the record's filename
+    so results can be cited as (filename, page).
+    """
+
+    def __init__(self):
+        """Initialize an empty corpus."""
+        super().__init__()
+        self.documents = []
+
+    def add_document(self, document_id, filename, index):
+        """
+        Merge a record's page index into the corpus.
+
+        Args:
+            document_id (str): Unique identifier of the record (e.g. its content hash)
+            filename (str): The record's filename, used in citations
+            index (BM25Index): The record's page index
+
+        Returns:
+            bool: True if the record was added, False if it was already in the corpus
+        """
+        if document_id in self.documents:
+            return False
+
+        offset = len(self.chunks)
+        for chunk_id, chunk in enumerate(index.chunks):
+            self.chunks.append({**chunk, "document_id": document_id, "filename": filename, "chunk_id": chunk_id})
+        for term, postings in index.postings.items():
+            corpus_postings = self.postings[term]
+            for chunk_id, tf in postings.items():
+                corpus_postings[chunk_id + offset] = tf
+        self.total_length += index.total_length
+        self.documents.append(document_id)
+        return True
+
+    def search_within_budget(self, query, token_budget, k=8):
+        """
+        Find the most relevant chunks across all records that fit in a token budget.
+        Chunks are taken best first; a chunk that does not fit is skipped so that
+        smaller, lower-ranked chunks can still use the remaining budget. Chunks without
+        text (see BM25Index.without_text) are measured by their chars key.
+
+        Args:
+            query (str): The search query
+            token_budget (int): Maximum estimated tokens (four characters per token) of chunk text
+            k (int, optional): Maximum number of chunks to return. Defaults to 8.
+
+        Returns:
+            list: Matching chunks (with document_id, chunk_id, filename, page and score keys), best first
+        """
+        selected = []
+        used = 0
+        for chunk in self.search(query, k):
+            tokens = chunk_chars(chunk) // 4 + 1
+            if used + tokens > token_budget:
+                continue
+            selected.append(chunk)
+            used += tokens
+        return selected
+
+def build_page_index(pages):
+    """
+    Chunk a record's pages and build a BM25 index over them.
+
+    Args:
+        pages (list): Page texts in page order
+
+    Returns:
+        BM25Index: The index over all chunks
+    """
+    index = BM25Index()
+    for page_number, text in enumerate(pages, 1):
+        for chunk in chunk_page(page_number, text):
+            index.add_chunk(chunk)
+    return index
@@ -0,0 +1,142 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from document_processor import process_pdf
+from record_store import get_record_store, spill_record
+
+# Number of documents processed at the same time
+MAX_INGESTION_WORKERS = 2
+
+# Seconds a finished job is kept for a session to collect it
+JOB_RETENTION_SECONDS = 3600
+
+class IngestionQueue:
+    """
+    Process-wide queue that processes uploaded documents in background threads.
+    The Streamlit script thread submits an upload, gets a job ID back immediately and
+    polls the job's status; the processed document is collected once the job finishes.
+    The text of each processed document is moved to the record store, so jobs and
+    sessions only hold its metadata, lab results and a text-free page index.
+    """
+
+    def __init__(self, max_workers=MAX_INGESTION_WORKERS, retention=JOB_RETENTION_SECONDS, store=None):
+        """
+        Initialize the ingestion queue.
+
+        Args:
+            max_workers (int, optional): Number of worker threads. Defaults to MAX_INGESTION_WORKERS.
+            retention (int, optional): Seconds an uncollected finished job is kept. Defaults to one hour.
+            store (RecordStore, optional): Store for record text. Defaults to the shared record store.
+        """
+        self.retention = retention
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingestion")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, uploaded_file, **process_kwargs):
+        """
+        Queue an uploaded PDF for processing.
+
+        Args:
+            uploaded_file: The uploaded PDF file from Streamlit
+            **process_kwargs: Extra arguments for process_pdf
+
+        Returns:
+            str: The job ID
+        """
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "filename": getattr(uploaded_file, "name", "unknown"),
+            "status": "queued",
+            "pages_done": 0,
+            "page_count": 0,
+            "submitted": time.time(),
+            "finished": None,
+            "result": None
+        }
+
+        def progress(done, total):
+            job["pages_done"], job["page_count"] = done, total
+
+        def run():
+            job["status"] = "running"
+            try:
+                result = process_pdf(uploaded_file, progress_callback=progress, **process_kwargs)
+                if result["success"]:
+                    result = spill_record(result, self.store or get_record_store())
+            except Exception as e:
+                result = {"success": False, "error": str(e), "metadata": {"filename": job["filename"]}}
+            with self._lock:
+                job["result"] = result
+                job["status"] = "done" if result["success"] else "failed"
+                job["finished"] = time.time()
+
+        with self._lock:
+            self._prune()
+            self._jobs[job_id] = job
+        self._executor.submit(run)
+        return job_id
+
+    def _prune(self):
+        """Drop finished jobs that were never collected. Caller must hold the lock."""
+        cutoff = time.time() - self.retention
+        for job_id in [job_id for job_id, job in self._jobs.items() if job["finished"] and job["finished"] < cutoff]:
+            del self._jobs[job_id]
+
+    def status(self, job_id):
+        """
+        Get the status of a job.
+
+        Args:
+            job_id (str): The job ID
+
+        Returns:
+            dict or None: Job status (id, filename, status, pages_done, page_count), or None if unknown
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return {key: value for key, value in job.items() if key != "result"}
+
+    def pop_result(self, job_id):
+        """
+        Collect the result of a finished job and forget the job.
+
+        Args:
+            job_id (str): The job ID
+
+        Returns:
+            dict or None: The processed document without its text (see record_store.spill_record),
+                          or None if the job is unknown or still running
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["finished"] is None:
+                return None
+            del self._jobs[job_id]
+            return job["result"]
+
+    def __len__(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job["finished"] is None)
+
+# Shared ingestion queue, created on first use
+_ingestion_queue = None
+_ingestion_queue_lock = threading.Lock()
+
+def get_ingestion_queue():
+    """
+    Get the ingestion queue shared by all sessions in this process.
+
+    Returns:
+        IngestionQueue: The shared ingestion queue
+    """
+    global _ingestion_queue
+    with _ingestion_queue_lock:
+        if _ingestion_queue is None:
+            _ingestion_queue = IngestionQueue()
+        return _ingestion_queue
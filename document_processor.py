@@ -1,47 +1,282 @@
 import fitz  # PyMuPDF
-import streamlit as st
-import time
-import io
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from document_cache import get_document_cache, hash_upload
+from document_index import BM25Index, build_page_index
+from lab_results import extract_lab_results
 
-def process_pdf(uploaded_file):
+# Marker written before each page in the combined record text
+PAGE_MARKER = "\n--- Page {page} ---\n"
+
+# Size of the chunks used when copying an upload to disk
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+# Documents with at least this many pages are extracted in parallel
+PARALLEL_MIN_PAGES = 32
+
+# Maximum number of extraction worker processes
+MAX_EXTRACTION_WORKERS = 8
+
+# Shared process pool for parallel extraction, created on first use
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+def get_process_pool():
+    """
+    Get the process pool used for parallel page extraction.
+    Workers are started with the spawn method so they do not inherit the
+    server's threads, and the pool is reused across documents.
+
+    Returns:
+        ProcessPoolExecutor: The shared process pool
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            workers = min(MAX_EXTRACTION_WORKERS, os.cpu_count() or 1)
+            _process_pool = ProcessPoolExecutor(max_workers=workers,
+                                                mp_context=multiprocessing.get_context("spawn"))
+        return _process_pool
+
+def spool_upload(uploaded_file):
+    """
+    Copy an uploaded file to a temporary file in fixed-size chunks.
+    PyMuPDF can then open the document from disk and load pages lazily,
+    instead of holding a second full copy of the bytes in memory.
+
+    Args:
+        uploaded_file: The uploaded file from Streamlit (any binary file-like object)
+
+    Returns:
+        str: Path of the temporary file (the caller is responsible for removing it)
+    """
+    if hasattr(uploaded_file, "seek"):
+        uploaded_file.seek(0)
+
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as temp_file:
+        shutil.copyfileobj(uploaded_file, temp_file, SPOOL_CHUNK_SIZE)
+        return temp_file.name
+
+def extract_page_range(path, start, end):
+    """
+    Extract the text of a range of pages. Runs in a worker process, which opens
+    the document from the shared temporary file.
+
+    Args:
+        path (str): Path of the PDF file
+        start (int): Index of the first page (0-based, inclusive)
+        end (int): Index of the last page (0-based, exclusive)
+
+    Returns:
+        list: Page texts in page order
+    """
+    with fitz.open(path) as doc:
+        return [doc[i].get_text() for i in range(start, end)]
+
+def split_page_ranges(page_count, parts):
+    """
+    Split pages into contiguous, nearly equal ranges.
+
+    Args:
+        page_count (int): Number of pages
+        parts (int): Number of ranges to create
+
+    Returns:
+        list: (start, end) tuples covering every page in order
+    """
+    parts = max(1, min(parts, page_count))
+    size, remainder = divmod(page_count, parts)
+    ranges = []
+    start = 0
+    for i in range(parts):
+        end = start + size + (1 if i < remainder else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+def iter_page_texts(path, page_count, workers):
+    """
+    Yield page texts in page order, using the process pool for large documents.
+
+    Args:
+        path (str): Path of the PDF file
+        page_count (int): Number of pages in the document
+        workers (int): Number of worker processes (1 extracts in the calling thread)
+
+    Yields:
+        str: The text of each page
+    """
+    if workers <= 1 or page_count < PARALLEL_MIN_PAGES:
+        with fitz.open(path) as doc:
+            for page in doc:
+                yield page.get_text()
+        return
+
+    # Use more ranges than workers so a slow range does not hold up the others
+    ranges = split_page_ranges(page_count, workers * 2)
+    pool = get_process_pool()
+    futures = [pool.submit(extract_page_range, path, start, end) for start, end in ranges]
+    try:
+        # Merge results in page order as each range completes
+        for future in futures:
+            yield from future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+def iter_pdf_pages(path, workers=1):
+    """
+    Extract a PDF page by page.
+    Character offsets refer to the page's text within the combined record text,
+    where each page is preceded by PAGE_MARKER and followed by a newline.
+
+    Args:
+        path (str): Path of the PDF file
+        workers (int, optional): Number of worker processes for large documents. Defaults to 1.
+
+    Yields:
+        dict: Page record with page (1-based), text, start and end offsets, and page_count
     """
-    Process a PDF file using PyMuPDF to extract text.
-    
+    with fitz.open(path) as doc:
+        page_count = len(doc)
+
+    offset = 0
+    for i, text in enumerate(iter_page_texts(path, page_count, workers)):
+        start = offset + len(PAGE_MARKER.format(page=i + 1))
+        end = start + len(text)
+        offset = end + 1
+        yield {"page": i + 1, "text": text, "start": start, "end": end, "page_count": page_count}
+
+def build_record_text(pages):
+    """
+    Combine page texts into the record text, with a page marker before each page.
+
+    Args:
+        pages (list): Page texts in page order
+
+    Returns:
+        str: The combined record text
+    """
+    parts = []
+    for i, text in enumerate(pages, 1):
+        parts.append(PAGE_MARKER.format(page=i))
+        parts.append(text)
+        parts.append("\n")
+    return "".join(parts)
+
+def extract_pdf(path, progress_callback=None, workers=1):
+    """
+    Extract the pages of a PDF file on disk, build its page index and parse its lab results.
+
+    Args:
+        path (str): Path of the PDF file
+        progress_callback (callable, optional): Called as progress_callback(pages_done, page_count)
+        workers (int, optional): Number of extraction processes. Defaults to 1.
+
+    Returns:
+        dict: Processed document with page_count, pages, page_offsets, index and lab_results
+    """
+    pages = []
+    page_offsets = []
+    page_count = 0
+    for record in iter_pdf_pages(path, workers):
+        page_count = record["page_count"]
+        pages.append(record["text"])
+        page_offsets.append((record["start"], record["end"]))
+
+        if progress_callback:
+            progress_callback(record["page"], page_count)
+
+    return {
+        "page_count": page_count,
+        "pages": pages,
+        "page_offsets": page_offsets,
+        "index": build_page_index(pages),
+        "lab_results": extract_lab_results(pages)
+    }
+
+def process_pdf(uploaded_file, progress_callback=None, workers=None, use_cache=True, cache=None):
+    """
+    Process a PDF file using PyMuPDF to extract text and build a page-level retrieval index.
+    Pages are streamed from a temporary file and kept once, as page texts; the page offsets
+    locate them in the combined text that build_record_text creates when it is needed.
+    Documents of PARALLEL_MIN_PAGES pages or more are split across a process pool.
+    Processed documents are cached by the SHA-256 of their contents, so re-uploads of the
+    same file (from any session) are not extracted again.
+
     Args:
         uploaded_file: The uploaded PDF file from Streamlit
-        
+        progress_callback (callable, optional): Called as progress_callback(pages_done, page_count)
+                                                after each page is extracted
+        workers (int, optional): Number of extraction processes. Defaults to the CPU count
+                                 (capped at MAX_EXTRACTION_WORKERS); 1 disables parallel extraction.
+        use_cache (bool, optional): Whether to use the processed document cache. Defaults to True.
+        cache (DocumentCache, optional): Cache to use. Defaults to the shared document cache.
+
     Returns:
-        dict: Contains extracted text and metadata
+        dict: Contains per-page texts and offsets, the BM25 page index, lab results and metadata
     """
+    path = None
     try:
-        # Save the uploaded file to a temporary file
-        with st.spinner("Processing PDF..."):
-            # Read the file as bytes
-            file_bytes = uploaded_file.read()
-            
-            # Open the PDF with PyMuPDF
-            with fitz.open(stream=file_bytes, filetype="pdf") as doc:
-                # Get basic metadata
-                metadata = {
-                    "filename": uploaded_file.name,
-                    "page_count": len(doc)
-                }
-                
-                # Extract text with page numbers for reference
-                full_text = ""
-                for i, page in enumerate(doc):
-                    text = page.get_text()
-                    full_text += f"\n--- Page {i+1} ---\n{text}\n"
-            
-                return {
-                    "success": True,
-                    "metadata": metadata,
-                    "text": full_text
-                }
+        digest = hash_upload(uploaded_file)
+        if workers is None:
+            workers = min(MAX_EXTRACTION_WORKERS, os.cpu_count() or 1)
+
+        def extract():
+            nonlocal path
+            path = spool_upload(uploaded_file)
+            return extract_pdf(path, progress_callback, workers)
+
+        cached = False
+        if use_cache:
+            cache = cache or get_document_cache()
+            # Concurrent uploads of the same file wait for a single extraction
+            with cache.lock_for(digest):
+                entry = cache.get(digest)
+                if entry is not None:
+                    cached = True
+                    document = {**entry, "index": BM25Index.from_dict(entry["index"])}
+                    if "lab_results" not in entry:
+                        # Entry written before lab results were extracted
+                        document["lab_results"] = extract_lab_results(entry["pages"])
+                    if progress_callback and document["page_count"]:
+                        progress_callback(document["page_count"], document["page_count"])
+                else:
+                    document = extract()
+                    cache.put(digest, {**document, "index": document["index"].to_dict()})
+        else:
+            document = extract()
+
+        # Get basic metadata
+        metadata = {
+            "filename": uploaded_file.name,
+            "page_count": document["page_count"],
+            "sha256": digest,
+            "cached": cached
+        }
+
+        return {
+            "success": True,
+            "metadata": metadata,
+            "pages": document["pages"],
+            "page_offsets": [tuple(offsets) for offsets in document["page_offsets"]],
+            "index": document["index"],
+            "lab_results": document["lab_results"]
+        }
     except Exception as e:
         return {
             "success": False,
             "error": str(e),
             "metadata": {"filename": uploaded_file.name if hasattr(uploaded_file, 'name') else "unknown"},
-            "text": ""
-        }
\ No newline at end of file
+            "pages": [],
+            "page_offsets": [],
+            "index": None,
+            "lab_results": []
+        }
+    finally:
+        if path and os.path.exists(path):
+            os.remove(path)
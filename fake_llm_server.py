@@ -0,0 +1,153 @@
+"""
+Local fake OpenAI-compatible chat completions server.
+Used to exercise the LLM admission controller (rate limits, retries, queueing)
+without calling the real API.
+
+Usage:
+    python fake_llm_server.py --port 8001 --latency 0.5 --error-rate 0.1
+
+Then point an OpenAI client at http://127.0.0.1:8001/v1 with any API key.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class FakeLLMServer:
+    """
+    Minimal HTTP server that answers /v1/chat/completions requests.
+    Latency, a number of initial failures and a random error rate can be configured.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, fail_first=0,
+                 fail_status=429, error_rate=0.0, reply="This is a test response."):
+        """
+        Initialize the fake server.
+
+        Args:
+            host (str, optional): Host to bind. Defaults to "127.0.0.1".
+            port (int, optional): Port to bind. Defaults to 0 (any free port).
+            latency (float, optional): Seconds to wait before answering. Defaults to 0.0.
+            fail_first (int, optional): Number of initial requests to fail. Defaults to 0.
+            fail_status (int, optional): HTTP status used for failures. Defaults to 429.
+            error_rate (float, optional): Probability of failing any later request. Defaults to 0.0.
+            reply (str, optional): Content of every successful response.
+        """
+        self.latency = latency
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.error_rate = error_rate
+        self.reply = reply
+
+        self.request_count = 0
+        self.failure_count = 0
+        self.active_requests = 0
+        self.max_active_requests = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+
+    @property
+    def base_url(self):
+        """The base URL to pass to an OpenAI client."""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, body):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                if status == 429:
+                    self.send_header("Retry-After", "0")
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                with server._lock:
+                    server.request_count += 1
+                    request_number = server.request_count
+                    server.active_requests += 1
+                    server.max_active_requests = max(server.max_active_requests, server.active_requests)
+
+                try:
+                    if server.latency:
+                        time.sleep(server.latency)
+
+                    if not self.path.endswith("/chat/completions"):
+                        self._send_json(404, {"error": {"message": "Not found"}})
+                        return
+
+                    if request_number <= server.fail_first or random.random() < server.error_rate:
+                        with server._lock:
+                            server.failure_count += 1
+                        self._send_json(server.fail_status, {
+                            "error": {"message": "Simulated failure", "type": "fake_error"}
+                        })
+                        return
+
+                    prompt_tokens = sum(len(str(m.get("content", ""))) for m in request.get("messages", [])) // 4
+                    completion_tokens = len(server.reply) // 4
+                    self._send_json(200, {
+                        "id": f"chatcmpl-fake-{request_number}",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": request.get("model", "fake-model"),
+                        "choices": [{
+                            "index": 0,
+                            "message": {"role": "assistant", "content": server.reply},
+                            "finish_reason": "stop"
+                        }],
+                        "usage": {
+                            "prompt_tokens": prompt_tokens,
+                            "completion_tokens": completion_tokens,
+                            "total_tokens": prompt_tokens + completion_tokens
+                        }
+                    })
+                finally:
+                    with server._lock:
+                        server.active_requests -= 1
+
+        return Handler
+
+    def start(self):
+        """Start serving in a background thread."""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the server."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a fake OpenAI chat completions server")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--fail-first", type=int, default=0)
+    parser.add_argument("--fail-status", type=int, default=429)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    fake_server = FakeLLMServer(port=args.port, latency=args.latency, fail_first=args.fail_first,
+                                fail_status=args.fail_status, error_rate=args.error_rate)
+    print(f"Fake LLM server listening on {fake_server.base_url}")
+    try:
+        fake_server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        fake_server.stop()
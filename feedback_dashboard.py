@@ -1,9 +1,8 @@
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
-import seaborn as sns
 import os
-from feedback_utils import load_feedback_data, get_feedback_statistics
+from feedback_utils import load_feedback_data, get_feedback_statistics, get_feedback_models, get_recent_feedback
 
 # Set page config
 st.set_page_config(
@@ -98,15 +97,22 @@ st.markdown("""
 # Main dashboard title
 st.markdown("<div class='dashboard-title'>Virtual Doctor Feedback Dashboard</div>", unsafe_allow_html=True)
 
-# Load feedback data
-feedback_df = load_feedback_data()
+# Sidebar filters; without them the statistics come from the running aggregates
+st.sidebar.markdown("### Filters")
+date_range = st.sidebar.date_input("Date range", value=())
+selected_models = st.sidebar.multiselect("Models", get_feedback_models())
 
-if feedback_df is None or len(feedback_df) == 0:
+start_date = date_range[0].isoformat() if len(date_range) > 0 else None
+end_date = date_range[-1].isoformat() if len(date_range) > 0 else None
+
+# With filters, only the rating and comment columns of the selected days are read
+total_count, average_ratings, common_themes, rating_histogram, common_phrases = get_feedback_statistics(
+    start_date=start_date, end_date=end_date, models=selected_models
+)
+
+if total_count == 0:
     st.markdown("<div class='no-data'>No feedback data available yet. Feedback will appear here once users start providing it.</div>", unsafe_allow_html=True)
 else:
-    # Get feedback statistics
-    total_count, average_ratings, common_themes = get_feedback_statistics()
-    
     # Display key statistics
     st.markdown("<div class='dashboard-subtitle'>Key Statistics</div>", unsafe_allow_html=True)
     
@@ -125,7 +131,7 @@ else:
     
     with col3:
         # Calculate percentage of positive ratings (4 or 5 stars)
-        positive_ratings = len(feedback_df[feedback_df['overall_rating'] >= 4])
+        positive_ratings = rating_histogram[3] + rating_histogram[4]
         positive_percentage = (positive_ratings / total_count) * 100 if total_count > 0 else 0
         
         st.markdown(f"<div class='stat-value'>{positive_percentage:.1f}%</div>", unsafe_allow_html=True)
@@ -175,8 +181,8 @@ else:
         # Create a histogram for overall rating distribution
         fig, ax = plt.subplots(figsize=(10, 6))
         
-        # Create histogram
-        sns.histplot(data=feedback_df, x='overall_rating', bins=5, kde=False, ax=ax, color='#429de3')
+        # Create histogram from the aggregated rating counts
+        ax.bar([1, 2, 3, 4, 5], rating_histogram, width=0.9, color='#429de3')
         
         # Set chart properties
         ax.set_xlim(0.5, 5.5)  # Rating scale is 1-5
@@ -235,14 +241,23 @@ else:
     else:
         st.markdown("<div class='no-data'>No common themes found in feedback comments.</div>", unsafe_allow_html=True)
     
+    # Display common phrases (two or three words) from comments
+    st.markdown("<div class='dashboard-subtitle'>Common Phrases in Feedback</div>", unsafe_allow_html=True)
+    
+    if common_phrases:
+        for phrase, count in list(common_phrases.items())[:10]:
+            st.markdown(f"<div class='theme-item'>{phrase} <span class='theme-count'>{count}</span></div>", unsafe_allow_html=True)
+    else:
+        st.markdown("<div class='no-data'>No common phrases found in feedback comments.</div>", unsafe_allow_html=True)
+    
     # Display recent feedback
     st.markdown("<div class='dashboard-subtitle'>Recent Feedback</div>", unsafe_allow_html=True)
     
-    # Sort by timestamp (most recent first)
-    recent_feedback = feedback_df.sort_values(by='timestamp', ascending=False).head(5)
+    # Read only the last few submissions (most recent first) of the selected days and models
+    recent_feedback = get_recent_feedback(5, start_date=start_date, end_date=end_date, models=selected_models)
     
-    if not recent_feedback.empty:
-        for _, row in recent_feedback.iterrows():
+    if recent_feedback:
+        for row in recent_feedback:
             with st.expander(f"Feedback from {row['timestamp']} (Overall: {row['overall_rating']}/5)"):
                 st.write(f"**Helpfulness:** {row['helpfulness_rating']}/5")
                 st.write(f"**Clarity:** {row['clarity_rating']}/5")
@@ -260,13 +275,16 @@ else:
     # Add download button for the feedback data
     st.markdown("<div class='dashboard-subtitle'>Export Data</div>", unsafe_allow_html=True)
     
-    csv = feedback_df.to_csv(index=False)
-    st.download_button(
-        label="Download Feedback Data as CSV",
-        data=csv,
-        file_name="virtual_doctor_feedback.csv",
-        mime="text/csv",
-    )
+    # The feedback is only loaded when an export is requested, for the selected days and models
+    if st.button("Prepare CSV Export"):
+        feedback_df = load_feedback_data(start_date=start_date, end_date=end_date, models=selected_models)
+        csv = feedback_df.to_csv(index=False) if feedback_df is not None else ""
+        st.download_button(
+            label="Download Feedback Data as CSV",
+            data=csv,
+            file_name="virtual_doctor_feedback.csv",
+            mime="text/csv",
+        )
 
 # Footer
 st.markdown("---")
@@ -0,0 +1,226 @@
+"""
+Day-partitioned columnar copy of the feedback log for dashboard queries.
+
+Usage:
+    python feedback_partitions.py sync
+    python feedback_partitions.py compact
+"""
+
+import argparse
+import json
+import os
+import shutil
+import threading
+import uuid
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from feedback_store import FEEDBACK_FIELDS, INTEGER_FEEDBACK_FIELDS, comment_themes, get_feedback_log
+
+# Directory of the Parquet partitions, one date=YYYY-MM-DD subdirectory per day
+FEEDBACK_PARTITIONS_PATH = os.path.join("feedback", "partitions")
+
+# A day with at least this many part files is merged by compaction
+FEEDBACK_COMPACT_MIN_FILES = 2
+
+# Partition files written with another layout version are rebuilt from the log on the next sync
+FEEDBACK_PARTITIONS_VERSION = 2
+
+# Column types of the partition files: the feedback fields, and the themes of each comment
+# (from feedback_store.comment_themes) counted once when the record is copied
+FEEDBACK_SCHEMA = pa.schema([
+    (field, pa.int64() if field in INTEGER_FEEDBACK_FIELDS else pa.string()) for field in FEEDBACK_FIELDS
+] + [("comment_themes", pa.map_(pa.string(), pa.int64()))])
+
+# Hive-style date partitioning, with the date kept as a string so it compares as YYYY-MM-DD
+FEEDBACK_PARTITIONING = ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+
+# Partition of records without a timestamp; it sorts after every date, so date filters exclude it explicitly
+UNKNOWN_DATE = "unknown"
+
+def feedback_date(record):
+    """
+    Get the day partition of a feedback record.
+
+    Args:
+        record (dict): A stored feedback record
+
+    Returns:
+        str: YYYY-MM-DD from the record's timestamp, or UNKNOWN_DATE if it has none
+    """
+    day = str(record.get("timestamp", ""))[:10]
+    return day if len(day) == 10 else UNKNOWN_DATE
+
+class FeedbackPartitions:
+    """
+    Columnar copy of the feedback log, partitioned by day into Parquet files.
+    New log records are copied in batches (one part file per day and batch) from a
+    watermark, so the log stays the only write path, and the themes of each comment
+    are counted once as it is copied. Queries read only the requested
+    columns, skip whole days outside the date range and filter models using Parquet
+    statistics. Compaction merges the part files of each day into one.
+    """
+
+    def __init__(self, root=FEEDBACK_PARTITIONS_PATH, log=None):
+        """
+        Initialize the partitioned store.
+
+        Args:
+            root (str, optional): Directory of the partitions. Defaults to FEEDBACK_PARTITIONS_PATH.
+            log (FeedbackLog, optional): The log to copy from. Defaults to the shared feedback log.
+        """
+        self.root = root
+        self.log = log or get_feedback_log()
+        self.watermark_path = os.path.join(root, "_watermark.json")
+        os.makedirs(root, exist_ok=True)
+
+    def _read_watermark(self):
+        """Get the log offset copied so far, clearing partitions written with another layout version."""
+        try:
+            with open(self.watermark_path, encoding="utf-8") as f:
+                watermark = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            watermark = {}
+        if watermark.get("version", 1) == FEEDBACK_PARTITIONS_VERSION and "offset" in watermark:
+            return watermark["offset"]
+
+        for entry in os.listdir(self.root):
+            if entry.startswith("date="):
+                shutil.rmtree(os.path.join(self.root, entry))
+        return 0
+
+    def _write_table(self, day, table):
+        """Write a part file for a day; it only becomes visible to readers once complete."""
+        directory = os.path.join(self.root, f"date={day}")
+        os.makedirs(directory, exist_ok=True)
+        name = f"part-{uuid.uuid4().hex}.parquet"
+        temporary_path = os.path.join(directory, f".{name}.tmp")
+        # Sorting by model keeps each model's rows together, so row group statistics can skip the others
+        pq.write_table(table.sort_by([("model_used", "ascending"), ("timestamp", "ascending")]), temporary_path)
+        os.replace(temporary_path, os.path.join(directory, name))
+
+    def sync(self):
+        """
+        Copy log records appended since the last sync into the day partitions.
+
+        Returns:
+            int: Number of records copied
+        """
+        with self.log.locked():
+            records, offset = self.log.read_from(self._read_watermark())
+            by_day = {}
+            for record in records:
+                row = {field: record.get(field, 0 if field in INTEGER_FEEDBACK_FIELDS else "") for field in FEEDBACK_FIELDS}
+                row["comment_themes"] = dict(comment_themes(row["comments"]))
+                by_day.setdefault(feedback_date(record), []).append(row)
+            for day, rows in by_day.items():
+                self._write_table(day, pa.Table.from_pylist(rows, schema=FEEDBACK_SCHEMA))
+
+            temporary_path = self.watermark_path + ".tmp"
+            with open(temporary_path, "w", encoding="utf-8") as f:
+                json.dump({"offset": offset, "version": FEEDBACK_PARTITIONS_VERSION}, f)
+            os.replace(temporary_path, self.watermark_path)
+        return len(records)
+
+    def query(self, columns=None, start_date=None, end_date=None, models=None):
+        """
+        Read feedback from the partitions.
+
+        Args:
+            columns (list, optional): Columns to read, from the feedback fields and comment_themes.
+                                      Defaults to all feedback fields.
+            start_date (str, optional): First day to include (YYYY-MM-DD)
+            end_date (str, optional): Last day to include (YYYY-MM-DD)
+            models (list, optional): Only include feedback for these models
+
+        Returns:
+            pyarrow.Table: The matching rows with the requested columns. Records without a
+                           timestamp are only included when no date range is given.
+        """
+        columns = list(columns or FEEDBACK_FIELDS)
+        dataset = ds.dataset(self.root, format="parquet", schema=FEEDBACK_SCHEMA.append(pa.field("date", pa.string())),
+                             partitioning=FEEDBACK_PARTITIONING)
+
+        condition = None
+        for predicate in (
+            ds.field("date") != UNKNOWN_DATE if start_date or end_date else None,
+            ds.field("date") >= start_date if start_date else None,
+            ds.field("date") <= end_date if end_date else None,
+            ds.field("model_used").isin(list(models)) if models else None
+        ):
+            if predicate is not None:
+                condition = predicate if condition is None else condition & predicate
+        return dataset.to_table(columns=columns, filter=condition)
+
+    def recent(self, n=5, start_date=None, end_date=None, models=None):
+        """
+        Read the most recent feedback records of the selected days and models.
+
+        Args:
+            n (int, optional): Number of records. Defaults to 5.
+            start_date (str, optional): First day to include (YYYY-MM-DD)
+            end_date (str, optional): Last day to include (YYYY-MM-DD)
+            models (list, optional): Only include feedback for these models
+
+        Returns:
+            list: Up to n records, most recent first; records without a timestamp come last
+        """
+        table = self.query(start_date=start_date, end_date=end_date, models=models)
+        order = pc.sort_indices(table, sort_keys=[("timestamp", "descending")])
+        return table.take(order[:max(n, 0)]).to_pylist()
+
+    def compact(self, min_files=FEEDBACK_COMPACT_MIN_FILES):
+        """
+        Merge the part files of each day that has at least min_files of them.
+
+        Args:
+            min_files (int, optional): Number of part files that triggers a merge.
+                                       Defaults to FEEDBACK_COMPACT_MIN_FILES.
+
+        Returns:
+            int: Number of days compacted
+        """
+        compacted = 0
+        with self.log.locked():
+            for entry in sorted(os.listdir(self.root)):
+                directory = os.path.join(self.root, entry)
+                if not entry.startswith("date=") or not os.path.isdir(directory):
+                    continue
+                parts = sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                               if name.startswith("part-") and name.endswith(".parquet"))
+                if len(parts) < min_files:
+                    continue
+                table = pa.concat_tables([pq.read_table(part, schema=FEEDBACK_SCHEMA) for part in parts])
+                self._write_table(entry[len("date="):], table)
+                for part in parts:
+                    os.remove(part)
+                compacted += 1
+        return compacted
+
+# Shared partitioned store, created on first use
+_feedback_partitions = None
+_feedback_partitions_lock = threading.Lock()
+
+def get_feedback_partitions():
+    """
+    Get the partitioned feedback store shared by all sessions in this process.
+
+    Returns:
+        FeedbackPartitions: The shared partitioned store
+    """
+    global _feedback_partitions
+    with _feedback_partitions_lock:
+        if _feedback_partitions is None:
+            _feedback_partitions = FeedbackPartitions()
+        return _feedback_partitions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the day-partitioned feedback store")
+    parser.add_argument("command", choices=["sync", "compact"], help="Copy new feedback, or sync then merge small partitions")
+    args = parser.parse_args()
+
+    partitions = get_feedback_partitions()
+    print(f"Copied {partitions.sync()} new feedback records")
+    if args.command == "compact":
+        print(f"Compacted {partitions.compact()} days")
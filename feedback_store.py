@@ -0,0 +1,370 @@
+import csv
+import json
+import os
+import re
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Append-only feedback log, one JSON record per line
+FEEDBACK_LOG_PATH = os.path.join("feedback", "user_feedback.jsonl")
+
+# Feedback file used before the log; migrated into the log on first use
+LEGACY_FEEDBACK_CSV = os.path.join("feedback", "user_feedback.csv")
+
+# Feedback fields, in the order of the legacy CSV columns
+FEEDBACK_FIELDS = [
+    "overall_rating", "helpfulness_rating", "clarity_rating", "empathy_rating", "accuracy_rating",
+    "comments", "session_id", "timestamp", "conversation_length", "model_used"
+]
+
+# Rating dimensions, each rated 1-5 (0 if not rated)
+RATING_FIELDS = ["overall_rating", "helpfulness_rating", "clarity_rating", "empathy_rating", "accuracy_rating"]
+
+# Fields stored as integers
+INTEGER_FEEDBACK_FIELDS = set(RATING_FIELDS) | {"conversation_length"}
+
+# Common words left out of comment themes
+THEME_STOP_WORDS = {
+    'the', 'and', 'is', 'in', 'it', 'to', 'i', 'a', 'was', 'that', 'this',
+    'of', 'for', 'my', 'with', 'me', 'you', 'very', 'are', 'on', 'your',
+    'be', 'have', 'not', 'but', 'had', 'has', 'would', 'could', 'should'
+}
+
+# Numbers of consecutive theme words counted as phrase themes (bigrams and trigrams)
+THEME_PHRASE_LENGTHS = (2, 3)
+
+@contextmanager
+def file_lock(path):
+    """
+    Hold an exclusive lock on a lock file, shared by all processes using the same path.
+
+    Args:
+        path (str): Path of the lock file (created if missing)
+    """
+    with open(path, "a+") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+def normalize_feedback(record):
+    """
+    Bring a feedback record into the stored form.
+
+    Args:
+        record (dict): Feedback as submitted or read from the legacy CSV
+
+    Returns:
+        dict: The known feedback fields in order, with ratings and lengths as integers
+    """
+    normalized = {}
+    for field in FEEDBACK_FIELDS:
+        value = record.get(field)
+        if field in INTEGER_FEEDBACK_FIELDS:
+            try:
+                value = int(float(value))
+            except (TypeError, ValueError):
+                value = 0
+        else:
+            value = "" if value is None else str(value)
+        normalized[field] = value
+    return normalized
+
+def comment_words(comment):
+    """
+    Split a feedback comment into theme words.
+
+    Args:
+        comment (str): The comment
+
+    Returns:
+        list: Lowercase words longer than two characters, without punctuation or stop words
+    """
+    words = re.sub(r'[^\w\s]', ' ', str(comment).lower()).split()
+    return [word for word in words if word not in THEME_STOP_WORDS and len(word) > 2]
+
+def comment_themes(comment):
+    """
+    Count the themes of a feedback comment: its theme words, and the phrases of
+    THEME_PHRASE_LENGTHS consecutive theme words.
+
+    Args:
+        comment (str): The comment
+
+    Returns:
+        Counter: Theme -> count, with the words of a phrase joined by spaces
+    """
+    words = comment_words(comment)
+    themes = Counter(words)
+    for length in THEME_PHRASE_LENGTHS:
+        themes.update(" ".join(words[i:i + length]) for i in range(len(words) - length + 1))
+    return themes
+
+def empty_aggregates():
+    """
+    Create the running aggregates of an empty feedback log.
+
+    Returns:
+        dict: Zero count, rating sums and histograms, no themes or phrases, and a log offset of 0
+    """
+    return {
+        "count": 0,
+        "sums": {field: 0 for field in RATING_FIELDS},
+        "histograms": {field: [0] * 6 for field in RATING_FIELDS},
+        "themes": {},
+        "phrases": {},
+        "offset": 0
+    }
+
+def add_to_aggregates(aggregates, record):
+    """
+    Add one feedback record to running aggregates.
+
+    Args:
+        aggregates (dict): Aggregates from empty_aggregates, updated in place
+        record (dict): A stored feedback record
+    """
+    aggregates["count"] += 1
+    for field in RATING_FIELDS:
+        rating = int(record.get(field) or 0)
+        aggregates["sums"][field] += rating
+        aggregates["histograms"][field][min(max(rating, 0), 5)] += 1
+    for theme, count in comment_themes(record.get("comments", "")).items():
+        counts = aggregates["phrases"] if " " in theme else aggregates["themes"]
+        counts[theme] = counts.get(theme, 0) + count
+
+class FeedbackLog:
+    """
+    Append-only JSONL log of feedback submissions.
+    Every append writes one complete line while holding an exclusive file lock, so
+    concurrent submissions from any number of sessions or processes never interleave.
+    Running aggregates (counts, rating sums and histograms, theme word and phrase counts) are
+    updated under the same lock and persisted next to the log, so statistics are read
+    without scanning the log. The aggregates record the log offset they cover, and
+    any records appended without updating them are folded in on the next access.
+    """
+
+    def __init__(self, path=FEEDBACK_LOG_PATH):
+        """
+        Initialize the feedback log.
+
+        Args:
+            path (str, optional): Path of the JSONL log. Defaults to FEEDBACK_LOG_PATH.
+        """
+        self.path = path
+        self.lock_path = path + ".lock"
+        self.aggregates_path = os.path.splitext(path)[0] + "_stats.json"
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @contextmanager
+    def locked(self):
+        """Hold the log's lock across threads and processes."""
+        with self._lock, file_lock(self.lock_path):
+            yield
+
+    def append(self, record):
+        """
+        Append a feedback record.
+
+        Args:
+            record (dict): The feedback to store
+
+        Returns:
+            dict: The record as stored
+        """
+        record = normalize_feedback(record)
+        with self.locked():
+            self._write([record])
+            self._update_aggregates()
+        return record
+
+    def _write(self, records):
+        # Caller must hold the lock
+        data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        with open(self.path, "ab") as f:
+            # Start on a new line if a crashed writer left a partial one
+            if f.tell() > 0:
+                with open(self.path, "rb") as tail:
+                    tail.seek(-1, os.SEEK_END)
+                    if tail.read(1) != b"\n":
+                        data = "\n" + data
+            f.write(data.encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _update_aggregates(self):
+        """Fold records appended since the aggregates were saved into them. Caller must hold the lock."""
+        try:
+            with open(self.aggregates_path, encoding="utf-8") as f:
+                aggregates = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            aggregates = empty_aggregates()
+
+        if not os.path.exists(self.path):
+            return aggregates
+        size = os.path.getsize(self.path)
+        if size < aggregates["offset"] or set(aggregates) != set(empty_aggregates()):
+            # The log was replaced, or the aggregates were saved by an older version; start over
+            aggregates = empty_aggregates()
+        if size == aggregates["offset"] and os.path.exists(self.aggregates_path):
+            return aggregates
+
+        records, aggregates["offset"] = self.read_from(aggregates["offset"])
+        for record in records:
+            add_to_aggregates(aggregates, record)
+
+        temporary_path = self.aggregates_path + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            json.dump(aggregates, f)
+        os.replace(temporary_path, self.aggregates_path)
+        return aggregates
+
+    def aggregates(self):
+        """
+        Get the running aggregates of all feedback in the log.
+
+        Returns:
+            dict: count, sums and histograms (per rating field, index = rating 0-5),
+                  themes (word -> count), phrases (phrase -> count) and offset (log bytes covered)
+        """
+        with self.locked():
+            return self._update_aggregates()
+
+    def read(self):
+        """
+        Read all feedback records.
+
+        Returns:
+            list: Records in submission order. A partial last line left by a crashed writer is skipped.
+        """
+        if not os.path.exists(self.path):
+            return []
+        records = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        return records
+
+    def read_from(self, offset):
+        """
+        Read the complete records appended after a byte offset of the log.
+
+        Args:
+            offset (int): Byte offset returned by a previous call (0 for the whole log)
+
+        Returns:
+            tuple: (records, offset after the last complete line read)
+        """
+        records = []
+        if not os.path.exists(self.path):
+            return records, offset
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        return records, offset
+
+    def recent(self, n=5):
+        """
+        Read the most recent feedback records without reading the whole log.
+
+        Args:
+            n (int, optional): Number of records. Defaults to 5.
+
+        Returns:
+            list: Up to n records, most recent first
+        """
+        if n <= 0 or not os.path.exists(self.path):
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            data = b""
+            # Read backwards until the block holds n complete lines
+            while position > 0 and data.count(b"\n") <= n:
+                step = min(64 * 1024, position)
+                position -= step
+                f.seek(position)
+                data = f.read(step) + data
+
+        lines = data.split(b"\n")
+        if position > 0:
+            lines = lines[1:]  # The first line may be cut off
+        records = []
+        for line in reversed(lines):
+            if len(records) >= n:
+                break
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        return records
+
+    def migrate_csv(self, csv_path=LEGACY_FEEDBACK_CSV):
+        """
+        Move the records of a legacy feedback CSV into the log.
+        The CSV is renamed with a .migrated suffix afterwards, so it is imported only once.
+
+        Args:
+            csv_path (str, optional): Path of the legacy CSV. Defaults to LEGACY_FEEDBACK_CSV.
+
+        Returns:
+            int: Number of records migrated
+        """
+        with self.locked():
+            if not os.path.exists(csv_path):
+                return 0
+            with open(csv_path, newline="", encoding="utf-8") as f:
+                records = [normalize_feedback(row) for row in csv.DictReader(f)]
+            if records:
+                self._write(records)
+            os.replace(csv_path, csv_path + ".migrated")
+            self._update_aggregates()
+        return len(records)
+
+# Shared feedback log, created on first use
+_feedback_log = None
+_feedback_log_lock = threading.Lock()
+
+def get_feedback_log():
+    """
+    Get the feedback log shared by all sessions in this process.
+    Feedback from the legacy CSV is migrated into the log the first time.
+
+    Returns:
+        FeedbackLog: The shared feedback log
+    """
+    global _feedback_log
+    with _feedback_log_lock:
+        if _feedback_log is None:
+            _feedback_log = FeedbackLog()
+            _feedback_log.migrate_csv()
+        return _feedback_log
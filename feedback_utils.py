@@ -1,20 +1,18 @@
-import pandas as pd
-import os
 import datetime
 import uuid
 import streamlit as st
 from collections import Counter
-import re
+from feedback_store import RATING_FIELDS, comment_themes, get_feedback_log
 
 # Function to generate a unique session ID
 def generate_session_id():
     """Generate a unique session ID for tracking feedback"""
     return str(uuid.uuid4())
 
-# Function to save feedback to CSV file
+# Function to save feedback to the feedback log
 def save_feedback(feedback_data):
     """
-    Save feedback data to a CSV file
+    Append feedback data to the feedback log
     
     Args:
         feedback_data (dict): Dictionary containing feedback information
@@ -23,27 +21,12 @@ def save_feedback(feedback_data):
         bool: True if successful, False otherwise
     """
     try:
-        # Create feedback directory if it doesn't exist
-        os.makedirs('feedback', exist_ok=True)
-        
-        # Path to feedback CSV file
-        feedback_file = 'feedback/user_feedback.csv'
-        
         # Add timestamp if not already present
         if not feedback_data.get('timestamp'):
             feedback_data['timestamp'] = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
-        # Create DataFrame from feedback data
-        df = pd.DataFrame([feedback_data])
-        
-        # Check if file exists
-        if os.path.exists(feedback_file):
-            # Append to existing file
-            df.to_csv(feedback_file, mode='a', header=False, index=False)
-        else:
-            # Create new file with header
-            df.to_csv(feedback_file, index=False)
-            
+        # One locked line append; safe with concurrent sessions and processes
+        get_feedback_log().append(feedback_data)
         return True
     
     except Exception as e:
@@ -51,18 +34,29 @@ def save_feedback(feedback_data):
         return False
 
 # Function to load feedback data
-def load_feedback_data():
+def load_feedback_data(columns=None, start_date=None, end_date=None, models=None):
     """
-    Load feedback data from CSV file
+    Load feedback data from the day-partitioned columnar store
+    
+    Args:
+        columns (list, optional): Columns to load. Defaults to all feedback fields.
+        start_date (str, optional): First day to include (YYYY-MM-DD)
+        end_date (str, optional): Last day to include (YYYY-MM-DD)
+        models (list, optional): Only include feedback for these models
     
     Returns:
-        pandas.DataFrame: DataFrame containing feedback data or None if file doesn't exist
+        pandas.DataFrame: DataFrame containing feedback data or None if no feedback matches
     """
     try:
-        feedback_file = 'feedback/user_feedback.csv'
+        # Imported here so saving feedback does not load pyarrow and pandas
+        from feedback_partitions import get_feedback_partitions
+        
+        partitions = get_feedback_partitions()
+        partitions.sync()
+        table = partitions.query(columns, start_date, end_date, models)
         
-        if os.path.exists(feedback_file):
-            return pd.read_csv(feedback_file)
+        if table.num_rows > 0:
+            return table.to_pandas()
         else:
             return None
     
@@ -99,64 +93,130 @@ def calculate_average_ratings(feedback_df):
     }
 
 # Function to extract common themes from comments
-def extract_common_themes(feedback_df, min_count=2):
+def extract_common_themes(feedback_df, min_count=2, phrases=False):
     """
-    Extract common words/themes from feedback comments
+    Extract common words/themes from feedback comments.
+    The themes counted per comment when it was stored (the comment_themes column) are
+    merged; comments without them are counted here.
     
     Args:
         feedback_df (pandas.DataFrame): DataFrame containing feedback data
         min_count (int): Minimum count to include a word in results
+        phrases (bool): Return common phrases of two or three words instead of single words
     
     Returns:
-        dict: Dictionary of common words and their counts
+        dict: Dictionary of common words (or phrases) and their counts
     """
-    if feedback_df is None or len(feedback_df) == 0 or 'comments' not in feedback_df.columns:
+    if feedback_df is None or len(feedback_df) == 0:
+        return {}
+    if 'comment_themes' in feedback_df.columns:
+        stored_themes = feedback_df['comment_themes']
+    elif 'comments' in feedback_df.columns:
+        stored_themes = [None] * len(feedback_df)
+    else:
         return {}
+    comments = feedback_df['comments'] if 'comments' in feedback_df.columns else [''] * len(feedback_df)
     
-    # Combine all comments
-    all_comments = ' '.join(feedback_df['comments'].fillna('').astype(str))
+    # Merge the theme counts of each comment
+    theme_counts = Counter()
+    for themes, comment in zip(stored_themes, comments):
+        if themes is None:
+            themes = comment_themes(comment if isinstance(comment, str) else '')
+        theme_counts.update(dict(themes))
     
-    # Convert to lowercase and remove punctuation
-    all_comments = all_comments.lower()
-    all_comments = re.sub(r'[^\w\s]', ' ', all_comments)
+    # Keep words or phrases, filtered by minimum count
+    common_themes = {theme: count for theme, count in theme_counts.items()
+                     if count >= min_count and (' ' in theme) == phrases}
     
-    # Split into words
-    words = all_comments.split()
+    # Sort by frequency (descending)
+    return dict(sorted(common_themes.items(), key=lambda x: x[1], reverse=True))
+
+# Function to get feedback statistics
+def get_feedback_statistics(min_count=2, start_date=None, end_date=None, models=None):
+    """
+    Get statistics for all feedback from the running aggregates kept with the feedback log,
+    whose cost does not depend on the number of submissions. With a date range or model
+    filter, only the rating and comment theme columns of the matching days are read.
     
-    # Remove common stop words
-    stop_words = {'the', 'and', 'is', 'in', 'it', 'to', 'i', 'a', 'was', 'that', 'this', 
-                 'of', 'for', 'my', 'with', 'me', 'you', 'very', 'are', 'on', 'your',
-                 'be', 'have', 'not', 'but', 'had', 'has', 'would', 'could', 'should'}
+    Args:
+        min_count (int): Minimum count to include a word in the common themes
+        start_date (str, optional): First day to include (YYYY-MM-DD)
+        end_date (str, optional): Last day to include (YYYY-MM-DD)
+        models (list, optional): Only include feedback for these models
     
-    filtered_words = [word for word in words if word not in stop_words and len(word) > 2]
+    Returns:
+        tuple: (total_count, average_ratings, common_themes, rating_histogram, common_phrases),
+               where rating_histogram counts overall ratings 1-5
+    """
+    if start_date or end_date or models:
+        feedback_df = load_feedback_data(RATING_FIELDS + ['comment_themes'], start_date, end_date, models)
+        if feedback_df is None:
+            return 0, calculate_average_ratings(None), {}, [0] * 5, {}
+        rating_counts = feedback_df['overall_rating'].value_counts()
+        rating_histogram = [int(rating_counts.get(rating, 0)) for rating in range(1, 6)]
+        return (len(feedback_df), calculate_average_ratings(feedback_df),
+                extract_common_themes(feedback_df, min_count), rating_histogram,
+                extract_common_themes(feedback_df, min_count, phrases=True))
     
-    # Count word frequencies
-    word_counts = Counter(filtered_words)
+    aggregates = get_feedback_log().aggregates()
+    total_count = aggregates['count']
     
-    # Filter by minimum count
-    common_themes = {word: count for word, count in word_counts.items() if count >= min_count}
+    if total_count == 0:
+        return 0, calculate_average_ratings(None), {}, [0] * 5, {}
     
-    # Sort by frequency (descending)
-    return dict(sorted(common_themes.items(), key=lambda x: x[1], reverse=True))
+    average_ratings = {
+        field.replace('_rating', ''): aggregates['sums'][field] / total_count
+        for field in aggregates['sums']
+    }
+    common_themes = {word: count for word, count in aggregates['themes'].items() if count >= min_count}
+    common_themes = dict(sorted(common_themes.items(), key=lambda x: x[1], reverse=True))
+    common_phrases = {phrase: count for phrase, count in aggregates['phrases'].items() if count >= min_count}
+    common_phrases = dict(sorted(common_phrases.items(), key=lambda x: x[1], reverse=True))
+    rating_histogram = aggregates['histograms']['overall_rating'][1:]
+    
+    return total_count, average_ratings, common_themes, rating_histogram, common_phrases
 
-# Function to get feedback statistics
-def get_feedback_statistics():
+# Function to get the models feedback was given for
+def get_feedback_models():
     """
-    Get statistics from feedback data
+    Get the models that have received feedback
     
     Returns:
-        tuple: (total_count, average_ratings, common_themes)
+        list: Model names, sorted
     """
-    feedback_df = load_feedback_data()
-    
+    feedback_df = load_feedback_data(['model_used'])
     if feedback_df is None:
-        return 0, calculate_average_ratings(None), {}
+        return []
+    return sorted(model for model in feedback_df['model_used'].unique() if model)
+
+# Function to get the most recent feedback
+def get_recent_feedback(n=5, start_date=None, end_date=None, models=None):
+    """
+    Get the most recent feedback submissions
     
-    total_count = len(feedback_df)
-    average_ratings = calculate_average_ratings(feedback_df)
-    common_themes = extract_common_themes(feedback_df)
+    Args:
+        n (int): Number of submissions to return
+        start_date (str, optional): First day to include (YYYY-MM-DD)
+        end_date (str, optional): Last day to include (YYYY-MM-DD)
+        models (list, optional): Only include feedback for these models
+    
+    Returns:
+        list: Feedback records, most recent first
+    """
+    if not (start_date or end_date or models):
+        # Unfiltered: read only the tail of the log
+        return get_feedback_log().recent(n)
     
-    return total_count, average_ratings, common_themes
+    try:
+        from feedback_partitions import get_feedback_partitions
+        
+        partitions = get_feedback_partitions()
+        partitions.sync()
+        return partitions.recent(n, start_date, end_date, models)
+    
+    except Exception as e:
+        st.error(f"Error loading recent feedback: {e}")
+        return []
 
 # Function to initialize feedback session
 def initialize_feedback_session():
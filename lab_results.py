@@ -0,0 +1,451 @@
+import datetime
+import math
+import re
+from array import array
+from collections import defaultdict
+
+# Known lab tests: canonical name -> aliases used in reports, usual unit and default reference range.
+# The default range is only used when the report line does not print its own range; tests
+# reported in more than one unit give a default range per unit.
+LAB_TESTS = {
+    "Hemoglobin A1c": {"aliases": ["hemoglobin a1c", "hgb a1c", "hba1c", "a1c", "glycated hemoglobin", "glycohemoglobin"],
+                       "unit": "%", "range": (4.0, 5.6)},
+    "Glucose": {"aliases": ["fasting glucose", "glucose, fasting", "glucose", "blood sugar"],
+                "unit": "mg/dL", "range": (70, 99)},
+    "Total Cholesterol": {"aliases": ["total cholesterol", "cholesterol, total", "cholesterol"],
+                          "unit": "mg/dL", "range": (None, 200)},
+    "LDL Cholesterol": {"aliases": ["ldl cholesterol", "ldl-c", "ldl"], "unit": "mg/dL", "range": (None, 100)},
+    "HDL Cholesterol": {"aliases": ["hdl cholesterol", "hdl-c", "hdl"], "unit": "mg/dL", "range": (40, None)},
+    "Triglycerides": {"aliases": ["triglycerides"], "unit": "mg/dL", "range": (None, 150)},
+    "Hemoglobin": {"aliases": ["hemoglobin", "hgb"], "unit": "g/dL", "range": (12.0, 17.5)},
+    "White Blood Cells": {"aliases": ["white blood cell count", "white blood cells", "wbc"],
+                          "unit": "10^3/uL", "range": (4.5, 11.0)},
+    "Platelets": {"aliases": ["platelet count", "platelets"], "unit": "10^3/uL", "range": (150, 450)},
+    "Creatinine": {"aliases": ["creatinine"], "unit": "mg/dL", "range": (0.6, 1.3)},
+    "eGFR": {"aliases": ["egfr", "estimated gfr"], "unit": "mL/min/1.73m2", "range": (60, None)},
+    "Sodium": {"aliases": ["sodium"], "unit": "mmol/L", "range": (135, 145)},
+    "Potassium": {"aliases": ["potassium"], "unit": "mmol/L", "range": (3.5, 5.1)},
+    "TSH": {"aliases": ["tsh", "thyroid stimulating hormone"], "unit": "mIU/L", "range": (0.4, 4.0)},
+    "ALT": {"aliases": ["alt", "sgpt", "alanine aminotransferase"], "unit": "U/L", "range": (7, 56)},
+    "AST": {"aliases": ["ast", "sgot", "aspartate aminotransferase"], "unit": "U/L", "range": (10, 40)},
+    "Vitamin D": {"aliases": ["vitamin d, 25-hydroxy", "25-hydroxy vitamin d", "vitamin d"],
+                  "unit": "ng/mL", "range": (30, 100)},
+    "Ferritin": {"aliases": ["ferritin"], "unit": "ng/mL", "range": (20, 300)},
+    "C-Reactive Protein": {"aliases": ["c-reactive protein", "crp"], "unit": "mg/L", "range": (None, 10)},
+    "Oxygen Saturation": {"aliases": ["oxygen saturation", "spo2", "o2 sat"], "unit": "%", "range": (95, 100)},
+    "Body Temperature": {"aliases": ["body temperature", "temperature"], "unit": "", "range": (None, None),
+                         "unit_ranges": {"°F": (97.0, 99.5), "°C": (36.1, 37.5)}},
+    "Urine Blood": {"aliases": ["urine blood", "blood, urine", "occult blood"], "unit": "", "range": (None, None)},
+    "Urine Red Blood Cells": {"aliases": ["urine rbc", "rbc, urine"], "unit": "/hpf", "range": (None, 2)},
+}
+
+# Abnormal lab findings that correspond to symptoms known to the Bayesian engine
+LAB_FINDING_SYMPTOMS = {
+    ("Urine Blood", "abnormal"): "Blood in Urine",
+    ("Urine Red Blood Cells", "high"): "Blood in Urine",
+    ("Oxygen Saturation", "low"): "Shortness of Breath",
+    ("Body Temperature", "high"): "Fever",
+}
+
+# Columns of the lab results table
+LAB_COLUMNS = ("test", "result", "value", "unit", "low", "high", "flag", "date", "filename", "page")
+
+# Qualitative results that count as abnormal
+POSITIVE_RESULTS = {"positive", "detected", "present", "trace", "reactive"}
+
+# Alias -> canonical test name, matched longest first so "hemoglobin a1c" wins over "hemoglobin"
+_ALIASES = {alias: test for test, info in LAB_TESTS.items() for alias in info["aliases"]}
+_ALIAS_PATTERN = "|".join(re.escape(alias) for alias in sorted(_ALIASES, key=len, reverse=True))
+_KNOWN_TEST_LINE = re.compile(rf"^\s*(?:[-*•]\s*)?(?P<alias>{_ALIAS_PATTERN})\b", re.IGNORECASE)
+_TEST_MENTION = re.compile(rf"\b(?:{_ALIAS_PATTERN})\b", re.IGNORECASE)
+
+# Questions asking to look up the latest value of a test: "latest/last <test>" or "what was my last ..."
+_LATEST_WORDS = r"(?:last|latest|most\s+recent|current)"
+_LATEST_RESULT_QUESTION = re.compile(
+    rf"\b{_LATEST_WORDS}\s+(?:(?:my|lab|blood|test)\s+)*(?:result\s+(?:for|of)\s+)?(?:my\s+)?(?:{_ALIAS_PATTERN})\b"
+    rf"|\bwhat\s+(?:was|is|were|are)\s+my\s+{_LATEST_WORDS}\b",
+    re.IGNORECASE
+)
+
+_NUMBER = r"\d+(?:\.\d+)?"
+_VALUE = re.compile(rf"^[\s:=.\-]*(?P<value>[<>]?\s*{_NUMBER}|not detected|{'|'.join(POSITIVE_RESULTS)}|negative|normal)\b",
+                    re.IGNORECASE)
+_UNIT = re.compile(r"^\s*(?P<unit>%|[^\s\d()<>][^\s()<>]*|10\^\d+/[A-Za-z]+)")
+_FLAG = re.compile(r"(?:^|\s)(?P<flag>HH|LL|H|L|HIGH|LOW|ABNORMAL|A|\*)(?=\s|$)")
+_RANGE = re.compile(rf"(?P<low>{_NUMBER})\s*(?:-|–|to)\s*(?P<high>{_NUMBER})")
+_BOUND = re.compile(rf"(?P<op><=?|>=?|≤|≥)\s*(?P<bound>{_NUMBER})")
+
+# Lines with an unknown test name are only accepted if they print a value, unit and range
+_GENERIC_LINE = re.compile(
+    rf"^\s*(?P<name>[A-Za-z][A-Za-z0-9 ,/()\-]{{1,40}}?)\s*:?\s+(?P<value>{_NUMBER})\s*(?:(?P<flag>H|L)\s+)?"
+    rf"(?P<unit>[^\s\d()][^\s()]*)\s*\(?\s*(?:ref\w*\s*(?:range)?:?\s*)?(?P<low>{_NUMBER})\s*(?:-|–)\s*(?P<high>{_NUMBER})"
+)
+
+_DATE_FORMATS = [
+    (re.compile(r"\b\d{4}-\d{2}-\d{2}\b"), ["%Y-%m-%d"]),
+    (re.compile(r"\b\d{1,2}/\d{1,2}/\d{2,4}\b"), ["%m/%d/%Y", "%m/%d/%y"]),
+    (re.compile(r"\b[A-Z][a-z]{2,8}\.? \d{1,2}, \d{4}\b"), ["%B %d, %Y", "%b %d, %Y", "%b. %d, %Y"]),
+]
+
+_FLAG_NAMES = {"H": "high", "HH": "high", "HIGH": "high", "L": "low", "LL": "low", "LOW": "low",
+               "A": "abnormal", "ABNORMAL": "abnormal", "*": "abnormal"}
+
+def parse_date(text):
+    """
+    Find the first date in a piece of text.
+
+    Args:
+        text (str): The text to search
+
+    Returns:
+        tuple: (ISO date string, (start, end) span in text), or (None, None) if no date is found
+    """
+    for pattern, formats in _DATE_FORMATS:
+        for match in pattern.finditer(text):
+            for date_format in formats:
+                try:
+                    date = datetime.datetime.strptime(match.group(0), date_format)
+                except ValueError:
+                    continue
+                return date.strftime("%Y-%m-%d"), match.span()
+    return None, None
+
+def _to_float(text):
+    return float(text) if text is not None else None
+
+def classify_result(value, result, low, high, flag=None):
+    """
+    Decide whether a result is high, low or abnormal.
+
+    Args:
+        value (float or None): Numeric value
+        result (str): The result as printed
+        low (float or None): Lower reference limit
+        high (float or None): Upper reference limit
+        flag (str, optional): Flag printed in the report (H, L, *, ...)
+
+    Returns:
+        str: "high", "low", "abnormal" or "" for normal or unknown
+    """
+    if flag:
+        return _FLAG_NAMES.get(flag.upper(), "abnormal")
+    if value is None:
+        return "abnormal" if result.lower() in POSITIVE_RESULTS else ""
+    if high is not None and value > high:
+        return "high"
+    if low is not None and value < low:
+        return "low"
+    return ""
+
+def _temperature_unit(unit, value):
+    """Normalize a printed temperature unit, inferring it from the value when none is printed."""
+    unit = unit.upper().replace("°", "").replace("DEG", "").strip()
+    if unit in ("F", "C"):
+        return "°" + unit
+    return "°F" if value > 45 else "°C"
+
+def default_range(test, unit, value):
+    """
+    Get the default reference range of a known test.
+
+    Args:
+        test (str): Canonical test name
+        unit (str): Unit printed in the report, or "" if none
+        value (float or None): Numeric value, used to tell °F from °C when no unit is printed
+
+    Returns:
+        tuple: (low, high, unit) with the unit filled in for tests that have per-unit ranges
+    """
+    info = LAB_TESTS[test]
+    unit_ranges = info.get("unit_ranges")
+    if not unit_ranges or value is None:
+        return (*info["range"], unit or info["unit"])
+    unit = _temperature_unit(unit, value)
+    return (*unit_ranges.get(unit, info["range"]), unit)
+
+def parse_lab_line(line):
+    """
+    Parse one line of a lab report.
+    Understands "Name value unit range" layouts with optional separators, flags and
+    reference-range prefixes, e.g. "Hemoglobin A1c: 7.2 % H (4.0-5.6)".
+
+    Args:
+        line (str): A line of text (without a date)
+
+    Returns:
+        dict or None: Row with test, result, value, unit, low, high and flag, or None if the line is not a result
+    """
+    known = _KNOWN_TEST_LINE.match(line)
+    if known:
+        test = _ALIASES[known.group("alias").lower()]
+        rest = line[known.end():]
+        value_match = _VALUE.match(rest)
+        if not value_match:
+            return None
+        result = re.sub(r"\s+", "", value_match.group("value")) if value_match.group("value")[0] in "<>" \
+            else value_match.group("value")
+        rest = rest[value_match.end():]
+
+        unit = ""
+        flag_match = _FLAG.match(rest)
+        if flag_match:
+            rest = rest[flag_match.end():]
+        unit_match = _UNIT.match(rest)
+        if unit_match and not _FLAG.fullmatch(" " + unit_match.group("unit")) and not unit_match.group("unit").lower().startswith("ref"):
+            unit = unit_match.group("unit")
+            rest = rest[unit_match.end():]
+        if not flag_match:
+            flag_match = _FLAG.search(rest)
+
+        low = high = None
+        range_match = _RANGE.search(rest)
+        bound_match = _BOUND.search(rest)
+        if range_match:
+            low, high = float(range_match.group("low")), float(range_match.group("high"))
+        elif bound_match:
+            if bound_match.group("op") in ("<", "<=", "≤"):
+                high = float(bound_match.group("bound"))
+            else:
+                low = float(bound_match.group("bound"))
+        else:
+            numeric = re.match(rf"^[<>]?({_NUMBER})$", result)
+            low, high, unit = default_range(test, unit, float(numeric.group(1)) if numeric else None)
+
+        unit = unit or LAB_TESTS[test]["unit"]
+        flag = flag_match.group("flag") if flag_match else None
+    else:
+        generic = _GENERIC_LINE.match(line)
+        if not generic:
+            return None
+        test = generic.group("name").strip().title()
+        result = generic.group("value")
+        unit = generic.group("unit")
+        low, high = float(generic.group("low")), float(generic.group("high"))
+        flag = generic.group("flag")
+
+    numeric = re.match(rf"^[<>]?({_NUMBER})$", result)
+    value = float(numeric.group(1)) if numeric else None
+    return {
+        "test": test,
+        "result": result,
+        "value": value,
+        "unit": unit,
+        "low": low,
+        "high": high,
+        "flag": classify_result(value, result, low, high, flag)
+    }
+
+def extract_lab_results(pages):
+    """
+    Extract lab results from the pages of a medical record.
+    A date on the result's own line is used as its date; otherwise the most recent
+    date printed above it (e.g. a "Collected:" header) applies, carrying over pages.
+
+    Args:
+        pages (list): Page texts in page order
+
+    Returns:
+        list: Rows (dicts with the LAB_COLUMNS except filename) in document order
+    """
+    rows = []
+    current_date = None
+    for page_number, text in enumerate(pages, 1):
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            date, span = parse_date(line)
+            if date:
+                line = line[:span[0]] + " " + line[span[1]:]
+            row = parse_lab_line(line)
+            if row is None:
+                if date:
+                    current_date = date
+                continue
+            row["date"] = date or current_date
+            row["page"] = page_number
+            rows.append(row)
+    return rows
+
+def find_tests(text):
+    """
+    Find the known lab tests mentioned in a piece of text.
+
+    Args:
+        text (str): The text to search (e.g. a user question)
+
+    Returns:
+        list: Canonical test names in order of first mention
+    """
+    tests = []
+    for match in _TEST_MENTION.finditer(text):
+        test = _ALIASES[match.group(0).lower()]
+        if test not in tests:
+            tests.append(test)
+    return tests
+
+def is_latest_result_question(text):
+    """
+    Determine if a question asks to look up the latest result of a lab test,
+    e.g. "what was my last A1c?" or "latest LDL", rather than asking about trends
+    or research that merely mention a test.
+
+    Args:
+        text (str): The user question
+
+    Returns:
+        bool: True if the question asks for the latest value of a known test
+    """
+    return bool(find_tests(text)) and _LATEST_RESULT_QUESTION.search(text) is not None
+
+def format_lab_row(row):
+    """
+    Format a lab result for display or for the model's context.
+
+    Args:
+        row (dict): A row of the lab results table
+
+    Returns:
+        str: e.g. "Hemoglobin A1c: 7.2 % (reference 4.0-5.6, high) on 2023-03-01 [labs.pdf, Page 2]"
+    """
+    text = f"{row['test']}: {row['result']} {row['unit']}".rstrip()
+    details = []
+    if row["low"] is not None and row["high"] is not None:
+        details.append(f"reference {row['low']:g}-{row['high']:g}")
+    elif row["high"] is not None:
+        details.append(f"reference <{row['high']:g}")
+    elif row["low"] is not None:
+        details.append(f"reference >{row['low']:g}")
+    if row["flag"]:
+        details.append(row["flag"])
+    if details:
+        text += f" ({', '.join(details)})"
+    if row["date"]:
+        text += f" on {row['date']}"
+    if row.get("filename"):
+        text += f" [{row['filename']}, Page {row['page']}]"
+    return text
+
+class LabTable:
+    """
+    Columnar table of the lab results found in a session's medical records.
+    Numeric columns are stored as arrays of floats (NaN for missing values), the other
+    columns as lists, and a per-test row index makes lookups like "latest A1c"
+    independent of the number of records.
+    """
+
+    NUMERIC_COLUMNS = ("value", "low", "high", "page")
+
+    def __init__(self):
+        """Initialize an empty table."""
+        self.columns = {column: array("d") if column in self.NUMERIC_COLUMNS else [] for column in LAB_COLUMNS}
+        self._rows_by_test = defaultdict(list)
+
+    def add_rows(self, rows, filename=None):
+        """
+        Append rows to the table.
+
+        Args:
+            rows (list): Rows from extract_lab_results
+            filename (str, optional): The record the rows come from
+
+        Returns:
+            int: Number of rows added
+        """
+        for row in rows:
+            row_id = len(self)
+            for column in LAB_COLUMNS:
+                value = filename if column == "filename" else row.get(column)
+                if column in self.NUMERIC_COLUMNS:
+                    self.columns[column].append(math.nan if value is None else float(value))
+                else:
+                    self.columns[column].append(value if value is not None else "")
+            self._rows_by_test[row["test"]].append(row_id)
+        return len(rows)
+
+    def row(self, row_id):
+        """
+        Get a row as a dictionary.
+
+        Args:
+            row_id (int): Index of the row
+
+        Returns:
+            dict: The row, with missing numbers and dates as None
+        """
+        row = {}
+        for column in LAB_COLUMNS:
+            value = self.columns[column][row_id]
+            if column in self.NUMERIC_COLUMNS:
+                value = None if math.isnan(value) else value
+                if column == "page" and value is not None:
+                    value = int(value)
+            row[column] = value if value != "" else None
+        row["result"] = row["result"] or ""
+        row["unit"] = row["unit"] or ""
+        row["flag"] = row["flag"] or ""
+        return row
+
+    def history(self, test):
+        """
+        Get every result of a test, most recent first.
+        Results without a date come last; ties keep the later upload first.
+
+        Args:
+            test (str): Canonical test name
+
+        Returns:
+            list: Rows for the test
+        """
+        dates = self.columns["date"]
+        row_ids = sorted(self._rows_by_test.get(test, []), key=lambda row_id: (dates[row_id], row_id), reverse=True)
+        return [self.row(row_id) for row_id in row_ids]
+
+    def latest(self, test):
+        """
+        Get the most recent result of a test.
+
+        Args:
+            test (str): Canonical test name
+
+        Returns:
+            dict or None: The most recent row, or None if the test was never found
+        """
+        dates = self.columns["date"]
+        row_ids = self._rows_by_test.get(test)
+        if not row_ids:
+            return None
+        return self.row(max(row_ids, key=lambda row_id: (dates[row_id], row_id)))
+
+    def abnormal(self):
+        """
+        Get all results flagged high, low or abnormal.
+
+        Returns:
+            list: Abnormal rows in table order
+        """
+        return [self.row(row_id) for row_id, flag in enumerate(self.columns["flag"]) if flag]
+
+    @property
+    def tests(self):
+        """Canonical names of the tests present in the table."""
+        return list(self._rows_by_test)
+
+    def __len__(self):
+        return len(self.columns["test"])
+
+def lab_findings_to_observations(rows):
+    """
+    Map abnormal lab results to observations for the Bayesian engine.
+
+    Args:
+        rows (list): Lab result rows
+
+    Returns:
+        dict: Symptom name -> True for every abnormal finding with a matching symptom
+    """
+    observations = {}
+    for row in rows:
+        symptom = LAB_FINDING_SYMPTOMS.get((row["test"], row["flag"]))
+        if symptom:
+            observations[symptom] = True
+    return observations
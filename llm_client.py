@@ -0,0 +1,330 @@
+import asyncio
+import collections
+import random
+import threading
+import time
+import httpx
+import openai
+import streamlit as st
+from openai import AsyncOpenAI
+from rate_limiting import TokenBucket
+
+# Connection pool settings shared by every session in the server process
+MAX_CONNECTIONS = 50
+MAX_KEEPALIVE_CONNECTIONS = 20
+KEEPALIVE_EXPIRY = 30.0  # Seconds an idle connection is kept open
+REQUEST_TIMEOUT = 120.0  # Seconds to wait for a model response
+CONNECT_TIMEOUT = 10.0
+
+# Process-level admission limits for LLM calls
+REQUESTS_PER_MINUTE = 500
+TOKENS_PER_MINUTE = 200000
+MAX_CONCURRENT_REQUESTS = 16
+MAX_RETRIES = 4
+RETRY_BASE_DELAY = 1.0  # Seconds
+RETRY_MAX_DELAY = 30.0  # Seconds
+COMPLETION_TOKEN_ALLOWANCE = 1000  # Expected completion size added to the prompt estimate
+
+@st.cache_resource
+def get_event_loop():
+    """
+    Get the process-wide event loop used for all OpenAI calls.
+    The loop runs forever in a daemon thread, so Streamlit script threads can
+    submit coroutines to it without creating (or nesting) their own loops.
+
+    Returns:
+        asyncio.AbstractEventLoop: The shared event loop
+    """
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name="openai-event-loop", daemon=True)
+    thread.start()
+    return loop
+
+def run_async(coro, timeout=None):
+    """
+    Run a coroutine on the shared event loop and wait for its result.
+
+    Args:
+        coro: The coroutine to run
+        timeout (float, optional): Maximum number of seconds to wait. Defaults to None (no limit).
+
+    Returns:
+        The value returned by the coroutine
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+    try:
+        return future.result(timeout)
+    except TimeoutError:
+        future.cancel()
+        raise
+
+@st.cache_resource
+def get_async_client(api_key):
+    """
+    Get the process-wide async OpenAI client.
+    A single client (and therefore a single bounded HTTP connection pool with
+    keep-alive) is shared by every session instead of one client per session.
+    Retries are handled by the admission controller, so the SDK's own retries are disabled.
+
+    Args:
+        api_key (str): The OpenAI API key
+
+    Returns:
+        AsyncOpenAI: The shared async client
+    """
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT)
+    )
+    return AsyncOpenAI(api_key=api_key, http_client=http_client, max_retries=0)
+
+def estimate_tokens(messages):
+    """
+    Roughly estimate the number of tokens a chat request will consume.
+    Uses the common approximation of four characters per token.
+
+    Args:
+        messages (list): The conversation messages
+
+    Returns:
+        int: Estimated prompt plus completion tokens
+    """
+    prompt_chars = sum(len(str(message.get("content", ""))) for message in messages)
+    return prompt_chars // 4 + 4 * len(messages) + COMPLETION_TOKEN_ALLOWANCE
+
+class AdmissionController:
+    """
+    Process-level admission controller for LLM calls.
+    Requests are queued per session and admitted round-robin across sessions, subject to
+    token-bucket limits on requests and tokens per minute and a cap on concurrent calls.
+    Rate-limit and server errors are retried with jittered exponential backoff.
+    All coroutines must run on the same event loop (see get_event_loop).
+    """
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE,
+                 max_concurrent=MAX_CONCURRENT_REQUESTS, max_retries=MAX_RETRIES,
+                 base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY):
+        """
+        Initialize the admission controller.
+
+        Args:
+            requests_per_minute (int, optional): Maximum requests admitted per minute
+            tokens_per_minute (int, optional): Maximum estimated tokens admitted per minute
+            max_concurrent (int, optional): Maximum number of calls in flight at once
+            max_retries (int, optional): Maximum retries for retryable errors
+            base_delay (float, optional): Base backoff delay in seconds
+            max_delay (float, optional): Maximum backoff delay in seconds
+        """
+        self.request_bucket = TokenBucket(requests_per_minute / 60, requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute / 60, tokens_per_minute)
+        self.max_concurrent = max_concurrent
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        # Pending requests per session, and the round-robin order of sessions with pending requests
+        self._queues = {}
+        self._order = collections.deque()
+        self._in_flight = 0
+        self._wakeup = None
+        self._dispatcher = None
+
+        self.metrics = {
+            "admitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "max_queue_depth": 0,
+            "total_wait_seconds": 0.0
+        }
+
+    def _ensure_dispatcher(self):
+        """Start the dispatcher task on the running loop if it is not already running."""
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+
+    def queue_depth(self):
+        """
+        Get the number of requests waiting for admission.
+
+        Returns:
+            int: Total queued requests across all sessions
+        """
+        return sum(len(queue) for queue in self._queues.values())
+
+    def get_metrics(self):
+        """
+        Get a snapshot of the admission metrics.
+
+        Returns:
+            dict: Counters plus current queue depth, waiting sessions and in-flight calls
+        """
+        metrics = dict(self.metrics)
+        metrics["queue_depth"] = self.queue_depth()
+        metrics["sessions_waiting"] = len(self._order)
+        metrics["in_flight"] = self._in_flight
+        return metrics
+
+    def _pop_head(self, session_id):
+        """Remove the head request of a session and move the session to the back of the rotation."""
+        queue = self._queues[session_id]
+        queue.popleft()
+        self._order.popleft()
+        if queue:
+            self._order.append(session_id)
+        else:
+            del self._queues[session_id]
+
+    async def _dispatch(self):
+        """Admit queued requests round-robin across sessions as capacity becomes available."""
+        while True:
+            if not self._order or self._in_flight >= self.max_concurrent:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            session_id = self._order[0]
+            future, tokens, enqueued_at = self._queues[session_id][0]
+
+            # Skip requests whose callers gave up while waiting
+            if future.done():
+                self._pop_head(session_id)
+                continue
+
+            # Wait until both buckets can cover the request
+            delay = max(self.request_bucket.time_until_available(1),
+                        self.token_bucket.time_until_available(tokens))
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            self.request_bucket.try_acquire(1)
+            self.token_bucket.try_acquire(tokens)
+            self._pop_head(session_id)
+            self._in_flight += 1
+            self.metrics["admitted"] += 1
+            self.metrics["total_wait_seconds"] += time.monotonic() - enqueued_at
+            future.set_result(None)
+
+    async def _acquire(self, session_id, tokens):
+        """Queue a request for a session and wait until it is admitted."""
+        self._ensure_dispatcher()
+        future = asyncio.get_running_loop().create_future()
+        if session_id not in self._queues:
+            self._queues[session_id] = collections.deque()
+            self._order.append(session_id)
+        self._queues[session_id].append((future, tokens, time.monotonic()))
+        self.metrics["max_queue_depth"] = max(self.metrics["max_queue_depth"], self.queue_depth())
+        self._wakeup.set()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Give the slot back if we were admitted just before being cancelled
+            if future.done() and not future.cancelled():
+                self._release()
+            else:
+                future.cancel()
+            raise
+
+    def _release(self):
+        """Free an in-flight slot and wake the dispatcher."""
+        self._in_flight -= 1
+        self._wakeup.set()
+
+    def _is_retryable(self, error):
+        """Check whether an error is a rate limit, server or connection error worth retrying."""
+        if isinstance(error, openai.RateLimitError):
+            return True
+        if isinstance(error, openai.APIStatusError):
+            return error.status_code >= 500
+        return isinstance(error, openai.APIConnectionError)
+
+    def _backoff_delay(self, attempt, error):
+        """Get a jittered exponential backoff delay, honoring any Retry-After header."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        try:
+            if retry_after:
+                delay = max(delay, min(self.max_delay, float(retry_after)))
+        except ValueError:
+            pass
+        return delay
+
+    async def run(self, session_id, call, estimated_tokens=0):
+        """
+        Run an LLM call once admitted, retrying retryable errors with backoff.
+
+        Args:
+            session_id (str): Identifier of the calling session, used for fair queuing
+            call: Zero-argument callable returning a new awaitable for each attempt
+            estimated_tokens (int, optional): Estimated tokens the call will consume. Defaults to 0.
+
+        Returns:
+            The result of the call
+        """
+        attempt = 0
+        while True:
+            await self._acquire(session_id, estimated_tokens)
+            try:
+                result = await call()
+            except Exception as e:
+                if isinstance(e, openai.RateLimitError):
+                    self.metrics["rate_limited"] += 1
+                if attempt >= self.max_retries or not self._is_retryable(e):
+                    self.metrics["failed"] += 1
+                    raise
+                delay = self._backoff_delay(attempt, e)
+            else:
+                self.metrics["completed"] += 1
+                # Reconcile the token bucket with the actual usage when it is reported
+                usage = getattr(result, "usage", None)
+                total_tokens = getattr(usage, "total_tokens", None)
+                if isinstance(total_tokens, int):
+                    self.token_bucket.debit(total_tokens - estimated_tokens)
+                return result
+            finally:
+                self._release()
+
+            attempt += 1
+            self.metrics["retries"] += 1
+            await asyncio.sleep(delay)
+
+@st.cache_resource
+def get_admission_controller():
+    """
+    Get the process-wide admission controller for LLM calls.
+
+    Returns:
+        AdmissionController: The shared admission controller
+    """
+    return AdmissionController()
+
+async def create_chat_completion(client, model, messages, session_id="default", controller=None):
+    """
+    Create a chat completion with the async client through the admission controller.
+
+    Args:
+        client (AsyncOpenAI): The async OpenAI client
+        model (str): The model to use
+        messages (list): The conversation messages
+        session_id (str, optional): Identifier of the calling session. Defaults to "default".
+        controller (AdmissionController, optional): Controller to use. Defaults to the shared one.
+
+    Returns:
+        str: The assistant's response text
+    """
+    controller = controller or get_admission_controller()
+    response = await controller.run(
+        session_id,
+        lambda: client.chat.completions.create(model=model, messages=messages),
+        estimated_tokens=estimate_tokens(messages)
+    )
+    return response.choices[0].message.content
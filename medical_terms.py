@@ -0,0 +1,139 @@
+import json
+import os
+import re
+import threading
+
+# Local terminology list: category -> {canonical term: [aliases]}
+MEDICAL_TERMS_PATH = os.path.join("data", "medical_terms.json")
+
+# Ranking weight of each category; conditions make the most useful search queries
+TERM_CATEGORY_WEIGHTS = {
+    "condition": 3,
+    "drug": 2,
+    "procedure": 2,
+    "symptom": 1
+}
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:['/-][a-z0-9]+)*")
+
+# Key marking the end of a term in a trie node
+_TERM = "$"
+
+def tokenize_terms(text):
+    """
+    Split text into the tokens used for terminology matching.
+
+    Args:
+        text (str): The text to tokenize
+
+    Returns:
+        list: Lowercase tokens; hyphenated words and possessives stay whole
+    """
+    return _TOKEN_PATTERN.findall(text.lower().replace("’", "'"))
+
+class MedicalTermRecognizer:
+    """
+    Dictionary-backed recognizer for medical entities (conditions, drugs, procedures
+    and symptoms). Every canonical term and alias is compiled into a token trie, and
+    text is scanned once, taking the longest term that starts at each token, so
+    "type 2 diabetes" is found as one entity rather than as "diabetes".
+    """
+
+    def __init__(self, terms, weights=TERM_CATEGORY_WEIGHTS):
+        """
+        Compile a terminology list.
+
+        Args:
+            terms (dict): Category -> {canonical term: [aliases]}
+            weights (dict, optional): Category -> ranking weight. Defaults to TERM_CATEGORY_WEIGHTS.
+        """
+        self.weights = weights
+        self.trie = {}
+        self.size = 0
+        for category, entries in terms.items():
+            for canonical, aliases in entries.items():
+                for name in [canonical, *aliases]:
+                    self._add(name, canonical, category)
+
+    @classmethod
+    def from_file(cls, path=MEDICAL_TERMS_PATH):
+        """
+        Load a terminology list from a JSON file.
+
+        Args:
+            path (str, optional): Path of the terminology file. Defaults to MEDICAL_TERMS_PATH.
+
+        Returns:
+            MedicalTermRecognizer: Recognizer for the listed terms
+        """
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def _add(self, name, canonical, category):
+        node = self.trie
+        for token in tokenize_terms(name):
+            node = node.setdefault(token, {})
+        if _TERM not in node:
+            node[_TERM] = (canonical, category)
+            self.size += 1
+
+    def _child(self, node, token):
+        # Plurals match their singular term ("migraines" -> "migraine")
+        child = node.get(token)
+        if child is None and token.endswith("s") and len(token) > 3:
+            child = node.get(token[:-1])
+        return child
+
+    def find(self, text):
+        """
+        Find the medical entities mentioned in a text.
+
+        Args:
+            text (str): The text to scan
+
+        Returns:
+            list: Entities as dicts with term (canonical name), category, count and position
+                  (token index of the first mention), ranked by category weight, then
+                  number of mentions, then first mention
+        """
+        tokens = tokenize_terms(text)
+        found = {}
+        i = 0
+        while i < len(tokens):
+            node, match, end = self.trie, None, i
+            for j in range(i, len(tokens)):
+                node = self._child(node, tokens[j])
+                if node is None:
+                    break
+                if _TERM in node:
+                    match, end = node[_TERM], j + 1
+            if match is None:
+                i += 1
+                continue
+            canonical, category = match
+            if canonical in found:
+                found[canonical]["count"] += 1
+            else:
+                found[canonical] = {"term": canonical, "category": category, "count": 1, "position": i}
+            i = end
+
+        return sorted(found.values(), key=lambda entity: (
+            -self.weights.get(entity["category"], 0), -entity["count"], entity["position"]
+        ))
+
+# Shared recognizer, compiled on first use
+_term_recognizer = None
+_term_recognizer_lock = threading.Lock()
+
+def get_term_recognizer():
+    """
+    Get the medical term recognizer shared by all sessions in this process.
+
+    Returns:
+        MedicalTermRecognizer: The recognizer for the local terminology list
+    """
+    global _term_recognizer
+    with _term_recognizer_lock:
+        if _term_recognizer is None:
+            _term_recognizer = MedicalTermRecognizer.from_file()
+        return _term_recognizer
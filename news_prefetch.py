@@ -0,0 +1,195 @@
+import threading
+import time
+from serp_service import SerpRateLimitError, SerpService
+
+# Seconds between prefetch cycles
+NEWS_PREFETCH_INTERVAL = 600
+
+# Maximum news requests per interval, so prefetching leaves most of the SERP rate for chat
+NEWS_PREFETCH_BUDGET = 2
+
+# Rate limiter tokens left for chat: news is only fetched while more than this many are available
+NEWS_PREFETCH_RESERVE = 1
+
+# Maximum number of active topics kept fresh
+NEWS_PREFETCH_TOPICS = 10
+
+# Seconds a topic stays active after a session last reported it
+NEWS_TOPIC_TTL = 1800
+
+# News older than this is refreshed ahead of its cache expiry (3 hours)
+NEWS_REFRESH_AGE = 2 * 3600
+
+class NewsPrefetcher:
+    """
+    Background job that keeps medical news for the topics active across sessions in
+    the shared SERP cache. Sessions report their current topics (their top Bayesian
+    diagnoses); every cycle the most widely shared topics with missing or ageing news
+    are fetched, within a request budget per interval. A new topic wakes the job early
+    while the interval's budget lasts. The prefetcher never waits for the shared SERP
+    rate limiter and stops as soon as only the reserve for chat is left. The chat path
+    then only reads news from the cache.
+    """
+
+    def __init__(self, service, interval=NEWS_PREFETCH_INTERVAL, budget=NEWS_PREFETCH_BUDGET,
+                 max_topics=NEWS_PREFETCH_TOPICS, topic_ttl=NEWS_TOPIC_TTL, refresh_age=NEWS_REFRESH_AGE,
+                 reserve=NEWS_PREFETCH_RESERVE):
+        """
+        Initialize the prefetcher.
+
+        Args:
+            service (SerpService): The service whose backend, cache and rate limiter are used to fetch news
+            interval (float, optional): Seconds between cycles. Defaults to NEWS_PREFETCH_INTERVAL.
+            budget (int, optional): Maximum news requests per interval. Defaults to NEWS_PREFETCH_BUDGET.
+            max_topics (int, optional): Maximum number of topics kept fresh. Defaults to NEWS_PREFETCH_TOPICS.
+            topic_ttl (float, optional): Seconds a topic stays active. Defaults to NEWS_TOPIC_TTL.
+            refresh_age (float, optional): Age in seconds at which cached news is refreshed.
+                                           Defaults to NEWS_REFRESH_AGE.
+            reserve (int, optional): Rate limiter tokens left for chat. Defaults to NEWS_PREFETCH_RESERVE.
+        """
+        # Same backend, cache and limiter, but never waiting for a token
+        self.service = SerpService(backend=service.backend, cache=service.cache, limiter=service.limiter,
+                                   acquire_timeout=0, sources=service.sources)
+        self.interval = interval
+        self.budget = budget
+        self.max_topics = max_topics
+        self.topic_ttl = topic_ttl
+        self.refresh_age = refresh_age
+        self.reserve = reserve
+        self.stats = {"cycles": 0, "fetched": 0, "fresh": 0, "rate_limited": 0, "errors": 0}
+
+        # Requests made in the current interval, which started at _window_start (monotonic time)
+        self._window_start = float("-inf")
+        self._window_fetched = 0
+
+        self._topics = {}  # topic -> {session_id: last reported}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def track(self, session_id, topics):
+        """
+        Record the topics a session is currently discussing.
+        A topic no session has reported before wakes the job, so its news is fetched
+        without waiting for the next cycle if the interval's budget is not spent.
+
+        Args:
+            session_id (str): The session reporting the topics
+            topics (list): Topic names, e.g. the session's top diagnoses
+        """
+        now = time.time()
+        new_topic = False
+        with self._lock:
+            for topic in topics:
+                sessions = self._topics.setdefault(topic, {})
+                new_topic = new_topic or not sessions
+                sessions[session_id] = now
+        if new_topic:
+            self._wake.set()
+
+    def active_topics(self):
+        """
+        Get the topics reported within topic_ttl, dropping older reports.
+
+        Returns:
+            list: Topics reported by the most sessions first, then most recently reported first
+        """
+        cutoff = time.time() - self.topic_ttl
+        with self._lock:
+            for topic in list(self._topics):
+                sessions = {session_id: seen for session_id, seen in self._topics[topic].items() if seen >= cutoff}
+                if sessions:
+                    self._topics[topic] = sessions
+                else:
+                    del self._topics[topic]
+            ranked = sorted(self._topics.items(), key=lambda item: (-len(item[1]), -max(item[1].values()), item[0]))
+        return [topic for topic, _ in ranked]
+
+    def run_once(self):
+        """
+        Run one prefetch cycle, using what is left of the current interval's budget.
+
+        Returns:
+            int: Number of news requests made
+        """
+        now = time.monotonic()
+        if now - self._window_start >= self.interval:
+            self._window_start, self._window_fetched = now, 0
+        budget = self.budget - self._window_fetched
+
+        fetched = 0
+        for topic in self.active_topics()[:self.max_topics]:
+            if self.service.get_cached_medical_news(topic, max_age=self.refresh_age, record_stats=False) is not None:
+                self.stats["fresh"] += 1
+                continue
+            if fetched >= budget:
+                break
+            if self.service.limiter.time_until_available(self.reserve + 1) > 0:
+                # Tokens are scarce; leave them to chat and try again next cycle
+                self.stats["rate_limited"] += 1
+                break
+            try:
+                self.service.get_medical_news(topic, max_age=self.refresh_age)
+                fetched += 1
+            except SerpRateLimitError:
+                # Chat traffic is using the rate limit; try again next cycle
+                self.stats["rate_limited"] += 1
+                break
+            except Exception as e:
+                print(f"Error prefetching medical news for '{topic}': {e}")
+                self.stats["errors"] += 1
+
+        self._window_fetched += fetched
+        self.stats["cycles"] += 1
+        self.stats["fetched"] += fetched
+        return fetched
+
+    def start(self):
+        """Start the background thread if it is not running."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="news-prefetch", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread after its current cycle."""
+        self._stopped.set()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.clear()
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"News prefetch cycle failed: {e}")
+
+            # Wait for the next interval, or for a new topic while this interval's budget lasts
+            while True:
+                woken = self._wake.wait(max(0.0, self._window_start + self.interval - time.monotonic()))
+                if self._stopped.is_set() or not woken or self._window_fetched < self.budget:
+                    break
+                self._wake.clear()
+
+# Shared news prefetcher, started on first use
+_news_prefetcher = None
+_news_prefetcher_lock = threading.Lock()
+
+def get_news_prefetcher(service):
+    """
+    Get the news prefetcher shared by all sessions in this process, starting it on first use.
+
+    Args:
+        service (SerpService): The service used to fetch news if the prefetcher is not running yet
+
+    Returns:
+        NewsPrefetcher: The shared, running news prefetcher
+    """
+    global _news_prefetcher
+    with _news_prefetcher_lock:
+        if _news_prefetcher is None:
+            _news_prefetcher = NewsPrefetcher(service)
+            _news_prefetcher.start()
+        return _news_prefetcher
@@ -0,0 +1,99 @@
+import threading
+import time
+
+class TokenBucket:
+    """
+    Thread-safe token bucket used to enforce rate limits.
+    Tokens refill continuously at a fixed rate up to a burst capacity.
+    """
+
+    def __init__(self, rate, capacity):
+        """
+        Initialize the token bucket.
+
+        Args:
+            rate (float): Number of tokens added per second
+            capacity (float): Maximum number of tokens the bucket can hold (burst size)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        """Add the tokens accrued since the last refill. Caller must hold the lock."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def try_acquire(self, amount=1):
+        """
+        Take tokens from the bucket if they are available, without waiting.
+        Requests larger than the capacity are clamped so they can eventually pass.
+
+        Args:
+            amount (float, optional): Number of tokens to take. Defaults to 1.
+
+        Returns:
+            bool: True if the tokens were taken, False otherwise
+        """
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return True
+            return False
+
+    def acquire(self, amount=1, timeout=None):
+        """
+        Take tokens from the bucket, waiting at most until a deadline.
+        If the tokens cannot become available before the deadline, returns immediately
+        instead of sleeping for nothing.
+
+        Args:
+            amount (float, optional): Number of tokens to take. Defaults to 1.
+            timeout (float, optional): Maximum seconds to wait. None waits as long as needed; 0 never waits.
+
+        Returns:
+            bool: True if the tokens were taken, False if they were not available in time
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self.try_acquire(amount):
+                return True
+            wait = self.time_until_available(amount)
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            # Another caller may take the tokens first, so check again after waiting
+            time.sleep(max(wait, 0.001))
+
+    def time_until_available(self, amount=1):
+        """
+        Get the number of seconds until the requested tokens will be available.
+
+        Args:
+            amount (float, optional): Number of tokens needed. Defaults to 1.
+
+        Returns:
+            float: Seconds to wait (0 if the tokens are available now)
+        """
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            if self.tokens >= amount:
+                return 0.0
+            return (amount - self.tokens) / self.rate
+
+    def debit(self, amount):
+        """
+        Adjust the bucket after the fact, e.g. when actual usage differs from an estimate.
+        A positive amount removes tokens (the balance may go negative), a negative amount refunds them.
+
+        Args:
+            amount (float): Number of tokens to remove
+        """
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - amount)
@@ -0,0 +1,250 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+# Default location and size limit of the record store
+RECORD_STORE_PATH = os.path.join(".cache", "records.sqlite3")
+RECORD_STORE_MAX_BYTES = 1024 * 1024 * 1024
+
+# Records used within this many seconds are never evicted, so live sessions keep their text
+RECORD_STORE_MIN_AGE = 24 * 3600
+
+class RecordStore:
+    """
+    SQLite-backed store for the text of uploaded medical records.
+    Sessions keep only a handle (the record's content hash) and a text-free page index;
+    page and chunk texts are read from disk when a question needs them. Records are
+    shared by content hash across sessions and evicted least recently used.
+    """
+
+    def __init__(self, path=RECORD_STORE_PATH, max_bytes=RECORD_STORE_MAX_BYTES, min_age=RECORD_STORE_MIN_AGE):
+        """
+        Initialize the record store.
+
+        Args:
+            path (str, optional): Path of the SQLite database
+            max_bytes (int, optional): Maximum total size of stored text
+            min_age (int, optional): Seconds a record is protected from eviction after its last use
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.min_age = min_age
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    document_id TEXT PRIMARY KEY,
+                    page_count INTEGER NOT NULL,
+                    bytes INTEGER NOT NULL,
+                    accessed REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS pages (
+                    document_id TEXT NOT NULL,
+                    page INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    PRIMARY KEY (document_id, page)
+                );
+                CREATE TABLE IF NOT EXISTS chunks (
+                    document_id TEXT NOT NULL,
+                    chunk_id INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    PRIMARY KEY (document_id, chunk_id)
+                );
+            """)
+
+    def _connect(self):
+        # One connection per call keeps the store safe to use from any thread
+        return sqlite3.connect(self.path, timeout=30)
+
+    def put(self, document_id, pages, chunk_texts):
+        """
+        Store a record's page and chunk texts, replacing any previous copy.
+
+        Args:
+            document_id (str): The record's content hash
+            pages (list): Page texts in page order
+            chunk_texts (list): Chunk texts in chunk id order
+        """
+        size = sum(len(text.encode("utf-8")) for text in pages) + sum(len(text.encode("utf-8")) for text in chunk_texts)
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM pages WHERE document_id = ?", (document_id,))
+            conn.execute("DELETE FROM chunks WHERE document_id = ?", (document_id,))
+            conn.executemany("INSERT INTO pages VALUES (?, ?, ?)",
+                             [(document_id, page, text) for page, text in enumerate(pages, 1)])
+            conn.executemany("INSERT INTO chunks VALUES (?, ?, ?)",
+                             [(document_id, chunk_id, text) for chunk_id, text in enumerate(chunk_texts)])
+            conn.execute("INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?)",
+                         (document_id, len(pages), size, time.time()))
+        self.evict()
+
+    def has(self, document_id):
+        """
+        Check whether a record is stored.
+
+        Args:
+            document_id (str): The record's content hash
+
+        Returns:
+            bool: True if the record's text is available
+        """
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT 1 FROM documents WHERE document_id = ?", (document_id,)).fetchone() is not None
+
+    def _touch(self, conn, document_id):
+        conn.execute("UPDATE documents SET accessed = ? WHERE document_id = ?", (time.time(), document_id))
+
+    def get_chunk_texts(self, document_id, chunk_ids):
+        """
+        Load the texts of some chunks of a record.
+
+        Args:
+            document_id (str): The record's content hash
+            chunk_ids (list): Ids of the chunks to load
+
+        Returns:
+            dict: Chunk id -> text for the chunks that were found
+        """
+        chunk_ids = list(chunk_ids)
+        if not chunk_ids:
+            return {}
+        placeholders = ",".join("?" * len(chunk_ids))
+        with closing(self._connect()) as conn, conn:
+            rows = conn.execute(
+                f"SELECT chunk_id, text FROM chunks WHERE document_id = ? AND chunk_id IN ({placeholders})",
+                [document_id, *chunk_ids]
+            ).fetchall()
+            self._touch(conn, document_id)
+        return dict(rows)
+
+    def get_page(self, document_id, page):
+        """
+        Load the text of one page of a record.
+
+        Args:
+            document_id (str): The record's content hash
+            page (int): 1-based page number
+
+        Returns:
+            str or None: The page text, or None if it is not stored
+        """
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT text FROM pages WHERE document_id = ? AND page = ?",
+                               (document_id, page)).fetchone()
+            self._touch(conn, document_id)
+        return row[0] if row else None
+
+    def get_pages(self, document_id):
+        """
+        Load all page texts of a record.
+
+        Args:
+            document_id (str): The record's content hash
+
+        Returns:
+            list: Page texts in page order (empty if the record is not stored)
+        """
+        with closing(self._connect()) as conn, conn:
+            rows = conn.execute("SELECT text FROM pages WHERE document_id = ? ORDER BY page",
+                                (document_id,)).fetchall()
+            self._touch(conn, document_id)
+        return [row[0] for row in rows]
+
+    def size(self):
+        """
+        Get the total size of the stored text.
+
+        Returns:
+            int: Size in bytes
+        """
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM documents").fetchone()[0]
+
+    def evict(self):
+        """
+        Remove least recently used records until the store is under its size limit.
+        Records used within min_age seconds are kept even if the limit is exceeded.
+        """
+        with self._lock, closing(self._connect()) as conn, conn:
+            total = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM documents").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            cutoff = time.time() - self.min_age
+            candidates = conn.execute(
+                "SELECT document_id, bytes FROM documents WHERE accessed < ? ORDER BY accessed", (cutoff,)
+            ).fetchall()
+            for document_id, size in candidates:
+                if total <= self.max_bytes:
+                    break
+                for table in ("documents", "pages", "chunks"):
+                    conn.execute(f"DELETE FROM {table} WHERE document_id = ?", (document_id,))
+                total -= size
+
+def spill_record(result, store):
+    """
+    Move a processed record's text into the record store.
+
+    Args:
+        result (dict): Successful result of document_processor.process_pdf
+        store (RecordStore): The store to write to
+
+    Returns:
+        dict: The result without its text, with a text-free page index
+    """
+    document_id = result["metadata"]["sha256"]
+    index = result["index"]
+    store.put(document_id, result["pages"], [chunk["text"] for chunk in index.chunks])
+    compact = {key: value for key, value in result.items() if key not in ("pages", "page_offsets")}
+    compact["index"] = index.without_text()
+    return compact
+
+def load_chunk_texts(chunks, store):
+    """
+    Load the texts of retrieved chunks from the record store.
+
+    Args:
+        chunks (list): Corpus chunks with document_id and chunk_id keys
+        store (RecordStore): The store holding the texts
+
+    Returns:
+        list: The chunks with a text key added, in the same order; chunks whose
+              text is no longer stored are dropped
+    """
+    wanted = {}
+    for chunk in chunks:
+        if "text" not in chunk:
+            wanted.setdefault(chunk["document_id"], []).append(chunk["chunk_id"])
+    texts = {document_id: store.get_chunk_texts(document_id, chunk_ids) for document_id, chunk_ids in wanted.items()}
+
+    loaded = []
+    for chunk in chunks:
+        if "text" in chunk:
+            loaded.append(chunk)
+            continue
+        text = texts[chunk["document_id"]].get(chunk["chunk_id"])
+        if text is not None:
+            loaded.append({**chunk, "text": text})
+    return loaded
+
+# Shared record store, created on first use
+_record_store = None
+_record_store_lock = threading.Lock()
+
+def get_record_store():
+    """
+    Get the record store shared by all sessions in this process.
+
+    Returns:
+        RecordStore: The shared record store
+    """
+    global _record_store
+    with _record_store_lock:
+        if _record_store is None:
+            _record_store = RecordStore()
+        return _record_store
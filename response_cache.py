@@ -0,0 +1,239 @@
+import collections
+import math
+import re
+import threading
+import time
+import streamlit as st
+from medical_terms import get_term_recognizer
+from serp_utils import MEDICAL_QUERY_INDICATORS, RECENCY_PHRASES
+
+# Words that make a question about the patient rather than a general medical topic
+PATIENT_SPECIFIC_WORDS = {
+    "i", "i'm", "im", "i've", "ive", "i'd", "me", "my", "mine", "myself",
+    "we", "our", "us", "he", "she", "his", "her", "him", "son", "daughter",
+    "husband", "wife", "mom", "dad", "mother", "father", "child", "baby"
+}
+
+# Words and phrases that refer back to the conversation, so the question cannot be answered on its own
+BACK_REFERENCE_WORDS = {"it", "its", "this", "that", "these", "those", "they", "them", "their"}
+BACK_REFERENCE_PHRASES = ["you mentioned", "you said", "you suggested"]
+
+# Words ignored when comparing questions
+QUERY_STOP_WORDS = {
+    "what", "are", "is", "the", "of", "a", "an", "for", "to", "and", "or", "how",
+    "do", "does", "you", "it", "in", "on", "can", "about", "tell", "please", "some",
+    "common", "main", "usual", "typical", "typically", "usually"
+}
+
+def is_cacheable_question(user_input):
+    """
+    Determine if a message is a general, context-independent medical question.
+    Reuses the medical query indicators from serp_utils and requires a recognized
+    medical term, so the question names its subject. Questions that mention the
+    patient, refer back to the conversation or ask for recent developments are never cached.
+
+    Args:
+        user_input (str): The user's input message
+
+    Returns:
+        bool: True if the answer can be shared across sessions, False otherwise
+    """
+    text = user_input.lower()
+
+    if not any(indicator in text for indicator in MEDICAL_QUERY_INDICATORS):
+        return False
+
+    if any(phrase in text for phrase in RECENCY_PHRASES + BACK_REFERENCE_PHRASES):
+        return False
+
+    words = set(re.findall(r"[a-z']+", text))
+    if words & (PATIENT_SPECIFIC_WORDS | BACK_REFERENCE_WORDS):
+        return False
+
+    return bool(get_term_recognizer().find(user_input))
+
+def tokenize_query(text):
+    """
+    Split a question into comparable content terms.
+    Lowercases, drops punctuation and stop words, and strips a plural 's'
+    (but not the final 's' of words such as "this", "diagnosis" or "virus").
+
+    Args:
+        text (str): The question text
+
+    Returns:
+        list: Content terms in order of appearance
+    """
+    terms = []
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        if word in QUERY_STOP_WORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "is", "us")):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+def normalize_query(text):
+    """
+    Normalize a question into an exact-match cache key.
+
+    Args:
+        text (str): The question text
+
+    Returns:
+        str: Sorted content terms joined by spaces
+    """
+    return " ".join(sorted(set(tokenize_query(text))))
+
+class ResponseCache:
+    """
+    Process-wide cache of model answers to general medical questions.
+    Entries are keyed by normalized question plus model, expire after a TTL and are
+    evicted least-recently-used when the entry or size limits are exceeded. A lexical
+    similarity index (inverted index over content terms, cosine similarity) lets
+    near-duplicate questions share an answer, as long as every content term of the
+    new question appears in the cached one, so a qualifier such as "in children" is
+    never answered with a general answer.
+    """
+
+    def __init__(self, ttl=86400, max_entries=500, max_bytes=5000000, similarity_threshold=0.9):
+        """
+        Initialize the response cache.
+
+        Args:
+            ttl (int, optional): Seconds an answer stays valid. Defaults to 86400 (one day).
+            max_entries (int, optional): Maximum number of cached answers. Defaults to 500.
+            max_bytes (int, optional): Maximum total size of cached answers. Defaults to 5 MB.
+            similarity_threshold (float, optional): Minimum cosine similarity for a near-duplicate match.
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.similarity_threshold = similarity_threshold
+
+        # (model, normalized query) -> entry, in least-recently-used order
+        self._entries = collections.OrderedDict()
+        # (model, term) -> set of normalized queries containing the term
+        self._index = collections.defaultdict(set)
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self.stats = {"hits": 0, "near_hits": 0, "misses": 0, "evictions": 0}
+
+    def _remove(self, key):
+        """Remove an entry and its index postings. Caller must hold the lock."""
+        entry = self._entries.pop(key)
+        self._size -= len(entry["response"])
+        model, normalized = key
+        for term in entry["terms"]:
+            postings = self._index.get((model, term))
+            if postings is not None:
+                postings.discard(normalized)
+                if not postings:
+                    del self._index[(model, term)]
+
+    def _is_expired(self, entry):
+        return time.time() - entry["created"] > self.ttl
+
+    def _similarity(self, terms, other_terms):
+        """Cosine similarity between two term-frequency vectors."""
+        counts = collections.Counter(terms)
+        other_counts = collections.Counter(other_terms)
+        dot = sum(count * other_counts[term] for term, count in counts.items())
+        norm = math.sqrt(sum(c * c for c in counts.values())) * math.sqrt(sum(c * c for c in other_counts.values()))
+        return dot / norm if norm else 0.0
+
+    def get(self, query, model):
+        """
+        Look up a cached answer for a question.
+
+        Args:
+            query (str): The user's question
+            model (str): The model the answer must come from
+
+        Returns:
+            str or None: The cached answer, or None on a miss
+        """
+        terms = tokenize_query(query)
+        if not terms:
+            return None
+        key = (model, normalize_query(query))
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._is_expired(entry):
+                self._remove(key)
+                entry = None
+
+            if entry is None:
+                # Find the most similar cached question containing every term of this one
+                candidates = None
+                for term in set(terms):
+                    postings = self._index.get((model, term), set())
+                    candidates = set(postings) if candidates is None else candidates & postings
+
+                best_key, best_score = None, 0.0
+                for normalized in candidates:
+                    candidate = self._entries[(model, normalized)]
+                    score = self._similarity(terms, candidate["terms"])
+                    if score > best_score:
+                        best_key, best_score = (model, normalized), score
+
+                if best_key is not None and best_score >= self.similarity_threshold:
+                    entry = self._entries[best_key]
+                    if self._is_expired(entry):
+                        self._remove(best_key)
+                        entry = None
+                    else:
+                        key = best_key
+                        self.stats["near_hits"] += 1
+
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry["response"]
+
+    def put(self, query, model, response):
+        """
+        Store an answer for a question.
+
+        Args:
+            query (str): The user's question
+            model (str): The model that produced the answer
+            response (str): The answer to cache
+        """
+        terms = tokenize_query(query)
+        if not terms or not response or len(response) > self.max_bytes:
+            return
+        normalized = normalize_query(query)
+        key = (model, normalized)
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = {"terms": terms, "response": response, "created": time.time()}
+            self._size += len(response)
+            for term in set(terms):
+                self._index[(model, term)].add(normalized)
+
+            # Evict least recently used entries until both limits are met
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+@st.cache_resource
+def get_response_cache():
+    """
+    Get the process-wide response cache shared by all sessions.
+
+    Returns:
+        ResponseCache: The shared response cache
+    """
+    return ResponseCache()
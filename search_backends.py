@@ -0,0 +1,161 @@
+import json
+import os
+import random
+import re
+import time
+from urllib.parse import urlsplit
+import serpapi
+from document_index import BM25Index
+
+# Default on-disk corpus of the local search backend
+LOCAL_SEARCH_CORPUS = os.path.join("data", "search_corpus.jsonl")
+
+# Number of candidates ranked before site restrictions and result limits are applied
+LOCAL_SEARCH_CANDIDATES = 50
+
+# Seconds a SerpAPI request may take before it is abandoned
+SERP_REQUEST_TIMEOUT = 10.0
+
+class SerpApiBackend:
+    """
+    Live search backend: Google results through SerpAPI.
+    """
+
+    name = "serpapi"
+
+    def __init__(self, api_key=None, timeout=SERP_REQUEST_TIMEOUT):
+        """
+        Initialize the SerpAPI backend.
+
+        Args:
+            api_key (str, optional): The SERP API key. If not provided, will try to get from environment.
+            timeout (float, optional): Seconds a request may take. Defaults to SERP_REQUEST_TIMEOUT.
+        """
+        self.timeout = timeout
+        self.api_key = api_key or os.environ.get("SERP_API_KEY")
+        if not self.api_key:
+            raise ValueError("SERP API key is required")
+
+    def search(self, params):
+        """
+        Run a search.
+
+        Args:
+            params (dict): SerpAPI request parameters (engine, q, num, tbm, ...) without the API key
+
+        Returns:
+            dict: The SerpAPI response
+        """
+        return serpapi.search({**params, "api_key": self.api_key}, timeout=self.timeout)
+
+class LocalSearchBackend:
+    """
+    Offline search backend serving results from an on-disk JSONL snapshot of trusted
+    medical pages. Each line is a page with title, link and snippet, and optionally
+    text, source, date and type ("page" or "news"). Pages are ranked with a BM25
+    inverted index and returned in the same shape as SerpAPI responses, so the
+    enrichment path can be tested and load-tested without an API key or network.
+    """
+
+    name = "local"
+
+    def __init__(self, corpus_path=LOCAL_SEARCH_CORPUS, latency=0.0, jitter=0.0):
+        """
+        Initialize the local backend and index its corpus.
+
+        Args:
+            corpus_path (str, optional): Path of the JSONL corpus. Defaults to LOCAL_SEARCH_CORPUS.
+            latency (float, optional): Seconds added to every search. Defaults to 0.0.
+            jitter (float, optional): Maximum extra random seconds added to every search. Defaults to 0.0.
+        """
+        self.corpus_path = corpus_path
+        self.latency = latency
+        self.jitter = jitter
+        self.indexes = {"page": BM25Index(), "news": BM25Index()}
+
+        with open(corpus_path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    self.add_page(json.loads(line))
+
+    def add_page(self, page):
+        """
+        Add a page to the index.
+
+        Args:
+            page (dict): Page with title, link and snippet, and optionally text, source, date and type
+        """
+        kind = page.get("type", "page")
+        text = " ".join([page.get("title", ""), page.get("snippet", ""), page.get("text", "")])
+        self.indexes[kind].add_chunk({"page": page, "text": text})
+
+    def search(self, params):
+        """
+        Run a search against the corpus.
+        "site:" operators in the query restrict results to those domains; time
+        filters such as tbs are ignored because the corpus is a fixed snapshot.
+
+        Args:
+            params (dict): SerpAPI request parameters (q, num and tbm are used)
+
+        Returns:
+            dict: Response with organic_results, or news_results when tbm is "nws"
+        """
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        query = params.get("q", "")
+        sites = [site.lower() for site in re.findall(r"site:(\S+?)\)?(?=\s|$)", query)]
+        terms = re.sub(r"site:\S+|\bOR\b|[()]", " ", query)
+        num = int(params.get("num", 10))
+        news = params.get("tbm") == "nws"
+
+        results = []
+        for match in self.indexes["news" if news else "page"].search(terms, k=LOCAL_SEARCH_CANDIDATES):
+            page = match["page"]
+            if sites and not _matches_site(page.get("link", ""), sites):
+                continue
+            result = {
+                "position": len(results) + 1,
+                "title": page.get("title", ""),
+                "link": page.get("link", ""),
+                "snippet": page.get("snippet", ""),
+                "source": page.get("source", urlsplit(page.get("link", "")).netloc)
+            }
+            if news:
+                result["date"] = page.get("date", "")
+            results.append(result)
+            if len(results) >= num:
+                break
+
+        return {
+            "search_metadata": {"status": "Success", "backend": self.name},
+            "search_parameters": {key: value for key, value in params.items() if key != "api_key"},
+            "news_results" if news else "organic_results": results
+        }
+
+def _matches_site(url, sites):
+    """Check whether a URL's host is one of the sites or a subdomain of one."""
+    host = urlsplit(url).netloc.lower()
+    return any(host == site or host.endswith("." + site) for site in sites)
+
+def create_search_backend(name="serpapi", api_key=None, corpus_path=LOCAL_SEARCH_CORPUS, latency=0.0, jitter=0.0):
+    """
+    Create a search backend by name.
+
+    Args:
+        name (str, optional): "serpapi" for the live API or "local" for the on-disk corpus. Defaults to "serpapi".
+        api_key (str, optional): The SERP API key (live backend only)
+        corpus_path (str, optional): Path of the JSONL corpus (local backend only)
+        latency (float, optional): Seconds added to every search (local backend only)
+        jitter (float, optional): Maximum extra random seconds per search (local backend only)
+
+    Returns:
+        SerpApiBackend or LocalSearchBackend: The search backend
+    """
+    if name == "local":
+        return LocalSearchBackend(corpus_path, latency=latency, jitter=jitter)
+    if name == "serpapi":
+        return SerpApiBackend(api_key)
+    raise ValueError(f"Unknown search backend: {name}")
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+# Default location and size limit of the SERP cache
+SERP_CACHE_PATH = os.path.join(".cache", "serp.sqlite3")
+SERP_CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+# Seconds a cached response stays valid, per endpoint. Medical reference pages change
+# slowly; news must stay fresh.
+SERP_CACHE_TTLS = {
+    "search": 7 * 24 * 3600,
+    "news": 3 * 3600
+}
+DEFAULT_SERP_CACHE_TTL = 24 * 3600
+
+def normalize_search_query(query):
+    """
+    Normalize a search query so trivially different spellings share a cache entry.
+
+    Args:
+        query (str): The search query
+
+    Returns:
+        str: Lowercase query with punctuation removed and whitespace collapsed
+    """
+    return " ".join(re.findall(r"[a-z0-9]+(?:[-'][a-z0-9]+)*", query.lower()))
+
+def make_cache_key(endpoint, query, params=None):
+    """
+    Build the cache key for a request.
+
+    Args:
+        endpoint (str): The SERP endpoint (e.g. "search" or "news")
+        query (str): The search query
+        params (dict, optional): Other request parameters that change the results
+
+    Returns:
+        str: Hex digest identifying the request
+    """
+    payload = json.dumps([endpoint, normalize_search_query(query), params or {}], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class SerpCache:
+    """
+    Persistent SQLite cache of SERP API responses, shared by all sessions and kept
+    across restarts. Entries expire after a per-endpoint TTL, and the least recently
+    used entries are evicted when the cache exceeds its size limit.
+    """
+
+    def __init__(self, path=SERP_CACHE_PATH, max_bytes=SERP_CACHE_MAX_BYTES, ttls=None):
+        """
+        Initialize the SERP cache.
+
+        Args:
+            path (str, optional): Path of the SQLite database
+            max_bytes (int, optional): Maximum total size of cached responses
+            ttls (dict, optional): Endpoint -> seconds an entry stays valid. Defaults to SERP_CACHE_TTLS.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttls = {**SERP_CACHE_TTLS, **(ttls or {})}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    endpoint TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    bytes INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        # One connection per call keeps the cache safe to use from any thread
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def get(self, endpoint, query, params=None, record_stats=True, max_age=None):
+        """
+        Look up a cached response.
+
+        Args:
+            endpoint (str): The SERP endpoint
+            query (str): The search query
+            params (dict, optional): Other request parameters
+            record_stats (bool, optional): Whether to count the lookup as a hit or miss. Defaults to True.
+            max_age (float, optional): Treat entries older than this many seconds as a miss
+                                       (without removing them). Defaults to the endpoint's TTL.
+
+        Returns:
+            The cached response, or None on a miss or if the entry has expired
+        """
+        key = make_cache_key(endpoint, query, params)
+        ttl = self.ttls.get(endpoint, DEFAULT_SERP_CACHE_TTL)
+        now = time.time()
+
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] > ttl:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._count("expired")
+                row = None
+            elif row is not None and max_age is not None and now - row[1] > max_age:
+                row = None
+            if row is None:
+                if record_stats:
+                    self._count("misses")
+                return None
+            conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+
+        if record_stats:
+            self._count("hits")
+        return json.loads(row[0])
+
+    def put(self, endpoint, query, params, value):
+        """
+        Store a response.
+
+        Args:
+            endpoint (str): The SERP endpoint
+            query (str): The search query
+            params (dict): Other request parameters
+            value: JSON-serializable response
+        """
+        key = make_cache_key(endpoint, query, params)
+        data = json.dumps(value)
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         (key, endpoint, normalize_search_query(query), data, len(data), now, now))
+        self.evict()
+
+    def evict(self):
+        """Remove expired entries, then least recently used entries until the cache is under its size limit."""
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            for endpoint, ttl in self.ttls.items():
+                conn.execute("DELETE FROM responses WHERE endpoint = ? AND created < ?", (endpoint, now - ttl))
+
+            total = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM responses").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            for key, size in conn.execute("SELECT key, bytes FROM responses ORDER BY accessed").fetchall():
+                if total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                total -= size
+                self._count("evictions")
+
+    def get_stats(self):
+        """
+        Get the cache counters and current size.
+
+        Returns:
+            dict: hits, misses, expired, evictions, entries and bytes
+        """
+        with closing(self._connect()) as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM responses").fetchone()
+        with self._lock:
+            return {**self.stats, "entries": entries, "bytes": size}
+
+# Shared SERP cache, created on first use
+_serp_cache = None
+_serp_cache_lock = threading.Lock()
+
+def get_serp_cache():
+    """
+    Get the SERP cache shared by all sessions in this process.
+
+    Returns:
+        SerpCache: The shared SERP cache
+    """
+    global _serp_cache
+    with _serp_cache_lock:
+        if _serp_cache is None:
+            _serp_cache = SerpCache()
+        return _serp_cache
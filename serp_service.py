@@ -1,8 +1,69 @@
-import os
 import json
-import time
-from functools import lru_cache
-import serpapi
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from rate_limiting import TokenBucket
+from search_backends import SerpApiBackend
+from serp_cache import get_serp_cache, make_cache_key
+from single_flight import SingleFlight
+from source_trust import get_source_matcher
+
+# Number of requests that can be made at once before the per-minute rate applies
+SERP_BURST_CAPACITY = 3
+
+# Maximum seconds a request waits for the rate limiter before enrichment is skipped
+SERP_ACQUIRE_TIMEOUT = 2.0
+
+# Seconds a multi-query search waits before returning whatever has finished
+SERP_SEARCH_DEADLINE = 5.0
+
+# Worker threads for searches started from the event loop. Searches run on this pool rather
+# than the loop's default executor, which the shared OpenAI client needs for DNS lookups.
+SERP_SEARCH_WORKERS = 4
+
+# Identical SERP requests in flight across all sessions of this process
+_in_flight_requests = SingleFlight()
+
+# Process-wide search thread pool, created on first use
+_serp_executor = None
+_serp_executor_lock = threading.Lock()
+
+# Process-wide rate limiters, one per requests-per-minute setting
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+class SerpRateLimitError(Exception):
+    """Raised when a SERP request cannot be made within the rate limit in time."""
+
+def get_serp_rate_limiter(rate_limit, burst=SERP_BURST_CAPACITY):
+    """
+    Get the token bucket shared by every SerpService in this process with the given rate.
+    
+    Args:
+        rate_limit (int): Maximum number of requests per minute
+        burst (int, optional): Burst capacity. Defaults to SERP_BURST_CAPACITY.
+        
+    Returns:
+        TokenBucket: The shared rate limiter
+    """
+    with _rate_limiters_lock:
+        if rate_limit not in _rate_limiters:
+            _rate_limiters[rate_limit] = TokenBucket(rate_limit / 60, min(burst, rate_limit))
+        return _rate_limiters[rate_limit]
+
+def get_serp_executor():
+    """
+    Get the bounded thread pool that runs searches started from the event loop.
+    
+    Returns:
+        ThreadPoolExecutor: The shared search thread pool
+    """
+    global _serp_executor
+    with _serp_executor_lock:
+        if _serp_executor is None:
+            _serp_executor = ThreadPoolExecutor(max_workers=SERP_SEARCH_WORKERS, thread_name_prefix="serp-search")
+        return _serp_executor
 
 class SerpService:
     """
@@ -10,38 +71,78 @@ class SerpService:
     Provides methods for searching medical information and retrieving medical news.
     """
     
-    def __init__(self, api_key=None, rate_limit=5):
+    def __init__(self, api_key=None, rate_limit=5, cache=None, limiter=None, acquire_timeout=SERP_ACQUIRE_TIMEOUT,
+                 backend=None, sources=None):
         """
         Initialize the SERP service with API key and rate limiting.
         
         Args:
             api_key (str, optional): The SERP API key. If not provided, will try to get from environment.
-            rate_limit (int, optional): Maximum number of requests per minute. Defaults to 5.
+                                     Not needed when a backend is given.
+            rate_limit (int, optional): Maximum number of requests per minute across the process. Defaults to 5.
+            cache (SerpCache, optional): Response cache. Defaults to the shared persistent SERP cache.
+            limiter (TokenBucket, optional): Rate limiter. Defaults to the process-wide limiter for rate_limit.
+            acquire_timeout (float, optional): Maximum seconds to wait for the rate limiter.
+                                               Defaults to SERP_ACQUIRE_TIMEOUT.
+            backend (optional): Search backend with a name and a search(params) method returning
+                                SerpAPI-shaped responses (see search_backends). Defaults to the live SerpAPI backend.
+            sources (SourceMatcher, optional): Trusted source matcher. Defaults to the shared matcher.
         """
-        self.api_key = api_key or os.environ.get("SERP_API_KEY")
-        if not self.api_key:
-            raise ValueError("SERP API key is required")
+        self.backend = backend or SerpApiBackend(api_key)
+        self.api_key = getattr(self.backend, "api_key", None)
         
         self.rate_limit = rate_limit
-        self.last_request_time = 0
+        self.cache = cache or get_serp_cache()
+        self.limiter = limiter or get_serp_rate_limiter(rate_limit)
+        self.acquire_timeout = acquire_timeout
+        self.sources = sources or get_source_matcher()
     
     def _rate_limit(self):
-        """Implement rate limiting to avoid exceeding API limits."""
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
+        """
+        Take a request token from the process-wide rate limiter.
+        Waits at most acquire_timeout seconds, so a busy limiter never stalls a chat turn for long.
         
-        # If less than rate limit seconds have passed
-        if time_since_last < (60 / self.rate_limit):
-            sleep_time = (60 / self.rate_limit) - time_since_last
-            time.sleep(sleep_time)
+        Raises:
+            SerpRateLimitError: If no token is available in time
+        """
+        if not self.limiter.acquire(timeout=self.acquire_timeout):
+            raise SerpRateLimitError("SERP API rate limit reached")
+    
+    def _cached(self, endpoint, query, params, fetch, max_age=None):
+        """
+        Return a cached response, or fetch and cache it on a miss.
+        Concurrent misses for the same request, from any session, share a single API call.
         
-        self.last_request_time = time.time()
+        Args:
+            endpoint (str): The SERP endpoint ("search" or "news")
+            query (str): The search query
+            params (dict): Other request parameters that change the results
+            fetch (callable): Called with no arguments to get the response from the API
+            max_age (float, optional): Refetch cached responses older than this many seconds.
+                                       Defaults to the cache's TTL for the endpoint.
+            
+        Returns:
+            list: The response
+        """
+        results = self.cache.get(endpoint, query, params, max_age=max_age)
+        if results is not None:
+            return results
+        
+        def load():
+            # A call that finished just before this one started may have filled the cache
+            cached = self.cache.get(endpoint, query, params, record_stats=False, max_age=max_age)
+            if cached is not None:
+                return cached
+            fetched = fetch()
+            self.cache.put(endpoint, query, params, fetched)
+            return fetched
+        
+        return _in_flight_requests.do(make_cache_key(endpoint, query, params), load)
     
-    @lru_cache(maxsize=100)
     def search_medical_info(self, query, num_results=5):
         """
         Search for medical information using SERP API.
-        Results are cached to reduce API calls for identical queries.
+        Results are cached across sessions and restarts to reduce API calls for identical queries.
         
         Args:
             query (str): The search query
@@ -50,6 +151,11 @@ class SerpService:
         Returns:
             list: List of search results with title, link, and snippet
         """
+        return self._cached("search", query, {"num": num_results, "backend": self.backend.name},
+                            lambda: self._fetch_medical_info(query, num_results))
+    
+    def _fetch_medical_info(self, query, num_results):
+        """Request medical information from the search backend."""
         # Apply rate limiting
         self._rate_limit()
         
@@ -65,12 +171,11 @@ class SerpService:
         params = {
             "engine": "google",
             "q": full_query,
-            "api_key": self.api_key,
             "num": num_results,
             "safe": "active"  # Safe search to filter inappropriate content
         }
         
-        results = serpapi.search(params)
+        results = self.backend.search(params)
         
         # Extract and format the organic results
         formatted_results = []
@@ -78,31 +183,53 @@ class SerpService:
             for result in results["organic_results"][:num_results]:
                 # Check if the source is a reputable medical source
                 url = result.get("link", "")
-                is_trusted = self.validate_medical_source(url)
+                trust_tier = self.sources.tier(url)
                 
                 formatted_results.append({
                     "title": result.get("title", ""),
                     "link": url,
                     "snippet": result.get("snippet", ""),
                     "source": "SERP API",
-                    "is_trusted": is_trusted
+                    "is_trusted": trust_tier is not None,
+                    "trust_tier": trust_tier
                 })
         
         return formatted_results
     
-    @lru_cache(maxsize=50)
-    def get_medical_news(self, topic, num_results=3):
+    def get_medical_news(self, topic, num_results=3, max_age=None):
         """
         Get latest medical news on a specific topic.
-        Results are cached to reduce API calls for identical queries.
+        Results are cached for a few hours so news stays current.
         
         Args:
             topic (str): The medical topic to search for
             num_results (int, optional): Number of news results to return. Defaults to 3.
+            max_age (float, optional): Refetch cached news older than this many seconds. Defaults to the news TTL.
             
         Returns:
             list: List of news results
         """
+        return self._cached("news", topic, {"num": num_results, "backend": self.backend.name},
+                            lambda: self._fetch_medical_news(topic, num_results), max_age=max_age)
+    
+    def get_cached_medical_news(self, topic, num_results=3, max_age=None, record_stats=True):
+        """
+        Get medical news on a topic from the cache only, without calling the API.
+        
+        Args:
+            topic (str): The medical topic
+            num_results (int, optional): Number of news results. Defaults to 3.
+            max_age (float, optional): Ignore cached news older than this many seconds. Defaults to the news TTL.
+            record_stats (bool, optional): Whether to count the lookup as a cache hit or miss. Defaults to True.
+            
+        Returns:
+            list or None: The cached news results, or None if none are cached
+        """
+        return self.cache.get("news", topic, {"num": num_results, "backend": self.backend.name},
+                              record_stats=record_stats, max_age=max_age)
+    
+    def _fetch_medical_news(self, topic, num_results):
+        """Request medical news from the search backend."""
         # Apply rate limiting
         self._rate_limit()
         
@@ -118,13 +245,12 @@ class SerpService:
         params = {
             "engine": "google",
             "q": full_query,
-            "api_key": self.api_key,
             "num": num_results,
             "tbm": "nws",  # News search
             "tbs": "qdr:m"  # Last month
         }
         
-        results = serpapi.search(params)
+        results = self.backend.search(params)
         
         # Extract and format the news results
         news_results = []
@@ -132,7 +258,7 @@ class SerpService:
             for result in results["news_results"][:num_results]:
                 # Check if the source is a reputable medical source
                 url = result.get("link", "")
-                is_trusted = self.validate_medical_source(url)
+                trust_tier = self.sources.tier(url)
                 
                 news_results.append({
                     "title": result.get("title", ""),
@@ -140,31 +266,38 @@ class SerpService:
                     "snippet": result.get("snippet", ""),
                     "source": result.get("source", ""),
                     "date": result.get("date", ""),
-                    "is_trusted": is_trusted
+                    "is_trusted": trust_tier is not None,
+                    "trust_tier": trust_tier
                 })
         
         return news_results
     
-    def validate_medical_source(self, url):
+    def validate_medical_source(self, url, min_tier=None):
         """
         Validate if a URL is from a reputable medical source.
         
         Args:
             url (str): The URL to validate
+            min_tier (str, optional): Least reputable tier accepted (see source_trust.TRUST_TIERS).
+                                      Defaults to any trusted tier.
             
         Returns:
             bool: True if the URL is from a reputable medical source, False otherwise
         """
-        trusted_domains = [
-            "nih.gov", "cdc.gov", "who.int", "mayoclinic.org", "clevelandclinic.org",
-            "hopkinsmedicine.org", "health.harvard.edu", "medlineplus.gov", "webmd.com",
-            "healthline.com", "medicalnewstoday.com", "nejm.org", "jamanetwork.com",
-            "thelancet.com", "bmj.com", "nature.com", "science.org", "cell.com",
-            "pubmed.ncbi.nlm.nih.gov", "uptodate.com", "aafp.org", "aap.org", "heart.org",
-            "cancer.gov", "cancer.org", "diabetes.org", "psychiatry.org", "acog.org"
-        ]
+        return self.sources.is_trusted(url, min_tier)
+    
+    def rank_by_trust(self, results):
+        """
+        Order results from the most to the least reputable source, keeping the
+        original order within a tier.
         
-        return any(domain in url.lower() for domain in trusted_domains)
+        Args:
+            results (list): Search or news results
+            
+        Returns:
+            list: The results, trusted sources first
+        """
+        return sorted(results, key=lambda result: self.sources.rank(result.get("trust_tier")))
     
     def generate_medical_disclaimer(self, search_results):
         """
@@ -192,3 +325,121 @@ class SerpService:
         disclaimer += "Information from web searches is not a substitute for professional medical advice, diagnosis, or treatment."
         
         return disclaimer
+
+
+def normalize_result_url(url):
+    """
+    Normalize a result URL for duplicate detection.
+    
+    Args:
+        url (str): The result URL
+        
+    Returns:
+        str: Host (without "www.") plus path, lowercased, without query fragment or trailing slash
+    """
+    parts = urlsplit(url.strip().lower())
+    host = parts.netloc[4:] if parts.netloc.startswith("www.") else parts.netloc
+    path = parts.path.rstrip("/")
+    return f"{host}{path}?{parts.query}" if parts.query else f"{host}{path}"
+
+def merge_search_results(result_lists):
+    """
+    Merge the results of several searches, dropping duplicate URLs.
+    Results are interleaved (first result of each search, then the second, ...) so
+    every query is represented near the top.
+    
+    Args:
+        result_lists (list): Result lists, in query order
+        
+    Returns:
+        list: Merged results without duplicates
+    """
+    merged = []
+    seen = set()
+    for rank in range(max((len(results) for results in result_lists), default=0)):
+        for results in result_lists:
+            if rank >= len(results):
+                continue
+            result = results[rank]
+            key = normalize_result_url(result.get("link", ""))
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(result)
+    return merged
+
+class AsyncSerpService:
+    """
+    Async front end to a SerpService.
+    Each search runs on a bounded pool of worker threads through the service's cache,
+    request coalescing and rate limiter, so several queries can be searched concurrently
+    from an event loop under a shared deadline. The backend's own request timeout ends
+    searches that are abandoned at the deadline, so they do not hold workers for long.
+    """
+    
+    def __init__(self, service, executor=None):
+        """
+        Initialize the async service.
+        
+        Args:
+            service (SerpService): The service that performs the searches
+            executor (Executor, optional): Threads that run the searches. Defaults to the shared search pool.
+        """
+        self.service = service
+        self.executor = executor or get_serp_executor()
+    
+    async def search_medical_info(self, query, num_results=5, timeout=None):
+        """
+        Search for medical information without blocking the event loop.
+        
+        Args:
+            query (str): The search query
+            num_results (int, optional): Number of results to return. Defaults to 5.
+            timeout (float, optional): Maximum seconds to wait. Defaults to None (no limit).
+            
+        Returns:
+            list: List of search results
+        """
+        search = asyncio.get_running_loop().run_in_executor(
+            self.executor, self.service.search_medical_info, query, num_results
+        )
+        return await asyncio.wait_for(search, timeout)
+    
+    async def search_many(self, queries, num_results=5, deadline=SERP_SEARCH_DEADLINE):
+        """
+        Search several queries concurrently and merge whatever finishes before the deadline.
+        Searches that fail or are still running at the deadline are left out; a search
+        that completes later still fills the cache for the next request.
+        
+        Args:
+            queries (list): The search queries
+            num_results (int, optional): Number of results per query. Defaults to 5.
+            deadline (float, optional): Seconds to wait for all searches. Defaults to SERP_SEARCH_DEADLINE.
+            
+        Returns:
+            list: Merged results, deduplicated by URL
+            
+        Raises:
+            SerpRateLimitError: If no search succeeded because the rate limit was reached
+        """
+        tasks = [asyncio.create_task(self.search_medical_info(query, num_results)) for query in dict.fromkeys(queries)]
+        if not tasks:
+            return []
+        
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+        
+        result_lists = []
+        rate_limited = False
+        for task in tasks:
+            if task in done and task.exception() is None:
+                result_lists.append(task.result())
+            elif task in done and isinstance(task.exception(), SerpRateLimitError):
+                rate_limited = True
+            elif task in done:
+                print(f"SERP search failed: {task.exception()}")
+        
+        if rate_limited and not result_lists:
+            raise SerpRateLimitError("SERP rate limit reached for every query")
+        return merge_search_results(result_lists)
@@ -1,15 +1,115 @@
 import streamlit as st
-import re
-from serp_service import SerpService
+import asyncio
+from llm_client import get_event_loop, run_async
+from medical_terms import get_term_recognizer
+from news_prefetch import get_news_prefetcher
+from search_backends import LOCAL_SEARCH_CORPUS, create_search_backend
+from serp_service import AsyncSerpService, SerpService, SerpRateLimitError
+
+# Maximum seconds to wait for a speculative search once the response is ready
+PREFETCH_WAIT_TIMEOUT = 15
+
+# Maximum number of extracted medical entities searched for one message
+MAX_SEARCH_ENTITIES = 3
+
+# Phrases in a response that indicate uncertainty or need for more information
+UNCERTAINTY_PHRASES = [
+    "I don't have specific information",
+    "I don't have the latest",
+    "I'm not aware of the latest",
+    "I don't have access to",
+    "I don't have enough information",
+    "I'm not familiar with",
+    "I would need to research",
+    "I can't provide details on",
+    "I don't have current data",
+    "I don't have up-to-date",
+    "I'm not able to access",
+    "I don't have the most recent",
+    "without access to",
+    "would require access to",
+    "I cannot access",
+    "I'm limited in my ability to",
+    "I don't have information about specific",
+    "I cannot provide specific"
+]
+
+# Phrases in user input asking about recent developments
+RECENCY_PHRASES = [
+    "latest research",
+    "recent studies",
+    "new treatment",
+    "latest guidelines",
+    "recent development",
+    "new findings",
+    "latest news",
+    "current research",
+    "recent advances",
+    "new discoveries",
+    "latest medical",
+    "recent medical",
+    "new medical",
+    "latest health",
+    "recent health",
+    "new health",
+    "latest clinical",
+    "recent clinical",
+    "new clinical",
+    "latest therapy",
+    "recent therapy",
+    "new therapy",
+    "latest drug",
+    "recent drug",
+    "new drug"
+]
+
+# Phrases in user input asking about a specific medical condition or treatment
+MEDICAL_QUERY_INDICATORS = [
+    "what is",
+    "what are",
+    "how to treat",
+    "how to manage",
+    "symptoms of",
+    "causes of",
+    "treatment for",
+    "cure for",
+    "therapy for",
+    "medication for",
+    "drug for",
+    "how do you treat",
+    "how do you manage",
+    "how do you cure",
+    "how do you diagnose",
+    "how is it diagnosed",
+    "how is it treated",
+    "how is it managed",
+    "how is it cured",
+    "what are the symptoms of",
+    "what are the causes of",
+    "what are the treatments for",
+    "what are the medications for",
+    "what are the therapies for",
+    "what are the drugs for"
+]
 
 def initialize_serp_service():
     """
     Initialize the SERP service with API key from Streamlit secrets.
+    Setting SERP_BACKEND = "local" serves searches from the on-disk corpus in
+    SERP_LOCAL_CORPUS instead, with optional SERP_LOCAL_LATENCY seconds per search.
     
     Returns:
         SerpService or None: Initialized SERP service or None if initialization fails
     """
     try:
+        if st.secrets.get("SERP_BACKEND") == "local":
+            backend = create_search_backend(
+                "local",
+                corpus_path=st.secrets.get("SERP_LOCAL_CORPUS", LOCAL_SEARCH_CORPUS),
+                latency=float(st.secrets.get("SERP_LOCAL_LATENCY", 0.0))
+            )
+            return SerpService(backend=backend)
+        
         api_key = st.secrets.get("SERP_API_KEY")
         if not api_key:
             st.warning("SERP API key not found in secrets. Web search features will be disabled.")
@@ -20,6 +120,28 @@ def initialize_serp_service():
         st.error(f"Error initializing SERP service: {e}")
         return None
 
+def assess_input_for_serp(user_input):
+    """
+    Evaluate the part of the SERP decision that depends only on the user input.
+    This can run before the agent responds, so a search can be started speculatively.
+    
+    Args:
+        user_input (str): The user's input message
+        
+    Returns:
+        str or None: "required" if the user asks about recent developments, "possible" if it is
+                     a medical query that is enhanced only when the response is short, otherwise None
+    """
+    # Check if user is explicitly asking about recent developments
+    if any(phrase.lower() in user_input.lower() for phrase in RECENCY_PHRASES):
+        return "required"
+    
+    # Check if the user is asking about a specific medical condition or treatment
+    if any(indicator.lower() in user_input.lower() for indicator in MEDICAL_QUERY_INDICATORS):
+        return "possible"
+    
+    return None
+
 def should_enhance_with_serp(user_input, agent_response):
     """
     Determine if the agent's response should be enhanced with SERP data.
@@ -31,173 +153,109 @@ def should_enhance_with_serp(user_input, agent_response):
     Returns:
         bool: True if the response should be enhanced, False otherwise
     """
-    # Check if the response indicates uncertainty or need for more information
-    uncertainty_phrases = [
-        "I don't have specific information",
-        "I don't have the latest",
-        "I'm not aware of the latest",
-        "I don't have access to",
-        "I don't have enough information",
-        "I'm not familiar with",
-        "I would need to research",
-        "I can't provide details on",
-        "I don't have current data",
-        "I don't have up-to-date",
-        "I'm not able to access",
-        "I don't have the most recent",
-        "without access to",
-        "would require access to",
-        "I cannot access",
-        "I'm limited in my ability to",
-        "I don't have information about specific",
-        "I cannot provide specific"
-    ]
-    
-    needs_enhancement = any(phrase.lower() in agent_response.lower() for phrase in uncertainty_phrases)
+    input_assessment = assess_input_for_serp(user_input)
     
-    # Also check if user is explicitly asking about recent developments
-    recency_phrases = [
-        "latest research",
-        "recent studies",
-        "new treatment",
-        "latest guidelines",
-        "recent development",
-        "new findings",
-        "latest news",
-        "current research",
-        "recent advances",
-        "new discoveries",
-        "latest medical",
-        "recent medical",
-        "new medical",
-        "latest health",
-        "recent health",
-        "new health",
-        "latest clinical",
-        "recent clinical",
-        "new clinical",
-        "latest therapy",
-        "recent therapy",
-        "new therapy",
-        "latest drug",
-        "recent drug",
-        "new drug"
-    ]
-    
-    needs_enhancement = needs_enhancement or any(phrase.lower() in user_input.lower() for phrase in recency_phrases)
-    
-    # Check if the user is asking about a specific medical condition or treatment
-    medical_query_indicators = [
-        "what is",
-        "what are",
-        "how to treat",
-        "how to manage",
-        "symptoms of",
-        "causes of",
-        "treatment for",
-        "cure for",
-        "therapy for",
-        "medication for",
-        "drug for",
-        "how do you treat",
-        "how do you manage",
-        "how do you cure",
-        "how do you diagnose",
-        "how is it diagnosed",
-        "how is it treated",
-        "how is it managed",
-        "how is it cured",
-        "what are the symptoms of",
-        "what are the causes of",
-        "what are the treatments for",
-        "what are the medications for",
-        "what are the therapies for",
-        "what are the drugs for"
-    ]
+    # Check if the response indicates uncertainty or need for more information
+    needs_enhancement = any(phrase.lower() in agent_response.lower() for phrase in UNCERTAINTY_PHRASES)
     
-    # Check if the user's input contains any of the medical query indicators
-    contains_medical_query = any(indicator.lower() in user_input.lower() for indicator in medical_query_indicators)
+    # Also enhance if user is explicitly asking about recent developments
+    needs_enhancement = needs_enhancement or input_assessment == "required"
     
     # Check if the agent's response is relatively short, which might indicate limited information
     is_short_response = len(agent_response.split()) < 100
     
     # Enhance if it's a medical query with a short response
-    needs_enhancement = needs_enhancement or (contains_medical_query and is_short_response)
+    needs_enhancement = needs_enhancement or (input_assessment == "possible" and is_short_response)
     
     return needs_enhancement
 
 def extract_medical_entities(text):
     """
-    Extract potential medical entities from text.
-    This is a simplified approach - in production, use a medical NER model.
+    Extract medical entities from text using the local terminology list.
     
     Args:
         text (str): The text to extract entities from
         
     Returns:
-        list: List of potential medical entities
+        list: Canonical names of the conditions, drugs, procedures and symptoms mentioned,
+              most useful search query first
+    """
+    return [entity["term"] for entity in get_term_recognizer().find(text)]
+
+def get_search_queries(user_input, limit=MAX_SEARCH_ENTITIES):
     """
-    # Common medical condition suffixes
-    medical_suffixes = [
-        "itis", "emia", "oma", "pathy", "osis", "iasis", "ism", 
-        "disease", "disorder", "syndrome", "infection", "condition"
-    ]
+    Build the SERP search queries for a user message.
     
-    # Extract words that might be medical conditions
-    words = re.findall(r'\b[a-zA-Z]+(?:-[a-zA-Z]+)*\b', text)
+    Args:
+        user_input (str): The user's input message
+        limit (int, optional): Maximum number of queries. Defaults to MAX_SEARCH_ENTITIES.
+        
+    Returns:
+        list: Up to limit extracted medical entities, or the whole input if none was found
+    """
+    # Extract potential medical entities from the user input
+    medical_entities = extract_medical_entities(user_input)
     
-    # Filter for potential medical terms
-    medical_entities = []
-    for word in words:
-        # Check if the word ends with a medical suffix
-        if any(word.lower().endswith(suffix) for suffix in medical_suffixes):
-            medical_entities.append(word)
-        # Check if the word is capitalized (might be a proper medical term)
-        elif word[0].isupper() and len(word) > 3 and word.lower() not in ["what", "how", "when", "where", "why", "who", "which"]:
-            medical_entities.append(word)
+    # If no medical entities found, use the whole user input as the search query
+    if not medical_entities:
+        return [user_input]
     
-    # Add multi-word medical terms
-    multi_word_patterns = [
-        r'\b[A-Z][a-z]+ (disease|disorder|syndrome|infection|condition)\b',
-        r'\b[a-z]+ (disease|disorder|syndrome|infection|condition)\b',
-        r'\b(Type [0-9]+|type [0-9]+) [a-zA-Z]+\b'
-    ]
+    return medical_entities[:limit]
+
+def start_serp_prefetch(user_input):
+    """
+    Start SERP searches in the background while the agent is generating its response.
+    Only started when the input alone requires enhancement (questions about recent
+    developments), so speculative searches are not spent on responses that turn out
+    long enough to need none. The searches for all extracted entities run concurrently
+    on the shared event loop.
     
-    for pattern in multi_word_patterns:
-        matches = re.findall(pattern, text)
-        if matches:
-            multi_word_terms = re.findall(pattern, text)
-            medical_entities.extend(multi_word_terms)
+    Args:
+        user_input (str): The user's input message
+        
+    Returns:
+        Future or None: The pending merged search results, or None if no search was started
+    """
+    serp_service = st.session_state.get('serp_service')
+    if serp_service is None or assess_input_for_serp(user_input) != "required":
+        return None
     
-    return list(set(medical_entities))
+    try:
+        return asyncio.run_coroutine_threadsafe(
+            AsyncSerpService(serp_service).search_many(get_search_queries(user_input)),
+            get_event_loop()
+        )
+    except Exception as e:
+        print(f"Error starting SERP prefetch: {e}")
+        return None
 
-def enhance_with_serp(user_input, agent_response):
+def enhance_with_serp(user_input, agent_response, prefetch=None):
     """
     Enhance the agent's response with SERP data when appropriate.
     
     Args:
         user_input (str): The user's input message
         agent_response (str): The agent's initial response
+        prefetch (Future, optional): Speculative search started by start_serp_prefetch.
+                                     Used if the response needs enhancement, otherwise discarded.
         
     Returns:
         str: Enhanced response with SERP data if applicable, otherwise the original response
     """
     if not should_enhance_with_serp(user_input, agent_response) or 'serp_service' not in st.session_state:
+        # Discard the speculative search (it is still cached by the service if it completes)
+        if prefetch is not None:
+            prefetch.cancel()
         return agent_response
     
     try:
-        # Extract potential medical entities from the user input
-        medical_entities = extract_medical_entities(user_input)
-        
-        # If no medical entities found, use the whole user input as the search query
-        if not medical_entities:
-            search_query = user_input
+        # Get search results, preferring the speculative search if one was started
+        if prefetch is not None:
+            search_results = prefetch.result(timeout=PREFETCH_WAIT_TIMEOUT)
         else:
-            # Use the first medical entity as the search query
-            search_query = medical_entities[0]
-        
-        # Get search results
-        search_results = st.session_state.serp_service.search_medical_info(search_query)
+            search_results = run_async(
+                AsyncSerpService(st.session_state.serp_service).search_many(get_search_queries(user_input))
+            )
         
         if search_results:
             # Generate appropriate disclaimer
@@ -206,12 +264,8 @@ def enhance_with_serp(user_input, agent_response):
             # Format the search results as a supplement to the agent's response
             serp_supplement = "\n\n**Additional Information from Medical Sources:**\n\n"
             
-            # Prioritize trusted sources
-            trusted_results = [result for result in search_results if result.get("is_trusted", False)]
-            untrusted_results = [result for result in search_results if not result.get("is_trusted", False)]
-            
-            # Use trusted results first, then untrusted if needed
-            results_to_show = trusted_results + untrusted_results
+            # Use the most reputable sources first, then untrusted ones if needed
+            results_to_show = st.session_state.serp_service.rank_by_trust(search_results)
             
             for i, result in enumerate(results_to_show[:3], 1):
                 source_indicator = "✓ " if result.get("is_trusted", False) else ""
@@ -225,6 +279,9 @@ def enhance_with_serp(user_input, agent_response):
             enhanced_response = agent_response + serp_supplement
             return enhanced_response
         
+    except SerpRateLimitError:
+        # Skip enrichment rather than make the user wait for the rate limiter
+        print("SERP rate limit reached, returning the response without web enrichment")
     except Exception as e:
         # Log the error but return the original response
         print(f"Error enhancing response with SERP data: {e}")
@@ -232,9 +289,23 @@ def enhance_with_serp(user_input, agent_response):
     # Return the original response if no enhancement was needed or possible
     return agent_response
 
+def track_news_topics(topics):
+    """
+    Report the topics this session is discussing to the background news prefetcher,
+    which keeps their news in the shared SERP cache.
+    
+    Args:
+        topics (list): Topic names, e.g. the session's top diagnoses
+    """
+    if not st.session_state.get('serp_service') or not topics:
+        return
+    get_news_prefetcher(st.session_state.serp_service).track(st.session_state.llm_session_id, topics)
+
 def get_latest_medical_news(topic=None):
     """
     Get the latest medical news on a specific topic or general medical news.
+    News is only read from the cache, which the background news prefetcher fills;
+    on a miss the topic is reported to the prefetcher and no news is shown this time.
     
     Args:
         topic (str, optional): The medical topic to get news for. Defaults to None.
@@ -242,26 +313,24 @@ def get_latest_medical_news(topic=None):
     Returns:
         str: Formatted medical news or empty string if no news found
     """
-    if 'serp_service' not in st.session_state:
+    if not st.session_state.get('serp_service'):
         return ""
     
     try:
         # If no topic provided, use general medical news
         search_topic = topic or "medical health research"
         
-        # Get news results
-        news_results = st.session_state.serp_service.get_medical_news(search_topic)
+        # Read news prefetched in the background
+        news_results = st.session_state.serp_service.get_cached_medical_news(search_topic)
+        if news_results is None:
+            track_news_topics([search_topic])
         
         if news_results:
             # Format the news results
             news_formatted = "\n\n**Latest Medical News:**\n\n"
             
-            # Prioritize trusted sources
-            trusted_news = [result for result in news_results if result.get("is_trusted", False)]
-            untrusted_news = [result for result in news_results if not result.get("is_trusted", False)]
-            
-            # Use trusted news first, then untrusted if needed
-            news_to_show = trusted_news + untrusted_news
+            # Use the most reputable sources first, then untrusted ones if needed
+            news_to_show = st.session_state.serp_service.rank_by_trust(news_results)
             
             for i, result in enumerate(news_to_show[:3], 1):
                 source_indicator = "✓ " if result.get("is_trusted", False) else ""
@@ -0,0 +1,66 @@
+import threading
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls that share a key.
+    The first caller for a key runs the function; callers arriving while it is in flight
+    wait for it and receive the same result (or exception) instead of repeating the work.
+    """
+
+    def __init__(self):
+        """Initialize with no calls in flight."""
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "coalesced": 0}
+
+    def do(self, key, fn):
+        """
+        Run fn for key, or wait for the call already in flight for key.
+
+        Args:
+            key (hashable): Identifies calls that can share a result
+            fn (callable): Called with no arguments by the first caller
+
+        Returns:
+            The result of fn
+
+        Raises:
+            Exception: Whatever fn raised, in every caller that shared the call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.stats["coalesced"] += 1
+                leader = False
+            else:
+                call = {"done": threading.Event(), "result": None, "error": None}
+                self._calls[key] = call
+                self.stats["calls"] += 1
+                leader = True
+
+        if not leader:
+            call["done"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+
+        try:
+            call["result"] = fn()
+            return call["result"]
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["done"].set()
+
+    def in_flight(self):
+        """
+        Get the number of calls currently in flight.
+
+        Returns:
+            int: Number of keys being computed
+        """
+        with self._lock:
+            return len(self._calls)
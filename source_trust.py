@@ -0,0 +1,140 @@
+import json
+import os
+import threading
+from urllib.parse import urlsplit
+
+# Optional JSON file that replaces the default trusted sources: {"tier": ["domain", ...], ...}
+TRUSTED_SOURCES_PATH = os.path.join("data", "trusted_sources.json")
+
+# Reputation tiers, most reputable first
+TRUST_TIERS = ("authoritative", "clinical", "consumer")
+
+# Trusted medical domains by tier. A domain also covers its subdomains.
+DEFAULT_TRUSTED_SOURCES = {
+    "authoritative": [
+        "nih.gov", "cdc.gov", "who.int", "medlineplus.gov", "cancer.gov", "pubmed.ncbi.nlm.nih.gov"
+    ],
+    "clinical": [
+        "mayoclinic.org", "clevelandclinic.org", "hopkinsmedicine.org", "health.harvard.edu",
+        "nejm.org", "jamanetwork.com", "thelancet.com", "bmj.com", "nature.com", "science.org",
+        "cell.com", "uptodate.com", "aafp.org", "aap.org", "heart.org", "cancer.org",
+        "diabetes.org", "psychiatry.org", "acog.org"
+    ],
+    "consumer": [
+        "webmd.com", "healthline.com", "medicalnewstoday.com"
+    ]
+}
+
+class SourceMatcher:
+    """
+    Classifies result URLs by the reputation tier of their domain.
+    The URL's host is parsed and its label suffixes (a.b.nih.gov, b.nih.gov, nih.gov, gov)
+    are looked up in a hash table, so matching is linear in the URL length and only whole
+    domains match: "nih.gov.example.com" and "notnih.gov" are not trusted.
+    """
+
+    def __init__(self, sources=None, tiers=TRUST_TIERS):
+        """
+        Initialize the matcher.
+
+        Args:
+            sources (dict, optional): Tier -> list of domains. Defaults to DEFAULT_TRUSTED_SOURCES.
+            tiers (tuple, optional): Tier names, most reputable first. Defaults to TRUST_TIERS.
+        """
+        sources = DEFAULT_TRUSTED_SOURCES if sources is None else sources
+        self.tiers = tuple(tiers) + tuple(tier for tier in sources if tier not in tiers)
+        self.domains = {}
+        for tier in self.tiers:
+            for domain in sources.get(tier, []):
+                # A domain listed in several tiers keeps the most reputable one
+                self.domains.setdefault(domain.strip().lower().strip("."), tier)
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Load trusted sources from a JSON file.
+
+        Args:
+            path (str): Path of a JSON object mapping tier names to lists of domains
+
+        Returns:
+            SourceMatcher: Matcher for the listed domains
+        """
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def tier(self, url):
+        """
+        Get the reputation tier of a URL.
+
+        Args:
+            url (str): The URL (the scheme may be omitted)
+
+        Returns:
+            str or None: The tier of the most specific matching domain, or None if untrusted
+        """
+        if "://" not in url:
+            url = "//" + url
+        try:
+            parts = urlsplit(url.strip())
+            host = parts.hostname
+        except ValueError:
+            return None
+        if not host or parts.scheme not in ("", "http", "https"):
+            return None
+
+        labels = host.rstrip(".").split(".")
+        for i in range(len(labels)):
+            tier = self.domains.get(".".join(labels[i:]))
+            if tier is not None:
+                return tier
+        return None
+
+    def is_trusted(self, url, min_tier=None):
+        """
+        Check whether a URL is from a trusted medical source.
+
+        Args:
+            url (str): The URL
+            min_tier (str, optional): Least reputable tier accepted. Defaults to any tier.
+
+        Returns:
+            bool: True if the URL's domain is trusted at min_tier or better
+        """
+        tier = self.tier(url)
+        if tier is None:
+            return False
+        return min_tier is None or self.rank(tier) <= self.rank(min_tier)
+
+    def rank(self, tier):
+        """
+        Get the position of a tier, for sorting.
+
+        Args:
+            tier (str or None): The tier name
+
+        Returns:
+            int: 0 for the most reputable tier; untrusted and unknown tiers sort last
+        """
+        return self.tiers.index(tier) if tier in self.tiers else len(self.tiers)
+
+# Shared source matcher, created on first use
+_source_matcher = None
+_source_matcher_lock = threading.Lock()
+
+def get_source_matcher():
+    """
+    Get the source matcher shared by all sessions in this process.
+    Trusted sources are read from TRUSTED_SOURCES_PATH if it exists.
+
+    Returns:
+        SourceMatcher: The shared source matcher
+    """
+    global _source_matcher
+    with _source_matcher_lock:
+        if _source_matcher is None:
+            if os.path.exists(TRUSTED_SOURCES_PATH):
+                _source_matcher = SourceMatcher.from_file(TRUSTED_SOURCES_PATH)
+            else:
+                _source_matcher = SourceMatcher()
+        return _source_matcher
@@ -0,0 +1,78 @@
+import json
+from pydantic import BaseModel, Field
+from agents import Agent, Runner
+from llm_client import estimate_tokens, get_admission_controller, run_async
+
+# Default model for task-specific agents
+DEFAULT_AGENT_MODEL = "o4-mini-2025-04-16"
+
+class BMIAssessment(BaseModel):
+    """Structured response of the BMI calculation agent."""
+    bmi_value: float = Field(description="The calculated BMI value, rounded to 1 decimal place")
+    bmi_category: str = Field(description="The BMI category (underweight, normal weight, overweight, obese)")
+    health_assessment: str = Field(description="A brief health assessment based on the BMI category")
+    recommendations: str = Field(description="General health recommendations based on the BMI category")
+
+def create_structured_agent(name, instructions, output_type, model=DEFAULT_AGENT_MODEL):
+    """
+    Create an agent whose responses are constrained to a schema.
+    The schema is sent to the model as a structured output format, so the final
+    output is a validated instance of output_type rather than free-form text.
+
+    Args:
+        name (str): The agent's name
+        instructions (str): The agent's instructions
+        output_type (type): Pydantic model describing the response
+        model (str, optional): The model to use. Defaults to DEFAULT_AGENT_MODEL.
+
+    Returns:
+        Agent: The configured agent
+    """
+    return Agent(name=name, instructions=instructions, model=model, output_type=output_type)
+
+def parse_structured_output(output, output_type):
+    """
+    Convert an agent's final output into an instance of output_type with a single parse.
+
+    Args:
+        output: The agent's final output (an instance, a dict or a JSON string)
+        output_type (type): Pydantic model describing the response
+
+    Returns:
+        BaseModel: The validated response object
+
+    Raises:
+        pydantic.ValidationError: If the output does not match the schema
+    """
+    # Fast path: the SDK already validated the structured output
+    if isinstance(output, output_type):
+        return output
+    if isinstance(output, dict):
+        return output_type.model_validate(output)
+    return output_type.model_validate_json(output)
+
+def run_structured_agent(agent, prompt, session_id="default"):
+    """
+    Run a structured agent on the shared event loop through the admission controller,
+    debiting the estimated tokens of the request from the shared token budget.
+
+    Args:
+        agent (Agent): An agent created with create_structured_agent
+        prompt (str): The input for the agent
+        session_id (str, optional): Identifier of the calling session. Defaults to "default".
+
+    Returns:
+        BaseModel: The validated response object
+    """
+    # The instructions, the response schema and the prompt are all sent to the model
+    messages = [
+        {"role": "system", "content": agent.instructions},
+        {"role": "system", "content": json.dumps(agent.output_type.model_json_schema())},
+        {"role": "user", "content": prompt}
+    ]
+    result = run_async(get_admission_controller().run(
+        session_id,
+        lambda: Runner.run(agent, prompt),
+        estimated_tokens=estimate_tokens(messages)
+    ))
+    return parse_structured_output(result.final_output, agent.output_type)
@@ -0,0 +1,113 @@
+"""
+Test script for the page-level retrieval index used for uploaded medical records.
+This script checks page chunking, BM25 ranking and retrieval across several records.
+
+Usage:
+    python test_document_index.py
+"""
+
+import time
+from document_index import BM25Index, CorpusIndex, build_page_index, chunk_page, tokenize
+
+def test_chunking_keeps_page_numbers():
+    """Short pages are one chunk; long pages are split into labelled sections."""
+    assert chunk_page(3, "Short page") == [{"page": 3, "section": 1, "text": "Short page"}]
+    assert chunk_page(1, "   ") == []
+
+    long_page = "\n\n".join(f"Paragraph {i} " + "word " * 50 for i in range(20))
+    chunks = chunk_page(7, long_page, max_chars=1000)
+    print(f"Long page split into {len(chunks)} sections")
+
+    assert len(chunks) > 1
+    assert all(chunk["page"] == 7 for chunk in chunks)
+    assert all(len(chunk["text"]) <= 1000 for chunk in chunks)
+    assert [chunk["section"] for chunk in chunks] == list(range(1, len(chunks) + 1))
+
+def test_chunking_keeps_text_order():
+    """Short blocks around an over-long block without line breaks come out in page order."""
+    page = "\n\n".join(["First note", "x" * 250, "Second note", "y" * 120, "Third note"])
+    chunks = chunk_page(1, page, max_chars=100)
+
+    assert "".join(chunk["text"].replace("\n", "") for chunk in chunks) == page.replace("\n", "")
+    assert chunks[0]["text"] == "First note"
+    assert chunks[-1]["text"] == "y" * 20 + "\nThird note"
+
+def test_search_ranks_relevant_pages_first():
+    """The page that mentions the query terms is ranked above unrelated pages."""
+    pages = [
+        "Patient demographics. Name, address and insurance details.",
+        "Laboratory results: Hemoglobin A1c 7.2 % (reference 4.0-5.6). Glucose 145 mg/dL.",
+        "Imaging: chest x-ray shows no acute findings.",
+        "Medication list: metformin 500 mg twice daily."
+    ]
+    index = build_page_index(pages)
+    results = index.search("What was my A1c result?", k=2)
+    print(f"Top result: page {results[0]['page']} (score {results[0]['score']:.2f})")
+
+    assert len(index) == 4
+    assert results[0]["page"] == 2
+    assert index.search("metformin dose")[0]["page"] == 4
+    assert index.search("unrelated xyz") == []
+
+def test_tokenize_keeps_lab_values():
+    """Numbers with decimals survive tokenization so lab values can be matched."""
+    assert tokenize("A1c was 7.2 on the panel") == ["a1c", "7.2", "panel"]
+    assert BM25Index().search("anything") == []
+
+def test_corpus_cites_across_records():
+    """Questions are answered from whichever record holds the answer, with (filename, page) citations."""
+    corpus = CorpusIndex()
+    corpus.add_document("a", "labs_2023.pdf", build_page_index([
+        "Patient demographics and insurance.",
+        "Hemoglobin A1c 7.2 % on 2023-03-01."
+    ]))
+    corpus.add_document("b", "cardiology.pdf", build_page_index([
+        "Echocardiogram: ejection fraction 55 %.",
+        "Plan: continue lisinopril."
+    ]))
+
+    assert not corpus.add_document("a", "labs_2023.pdf", build_page_index(["duplicate"]))
+    assert corpus.documents == ["a", "b"]
+    assert len(corpus) == 4
+
+    top = corpus.search("ejection fraction")[0]
+    assert (top["filename"], top["page"]) == ("cardiology.pdf", 1)
+    top = corpus.search("A1c")[0]
+    assert (top["filename"], top["page"]) == ("labs_2023.pdf", 2)
+
+def test_corpus_respects_token_budget():
+    """Excerpts that would exceed the token budget are left out."""
+    corpus = CorpusIndex()
+    corpus.add_document("a", "long.pdf", build_page_index(["cholesterol " * 500, "cholesterol panel normal"]))
+
+    results = corpus.search_within_budget("cholesterol", token_budget=100)
+    assert [chunk["page"] for chunk in results] == [2]
+    assert sum(len(chunk["text"]) // 4 + 1 for chunk in results) <= 100
+
+def test_corpus_search_is_fast_for_many_records():
+    """Retrieval over dozens of records stays well under 100 ms."""
+    words = ["glucose", "cholesterol", "creatinine", "sodium", "potassium", "hemoglobin", "platelets",
+             "thyroid", "vitamin", "ferritin", "albumin", "bilirubin", "calcium", "chloride"]
+    corpus = CorpusIndex()
+    for record in range(40):
+        pages = [" ".join(words[(record + page + i) % len(words)] + f" {i}.{page}" for i in range(300))
+                 for page in range(50)]
+        corpus.add_document(str(record), f"record_{record}.pdf", build_page_index(pages))
+
+    start = time.perf_counter()
+    results = corpus.search_within_budget("What was my latest glucose and potassium?", token_budget=3000)
+    elapsed = time.perf_counter() - start
+    print(f"Searched {len(corpus)} chunks across {len(corpus.documents)} records in {elapsed * 1000:.1f} ms")
+
+    assert results
+    assert elapsed < 0.1
+
+if __name__ == "__main__":
+    test_chunking_keeps_page_numbers()
+    test_chunking_keeps_text_order()
+    test_search_ranks_relevant_pages_first()
+    test_tokenize_keeps_lab_values()
+    test_corpus_cites_across_records()
+    test_corpus_respects_token_budget()
+    test_corpus_search_is_fast_for_many_records()
+    print("\nAll document index tests passed.")
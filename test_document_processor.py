@@ -0,0 +1,161 @@
+"""
+Test script for medical record PDF processing.
+This script builds small PDFs in memory with PyMuPDF and checks page extraction.
+
+Usage:
+    python test_document_processor.py
+"""
+
+import io
+import os
+import tempfile
+import time
+import fitz  # PyMuPDF
+from document_cache import DocumentCache
+from document_jobs import IngestionQueue
+from record_store import RecordStore
+from document_processor import (PARALLEL_MIN_PAGES, build_record_text, iter_pdf_pages, process_pdf,
+                                split_page_ranges, spool_upload)
+
+class FakeUpload(io.BytesIO):
+    """Stand-in for a Streamlit UploadedFile."""
+    def __init__(self, data, name="record.pdf"):
+        super().__init__(data)
+        self.name = name
+
+def make_pdf(page_texts):
+    """Create a PDF with one line of text per page and return its bytes."""
+    doc = fitz.open()
+    for text in page_texts:
+        page = doc.new_page()
+        page.insert_text((72, 72), text)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+def test_pages_are_streamed_with_offsets():
+    """Each page record carries its number and the offsets of its text in the combined text."""
+    page_texts = [f"Page {i} Hemoglobin {12 + i}.0 g/dL" for i in range(1, 6)]
+    progress = []
+    result = process_pdf(FakeUpload(make_pdf(page_texts)), use_cache=False,
+                         progress_callback=lambda done, total: progress.append((done, total)))
+
+    assert result["success"]
+    assert result["metadata"]["filename"] == "record.pdf"
+    assert result["metadata"]["page_count"] == 5
+    assert progress == [(i, 5) for i in range(1, 6)]
+    assert "text" not in result
+    record_text = build_record_text(result["pages"])
+    assert "--- Page 3 ---" in record_text
+    for (start, end), page_text in zip(result["page_offsets"], result["pages"]):
+        assert record_text[start:end] == page_text
+    assert result["index"].search("Hemoglobin 14.0")[0]["page"] == 2
+
+def test_generator_yields_pages_lazily():
+    """iter_pdf_pages is a generator over the spooled file."""
+    path = spool_upload(FakeUpload(make_pdf(["first", "second"])))
+    try:
+        pages = iter_pdf_pages(path)
+        first = next(pages)
+
+        assert first["page"] == 1 and first["page_count"] == 2
+        assert "first" in first["text"]
+        assert [record["page"] for record in pages] == [2]
+    finally:
+        os.remove(path)
+
+def test_parallel_extraction_matches_serial():
+    """Splitting pages across worker processes gives the same result in page order."""
+    assert split_page_ranges(10, 3) == [(0, 4), (4, 7), (7, 10)]
+    assert split_page_ranges(2, 8) == [(0, 1), (1, 2)]
+
+    page_texts = [f"Page {i} glucose {90 + i} mg/dL" for i in range(1, PARALLEL_MIN_PAGES + 9)]
+    data = make_pdf(page_texts)
+    serial = process_pdf(FakeUpload(data), workers=1, use_cache=False)
+    parallel = process_pdf(FakeUpload(data), workers=2, use_cache=False)
+
+    assert parallel["success"]
+    assert parallel["pages"] == serial["pages"]
+    assert parallel["page_offsets"] == serial["page_offsets"]
+
+def test_reupload_is_served_from_cache():
+    """A second upload of the same bytes, under any name, is served from the document cache."""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = DocumentCache(directory=directory)
+        data = make_pdf(["Lipid panel LDL 130 mg/dL", "Thyroid TSH 2.1 mIU/L"])
+
+        first = process_pdf(FakeUpload(data, name="labs.pdf"), cache=cache)
+        second = process_pdf(FakeUpload(data, name="labs-copy.pdf"), cache=cache)
+
+        assert not first["metadata"]["cached"]
+        assert second["metadata"]["cached"]
+        assert second["metadata"]["filename"] == "labs-copy.pdf"
+        assert second["metadata"]["sha256"] == first["metadata"]["sha256"]
+        assert second["pages"] == first["pages"]
+        assert second["page_offsets"] == first["page_offsets"]
+        assert second["index"].search("TSH")[0]["page"] == 2
+
+def test_cache_evicts_least_recently_used():
+    """The cache directory stays under its size limit by dropping the oldest entries."""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = DocumentCache(directory=directory, max_bytes=10**9)
+        for i in range(3):
+            cache.put(f"{i:064x}", {"pages": ["x" * 1000]})
+            os.utime(cache._path(f"{i:064x}"), (i, i))
+        cache.get(f"{0:064x}")
+
+        cache.max_bytes = os.path.getsize(cache._path(f"{0:064x}")) * 2
+        cache.evict()
+
+        assert cache.get(f"{0:064x}") is not None
+        assert cache.get(f"{1:064x}") is None
+        assert cache.get(f"{2:064x}") is not None
+
+def test_invalid_pdf_reports_error():
+    """Unreadable uploads return an error result instead of raising."""
+    result = process_pdf(FakeUpload(b"not a pdf", name="broken.pdf"), use_cache=False)
+
+    assert not result["success"]
+    assert result["metadata"]["filename"] == "broken.pdf"
+    assert result["pages"] == []
+
+def test_background_ingestion_job():
+    """Uploads are processed in a background job whose status can be polled."""
+    directory = tempfile.mkdtemp()
+    store = RecordStore(path=os.path.join(directory, "records.sqlite3"))
+    queue = IngestionQueue(max_workers=1, store=store)
+    job_id = queue.submit(FakeUpload(make_pdf(["HbA1c 6.1 % 4.0-5.6", "Notes"]), name="labs.pdf"), use_cache=False)
+
+    status = queue.status(job_id)
+    assert status["filename"] == "labs.pdf"
+    assert status["status"] in ("queued", "running", "done")
+
+    deadline = time.time() + 10
+    while queue.status(job_id)["status"] in ("queued", "running") and time.time() < deadline:
+        time.sleep(0.01)
+
+    status = queue.status(job_id)
+    print(f"Job finished: {status}")
+    assert status["status"] == "done"
+    assert (status["pages_done"], status["page_count"]) == (2, 2)
+    assert len(queue) == 0
+
+    result = queue.pop_result(job_id)
+    assert result["success"]
+    assert result["lab_results"][0]["test"] == "Hemoglobin A1c"
+    # The text was moved to the record store
+    assert "text" not in result and "text" not in result["index"].chunks[0]
+    assert "HbA1c" in store.get_page(result["metadata"]["sha256"], 1)
+    # A collected job is forgotten
+    assert queue.status(job_id) is None
+    assert queue.pop_result(job_id) is None
+
+if __name__ == "__main__":
+    test_pages_are_streamed_with_offsets()
+    test_generator_yields_pages_lazily()
+    test_parallel_extraction_matches_serial()
+    test_reupload_is_served_from_cache()
+    test_cache_evicts_least_recently_used()
+    test_invalid_pdf_reports_error()
+    test_background_ingestion_job()
+    print("\nAll document processor tests passed.")
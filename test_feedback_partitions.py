@@ -0,0 +1,134 @@
+"""
+Test script for the day-partitioned feedback store.
+This script checks that syncing copies only new log records, that queries read
+only the requested columns, days and models, that recent feedback follows
+the same filters, that compaction merges the part
+files of a day without losing rows, and that comment themes are stored per record.
+
+Usage:
+    python test_feedback_partitions.py
+"""
+
+import json
+import os
+import tempfile
+from feedback_partitions import FeedbackPartitions
+from feedback_store import FeedbackLog
+from feedback_utils import extract_common_themes
+
+def make_partitions():
+    """Create a feedback log and partitions in a temporary directory."""
+    directory = tempfile.mkdtemp()
+    log = FeedbackLog(os.path.join(directory, "feedback.jsonl"))
+    return log, FeedbackPartitions(os.path.join(directory, "partitions"), log)
+
+def add_feedback(log, day, rating, model):
+    """Append one feedback record for a day."""
+    log.append({"overall_rating": rating, "comments": f"{model} on {day}",
+                "timestamp": f"{day} 10:00:00", "model_used": model})
+
+def part_files(partitions, day):
+    """List the part files of a day."""
+    return [name for name in os.listdir(os.path.join(partitions.root, f"date={day}")) if name.endswith(".parquet")]
+
+def test_sync_copies_only_new_records():
+    """Records are copied once, into the partition of their day."""
+    log, partitions = make_partitions()
+    add_feedback(log, "2025-05-13", 4, "o4-mini")
+    add_feedback(log, "2025-05-14", 5, "gpt-4o")
+    assert partitions.sync() == 2
+    assert partitions.sync() == 0
+
+    add_feedback(log, "2025-05-14", 3, "o4-mini")
+    assert partitions.sync() == 1
+    assert partitions.query().num_rows == 3
+    assert len(part_files(partitions, "2025-05-13")) == 1
+    assert len(part_files(partitions, "2025-05-14")) == 2
+
+def test_query_filters_columns_days_and_models():
+    """Only the requested columns of matching days and models are returned."""
+    log, partitions = make_partitions()
+    for day, rating, model in [("2025-05-12", 1, "o4-mini"), ("2025-05-13", 4, "o4-mini"),
+                               ("2025-05-13", 5, "gpt-4o"), ("2025-05-14", 2, "gpt-4o")]:
+        add_feedback(log, day, rating, model)
+    partitions.sync()
+
+    table = partitions.query(["overall_rating"], start_date="2025-05-13", end_date="2025-05-14")
+    print(f"Filtered columns: {table.column_names}, rows: {table.num_rows}")
+    assert table.column_names == ["overall_rating"]
+    assert sorted(table.column("overall_rating").to_pylist()) == [2, 4, 5]
+
+    table = partitions.query(["overall_rating", "model_used"], start_date="2025-05-13", models=["gpt-4o"])
+    assert sorted(table.column("overall_rating").to_pylist()) == [2, 5]
+    assert partitions.query(end_date="2025-05-11").num_rows == 0
+
+    # Records without a timestamp are left out of any date range
+    log.append({"overall_rating": 3, "model_used": "o4-mini"})
+    partitions.sync()
+    assert partitions.query(["overall_rating"]).num_rows == 5
+    assert partitions.query(["overall_rating"], start_date="2025-05-13").num_rows == 3
+    assert partitions.query(["overall_rating"], end_date="2025-05-14").num_rows == 4
+
+def test_recent_feedback_follows_filters():
+    """The most recent records are taken from the selected days and models only."""
+    log, partitions = make_partitions()
+    for day, rating, model in [("2025-05-12", 1, "o4-mini"), ("2025-05-13", 4, "o4-mini"),
+                               ("2025-05-13", 5, "gpt-4o"), ("2025-05-14", 2, "gpt-4o")]:
+        add_feedback(log, day, rating, model)
+    partitions.sync()
+
+    recent = partitions.recent(3, end_date="2025-05-13")
+    assert [row["timestamp"][:10] for row in recent] == ["2025-05-13", "2025-05-13", "2025-05-12"]
+    recent = partitions.recent(5, start_date="2025-05-13", models=["o4-mini"])
+    assert [row["comments"] for row in recent] == ["o4-mini on 2025-05-13"]
+    recent = partitions.recent(5, models=["gpt-4o"])
+    assert [row["overall_rating"] for row in recent] == [2, 5]
+    assert partitions.recent(0) == []
+
+    # Records without a timestamp come after every dated record
+    log.append({"overall_rating": 3, "model_used": "gpt-4o"})
+    partitions.sync()
+    assert [row["overall_rating"] for row in partitions.recent(5, models=["gpt-4o"])] == [2, 5, 3]
+
+def test_compaction_merges_part_files():
+    """Compaction leaves one part file per day with the same rows."""
+    log, partitions = make_partitions()
+    for rating in range(1, 6):
+        add_feedback(log, "2025-05-13", rating, "o4-mini")
+        partitions.sync()
+    add_feedback(log, "2025-05-14", 5, "o4-mini")
+    partitions.sync()
+    assert len(part_files(partitions, "2025-05-13")) == 5
+
+    assert partitions.compact() == 1
+    assert len(part_files(partitions, "2025-05-13")) == 1
+    assert len(part_files(partitions, "2025-05-14")) == 1
+    ratings = partitions.query(["overall_rating"], start_date="2025-05-13", end_date="2025-05-13")
+    assert sorted(ratings.column("overall_rating").to_pylist()) == [1, 2, 3, 4, 5]
+
+def test_comment_themes_are_counted_once():
+    """Themes are counted when records are copied, and merged without reading the comments."""
+    log, partitions = make_partitions()
+    log.append({"overall_rating": 5, "comments": "Clear medical advice", "timestamp": "2025-05-13 10:00:00"})
+    log.append({"overall_rating": 2, "comments": "Slow, but clear medical advice", "timestamp": "2025-05-14 10:00:00"})
+    partitions.sync()
+
+    feedback_df = partitions.query(["comment_themes"]).to_pandas()
+    assert extract_common_themes(feedback_df) == {"clear": 2, "medical": 2, "advice": 2}
+    assert extract_common_themes(feedback_df, phrases=True) == {
+        "clear medical": 2, "medical advice": 2, "clear medical advice": 2
+    }
+
+    # Partitions written before comment themes were stored are rebuilt from the log
+    with open(partitions.watermark_path, "w") as f:
+        json.dump({"offset": os.path.getsize(log.path)}, f)
+    assert partitions.sync() == 2
+    assert partitions.query().num_rows == 2
+
+if __name__ == "__main__":
+    test_sync_copies_only_new_records()
+    test_query_filters_columns_days_and_models()
+    test_recent_feedback_follows_filters()
+    test_compaction_merges_part_files()
+    test_comment_themes_are_counted_once()
+    print("\nAll feedback partition tests passed.")
@@ -0,0 +1,122 @@
+"""
+Test script for the append-only feedback log.
+This script checks that concurrent writers in several processes never interleave
+records, that a partial last line is skipped, that the legacy CSV is migrated once,
+and that the running aggregates, including comment phrases, match the log.
+
+Usage:
+    python test_feedback_store.py
+"""
+
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from feedback_store import FeedbackLog
+
+def write_feedback(path, writer, count):
+    """Append count records from one writer process."""
+    log = FeedbackLog(path)
+    for i in range(count):
+        log.append({"overall_rating": 5, "comments": f"writer {writer} comment {i} " + "x" * 500,
+                    "session_id": f"{writer}-{i}"})
+
+def test_concurrent_writers_do_not_interleave():
+    """Every record written by concurrent processes is read back whole."""
+    path = os.path.join(tempfile.mkdtemp(), "feedback.jsonl")
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        for future in [executor.submit(write_feedback, path, writer, 50) for writer in range(4)]:
+            future.result()
+
+    log = FeedbackLog(path)
+    records = log.read()
+    print(f"Read {len(records)} records written by 4 processes")
+    assert len(records) == 200
+    assert len({record["session_id"] for record in records}) == 200
+    assert all(record["overall_rating"] == 5 for record in records)
+    aggregates = log.aggregates()
+    assert aggregates["count"] == 200
+    assert aggregates["histograms"]["overall_rating"][5] == 200
+    assert aggregates["themes"]["writer"] == 200
+
+def test_partial_last_line_is_skipped():
+    """A line cut short by a crashed writer does not break reading."""
+    path = os.path.join(tempfile.mkdtemp(), "feedback.jsonl")
+    log = FeedbackLog(path)
+    log.append({"overall_rating": 4, "comments": "Good"})
+    with open(path, "a") as f:
+        f.write('{"overall_rating": 3, "comm')
+
+    assert [record["comments"] for record in log.read()] == ["Good"]
+    log.append({"overall_rating": 2, "comments": "Slow"})
+    assert [record["comments"] for record in log.read()] == ["Good", "Slow"]
+    assert log.aggregates()["count"] == 2
+
+def test_legacy_csv_is_migrated_once():
+    """Rows of the old CSV are moved into the log with numeric ratings, exactly once."""
+    directory = tempfile.mkdtemp()
+    csv_path = os.path.join(directory, "user_feedback.csv")
+    with open(csv_path, "w") as f:
+        f.write("overall_rating,helpfulness_rating,clarity_rating,empathy_rating,accuracy_rating,"
+                "comments,session_id,timestamp,conversation_length,model_used\n"
+                "4,4,4,4,4,,abc,2025-05-13 09:57:33,3,o4-mini\n"
+                '5,4,4,2,2,"Good, clear",def,2025-05-13 10:11:20,3,o4-mini\n')
+
+    log = FeedbackLog(os.path.join(directory, "user_feedback.jsonl"))
+    assert log.migrate_csv(csv_path) == 2
+    assert log.migrate_csv(csv_path) == 0
+
+    records = log.read()
+    assert records[1]["overall_rating"] == 5
+    assert records[1]["comments"] == "Good, clear"
+    assert records[0]["comments"] == ""
+    assert os.path.exists(csv_path + ".migrated")
+
+def test_aggregates_are_incremental():
+    """Aggregates are updated at write time, catch up with records they missed, and give recent records."""
+    path = os.path.join(tempfile.mkdtemp(), "feedback.jsonl")
+    log = FeedbackLog(path)
+    log.append({"overall_rating": 5, "helpfulness_rating": 4, "comments": "Clear answers, clear advice"})
+    log.append({"overall_rating": 3, "helpfulness_rating": 2, "comments": "Answers were slow"})
+
+    # A record written by an older writer that did not update the aggregates
+    with open(path, "a") as f:
+        f.write(json.dumps({"overall_rating": 4, "helpfulness_rating": 4, "comments": "clear"}) + "\n")
+
+    aggregates = FeedbackLog(path).aggregates()
+    print(f"Aggregates: count={aggregates['count']}, sums={aggregates['sums']}")
+    assert aggregates["count"] == 3
+    assert aggregates["sums"]["overall_rating"] == 12
+    assert aggregates["sums"]["helpfulness_rating"] == 10
+    assert aggregates["histograms"]["overall_rating"] == [0, 0, 0, 1, 1, 1]
+    assert aggregates["themes"] == {"clear": 3, "answers": 2, "advice": 1, "were": 1, "slow": 1}
+    assert [record["overall_rating"] for record in log.recent(2)] == [4, 3]
+
+def test_phrase_themes_are_counted():
+    """Two- and three-word phrases are counted apart from words, also when older aggregates lack them."""
+    path = os.path.join(tempfile.mkdtemp(), "feedback.jsonl")
+    log = FeedbackLog(path)
+    log.append({"overall_rating": 5, "comments": "Very clear medical advice"})
+    log.append({"overall_rating": 4, "comments": "Clear medical advice, but slow"})
+
+    # Aggregates saved before phrases were counted are rebuilt from the log
+    aggregates = log.aggregates()
+    del aggregates["phrases"]
+    with open(log.aggregates_path, "w") as f:
+        json.dump(aggregates, f)
+
+    aggregates = log.aggregates()
+    print(f"Phrases: {aggregates['phrases']}")
+    assert aggregates["count"] == 2
+    assert aggregates["themes"]["clear"] == 2
+    assert aggregates["phrases"]["clear medical"] == 2
+    assert aggregates["phrases"]["clear medical advice"] == 2
+    assert aggregates["phrases"]["advice slow"] == 1
+
+if __name__ == "__main__":
+    test_concurrent_writers_do_not_interleave()
+    test_partial_last_line_is_skipped()
+    test_legacy_csv_is_migrated_once()
+    test_aggregates_are_incremental()
+    test_phrase_themes_are_counted()
+    print("\nAll feedback store tests passed.")
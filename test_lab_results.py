@@ -0,0 +1,106 @@
+"""
+Test script for lab result extraction from medical records.
+This script checks parsing of common lab report layouts, the columnar lab table
+the mapping of abnormal findings to Bayesian observations and the default
+temperature ranges in °F and °C.
+
+Usage:
+    python test_lab_results.py
+"""
+
+from lab_results import (LabTable, extract_lab_results, find_tests, format_lab_row, is_latest_result_question,
+                         lab_findings_to_observations, parse_lab_line)
+
+REPORT_2023 = """Community Lab Services
+Collected: 03/01/2023
+Hemoglobin A1c: 7.2 % H (4.0-5.6)
+Glucose, Fasting 145 mg/dL 70 - 99
+LDL Cholesterol 130 mg/dL <100
+Urine Blood Positive
+Magnesium 1.2 mg/dL 1.7-2.2
+Blood pressure 120/80
+"""
+
+REPORT_2024 = """Date: 2024-01-15
+HbA1c 6.1% 4.0-5.6
+TSH 2.1 mIU/L
+"""
+
+def test_parses_common_layouts():
+    """Name, value, unit, reference range, flag and date are read from each layout."""
+    rows = extract_lab_results([REPORT_2023, REPORT_2024])
+    by_test = {(row["test"], row["date"]): row for row in rows}
+    print(f"Extracted {len(rows)} results")
+
+    a1c = by_test[("Hemoglobin A1c", "2023-03-01")]
+    assert (a1c["value"], a1c["unit"], a1c["low"], a1c["high"], a1c["flag"], a1c["page"]) == (7.2, "%", 4.0, 5.6, "high", 1)
+    assert by_test[("Glucose", "2023-03-01")]["flag"] == "high"
+    assert by_test[("LDL Cholesterol", "2023-03-01")]["high"] == 100
+    assert by_test[("Urine Blood", "2023-03-01")]["flag"] == "abnormal"
+    assert by_test[("Magnesium", "2023-03-01")]["flag"] == "low"
+    assert by_test[("Hemoglobin A1c", "2024-01-15")]["page"] == 2
+    # Default reference range is used when the report does not print one
+    assert by_test[("TSH", "2024-01-15")]["high"] == 4.0
+    assert len(rows) == 7
+
+def test_ignores_non_result_lines():
+    """Lines without a test result are not parsed as results."""
+    assert parse_lab_line("Community Lab Services") is None
+    assert parse_lab_line("Blood pressure 120/80") is None
+    assert parse_lab_line("Glucose was discussed with the patient") is None
+
+def test_latest_result_lookup():
+    """The latest result of a test is found by date across records."""
+    table = LabTable()
+    table.add_rows(extract_lab_results([REPORT_2024]), "labs_2024.pdf")
+    table.add_rows(extract_lab_results([REPORT_2023]), "labs_2023.pdf")
+
+    latest = table.latest("Hemoglobin A1c")
+    print(f"Latest A1c: {format_lab_row(latest)}")
+
+    assert latest["value"] == 6.1
+    assert latest["filename"] == "labs_2024.pdf"
+    assert [row["date"] for row in table.history("Hemoglobin A1c")] == ["2024-01-15", "2023-03-01"]
+    assert table.latest("Ferritin") is None
+    assert find_tests("What was my last A1c and LDL?") == ["Hemoglobin A1c", "LDL Cholesterol"]
+
+def test_latest_result_questions():
+    """Only lookups of a test's latest value are answered from the table, not trend or research questions."""
+    assert is_latest_result_question("What was my last A1c?")
+    assert is_latest_result_question("latest LDL cholesterol please")
+    assert is_latest_result_question("What is my most recent glucose result?")
+    assert is_latest_result_question("Show me my current lab TSH")
+    assert not is_latest_result_question("Is my A1c trending down recently?")
+    assert not is_latest_result_question("Any recent research on glucose control?")
+    assert not is_latest_result_question("What is the latest research on glucose control?")
+    assert not is_latest_result_question("What was my last visit about?")
+
+def test_abnormal_findings_become_observations():
+    """Abnormal findings with a matching symptom are passed on as observations."""
+    table = LabTable()
+    table.add_rows(extract_lab_results([REPORT_2023]), "labs_2023.pdf")
+
+    abnormal = table.abnormal()
+    assert {row["test"] for row in abnormal} == {"Hemoglobin A1c", "Glucose", "LDL Cholesterol", "Urine Blood", "Magnesium"}
+    assert lab_findings_to_observations(abnormal) == {"Blood in Urine": True}
+
+def test_temperature_default_ranges():
+    """Temperatures without a printed range or flag are judged in °F or °C."""
+    for line in ["Temperature 101.2 F", "Body Temperature: 38.6°C", "Temperature 102"]:
+        row = parse_lab_line(line)
+        print(f"{line!r}: {row['result']} {row['unit']} {row['flag']}")
+        assert row["flag"] == "high"
+        assert lab_findings_to_observations([row]) == {"Fever": True}
+
+    assert parse_lab_line("Temperature 98.6 F")["flag"] == ""
+    assert parse_lab_line("Temperature 36.8")["unit"] == "°C"
+    assert parse_lab_line("Temperature 36.8")["flag"] == ""
+
+if __name__ == "__main__":
+    test_parses_common_layouts()
+    test_ignores_non_result_lines()
+    test_latest_result_lookup()
+    test_latest_result_questions()
+    test_abnormal_findings_become_observations()
+    test_temperature_default_ranges()
+    print("\nAll lab result tests passed.")
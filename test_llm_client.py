@@ -0,0 +1,123 @@
+"""
+Test script for the LLM admission controller.
+This script runs the controller against the local fake LLM server to check
+retries, fair queuing across sessions and the concurrency cap.
+
+Usage:
+    python test_llm_client.py
+"""
+
+import asyncio
+import httpx
+from openai import AsyncOpenAI
+from fake_llm_server import FakeLLMServer
+from llm_client import AdmissionController, create_chat_completion
+
+def make_client(server):
+    """Create an async client pointed at the fake server with SDK retries disabled."""
+    return AsyncOpenAI(api_key="test-key", base_url=server.base_url,
+                       http_client=httpx.AsyncClient(), max_retries=0)
+
+def test_retries_rate_limited_requests():
+    """Requests rejected with 429 are retried until they succeed."""
+    server = FakeLLMServer(fail_first=2).start()
+    try:
+        controller = AdmissionController(base_delay=0.01, max_delay=0.05)
+        messages = [{"role": "user", "content": "Hello"}]
+
+        async def scenario():
+            return await create_chat_completion(make_client(server), "fake-model", messages,
+                                                session_id="a", controller=controller)
+
+        response = asyncio.run(scenario())
+        metrics = controller.get_metrics()
+        print(f"Response: {response}")
+        print(f"Metrics: {metrics}")
+
+        assert response == server.reply
+        assert server.request_count == 3
+        assert metrics["retries"] == 2
+        assert metrics["rate_limited"] == 2
+        assert metrics["completed"] == 1
+        assert metrics["queue_depth"] == 0
+        assert metrics["in_flight"] == 0
+    finally:
+        server.stop()
+
+def test_gives_up_after_max_retries():
+    """Persistent server errors are raised once the retry budget is spent."""
+    server = FakeLLMServer(fail_first=100, fail_status=503).start()
+    try:
+        controller = AdmissionController(max_retries=2, base_delay=0.01, max_delay=0.05)
+        messages = [{"role": "user", "content": "Hello"}]
+
+        async def scenario():
+            return await create_chat_completion(make_client(server), "fake-model", messages,
+                                                session_id="a", controller=controller)
+
+        try:
+            asyncio.run(scenario())
+            raised = False
+        except Exception:
+            raised = True
+
+        assert raised
+        assert server.request_count == 3
+        assert controller.get_metrics()["failed"] == 1
+    finally:
+        server.stop()
+
+def test_fair_queue_across_sessions():
+    """A session with one request is not starved by a session with a backlog."""
+    controller = AdmissionController(max_concurrent=1)
+    completion_order = []
+
+    def make_call(label):
+        async def call():
+            await asyncio.sleep(0.01)
+            completion_order.append(label)
+            return label
+        return call
+
+    async def scenario():
+        tasks = [asyncio.create_task(controller.run("busy", make_call(f"busy-{i}"))) for i in range(3)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(controller.run("quiet", make_call("quiet-0"))))
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    print(f"Completion order: {completion_order}")
+
+    # Plain FIFO would run the quiet session last
+    assert completion_order.index("quiet-0") < completion_order.index("busy-2")
+    assert controller.get_metrics()["max_queue_depth"] >= 3
+
+def test_concurrency_cap():
+    """No more than max_concurrent calls reach the server at once."""
+    server = FakeLLMServer(latency=0.05).start()
+    try:
+        controller = AdmissionController(max_concurrent=2)
+        messages = [{"role": "user", "content": "Hello"}]
+
+        async def scenario():
+            client = make_client(server)
+            await asyncio.gather(*[
+                create_chat_completion(client, "fake-model", messages,
+                                       session_id=f"s{i}", controller=controller)
+                for i in range(6)
+            ])
+
+        asyncio.run(scenario())
+        print(f"Max concurrent requests seen by server: {server.max_active_requests}")
+
+        assert server.request_count == 6
+        assert server.max_active_requests <= 2
+    finally:
+        server.stop()
+
+if __name__ == "__main__":
+    test_retries_rate_limited_requests()
+    test_gives_up_after_max_retries()
+    test_fair_queue_across_sessions()
+    test_concurrency_cap()
+    print("\nAll LLM client tests passed.")
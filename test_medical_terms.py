@@ -0,0 +1,53 @@
+"""
+Test script for the dictionary-backed medical entity recognizer.
+This script checks longest-match recognition of conditions, drugs, procedures and
+symptoms, alias and plural handling, and the deterministic ranking of entities.
+
+Usage:
+    python test_medical_terms.py
+"""
+
+from medical_terms import MedicalTermRecognizer
+
+TERMS = {
+    "condition": {
+        "type 2 diabetes": ["type ii diabetes", "t2d"],
+        "diabetes": [],
+        "migraine": [],
+        "alzheimer's disease": ["alzheimer's"]
+    },
+    "drug": {"metformin": ["glucophage"]},
+    "procedure": {"hemoglobin a1c test": ["a1c", "hba1c"]},
+    "symptom": {"headache": [], "fatigue": []}
+}
+
+def test_longest_terms_and_aliases():
+    """Multi-word terms win over their parts, and aliases and plurals map to canonical names."""
+    recognizer = MedicalTermRecognizer(TERMS)
+    entities = recognizer.find("My Type II Diabetes is treated with Glucophage. What should my A1c be?")
+    assert [entity["term"] for entity in entities] == ["type 2 diabetes", "metformin", "hemoglobin a1c test"]
+
+    assert [entity["term"] for entity in recognizer.find("I get migraines and Alzheimer’s runs in my family")] == \
+        ["migraine", "alzheimer's disease"]
+
+def test_ignores_ordinary_words():
+    """Capitalized or suffix-like words that are not medical terms are not entities."""
+    recognizer = MedicalTermRecognizer(TERMS)
+    assert recognizer.find("Hello Doctor, Tuesday's appointment is fine. Criticism noted.") == []
+
+def test_ranking_is_deterministic():
+    """Entities rank by category weight, then mentions, then first mention."""
+    recognizer = MedicalTermRecognizer(TERMS)
+    text = "Fatigue and a headache. The headache started after metformin. Does diabetes cause migraine?"
+    entities = recognizer.find(text)
+    print(f"Ranked entities: {[(entity['term'], entity['count']) for entity in entities]}")
+
+    assert [entity["term"] for entity in entities] == ["diabetes", "migraine", "metformin", "headache", "fatigue"]
+    assert entities[3]["count"] == 2
+    assert recognizer.find(text) == entities
+
+if __name__ == "__main__":
+    test_longest_terms_and_aliases()
+    test_ignores_ordinary_words()
+    test_ranking_is_deterministic()
+    print("\nAll medical term tests passed.")
@@ -0,0 +1,99 @@
+"""
+Test script for the background medical news prefetcher.
+Searches are served by the local search backend, so no API key is needed.
+
+Usage:
+    python test_news_prefetch.py
+"""
+
+import os
+import tempfile
+import time
+from news_prefetch import NewsPrefetcher
+from rate_limiting import TokenBucket
+from search_backends import LocalSearchBackend
+from serp_cache import SerpCache
+from serp_service import SerpService
+
+class CountingBackend(LocalSearchBackend):
+    """Local backend that records the queries it answers."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.queries = []
+
+    def search(self, params):
+        self.queries.append(params["q"])
+        return super().search(params)
+
+def make_service():
+    """Create a SERP service on the local backend with a temporary cache."""
+    cache = SerpCache(path=os.path.join(tempfile.mkdtemp(), "serp.sqlite3"))
+    return SerpService(cache=cache, limiter=TokenBucket(rate=100, capacity=100), backend=CountingBackend())
+
+def test_topics_ranked_by_sessions():
+    """Topics shared by more sessions come first, and stale topics are dropped."""
+    prefetcher = NewsPrefetcher(make_service(), topic_ttl=0.2)
+    prefetcher.track("session-a", ["Asthma", "Influenza"])
+    prefetcher.track("session-b", ["Influenza"])
+    assert prefetcher.active_topics() == ["Influenza", "Asthma"]
+
+    time.sleep(0.3)
+    prefetcher.track("session-c", ["Migraine"])
+    assert prefetcher.active_topics() == ["Migraine"]
+
+def test_prefetch_fills_cache_within_budget():
+    """Each interval fetches at most its budget, skips fresh topics, and chat reads never call the API."""
+    service = make_service()
+    prefetcher = NewsPrefetcher(service, interval=0, budget=2)
+    prefetcher.track("session-a", ["covid-19 vaccine", "heart disease", "asthma"])
+
+    assert service.get_cached_medical_news("asthma") is None
+    assert prefetcher.run_once() == 2
+    assert prefetcher.run_once() == 1
+    assert prefetcher.run_once() == 0
+    print(f"Prefetch stats: {prefetcher.stats}")
+    assert len(service.backend.queries) == 3
+
+    news = service.get_cached_medical_news("covid-19 vaccine")
+    assert news and "vaccine" in news[0]["title"].lower()
+    assert len(service.backend.queries) == 3
+
+def test_prefetch_leaves_tokens_for_chat():
+    """Wakeups within an interval share one budget, and scarce rate limiter tokens are left to chat."""
+    service = make_service()
+    prefetcher = NewsPrefetcher(service, interval=60, budget=2)
+    prefetcher.track("session-a", ["covid-19 vaccine", "heart disease", "asthma"])
+    assert prefetcher.run_once() == 2
+    assert prefetcher.run_once() == 0
+
+    service = make_service()
+    service.limiter = TokenBucket(rate=1 / 60, capacity=3)
+    service.limiter.try_acquire(2)
+    prefetcher = NewsPrefetcher(service, interval=0, reserve=1)
+    prefetcher.track("session-a", ["asthma"])
+    assert prefetcher.run_once() == 0
+    assert prefetcher.stats["rate_limited"] == 1
+    assert service.limiter.try_acquire()
+
+def test_new_topic_wakes_background_job():
+    """A newly reported topic is fetched without waiting for the next cycle."""
+    service = make_service()
+    prefetcher = NewsPrefetcher(service, interval=60)
+    prefetcher.start()
+    try:
+        prefetcher.track("session-a", ["heart disease"])
+        deadline = time.monotonic() + 5
+        while service.get_cached_medical_news("heart disease") is None and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        prefetcher.stop()
+
+    assert service.get_cached_medical_news("heart disease") is not None
+
+if __name__ == "__main__":
+    test_topics_ranked_by_sessions()
+    test_prefetch_fills_cache_within_budget()
+    test_prefetch_leaves_tokens_for_chat()
+    test_new_topic_wakes_background_job()
+    print("\nAll news prefetch tests passed.")
@@ -0,0 +1,72 @@
+"""
+Test script for the token-bucket rate limiter and its use by SerpService.
+The SERP API call is replaced by a local fake so no quota is used.
+
+Usage:
+    python test_rate_limiting.py
+"""
+
+import os
+import tempfile
+import time
+import search_backends
+from rate_limiting import TokenBucket
+from serp_cache import SerpCache
+from serp_service import SerpRateLimitError, SerpService
+
+def test_acquire_waits_only_until_deadline():
+    """acquire waits for a token that will arrive in time and gives up at once otherwise."""
+    bucket = TokenBucket(rate=20, capacity=1)
+    assert bucket.acquire(timeout=0)
+
+    start = time.monotonic()
+    assert bucket.acquire(timeout=1)
+    waited = time.monotonic() - start
+    assert 0.02 <= waited < 0.5
+
+    slow = TokenBucket(rate=0.1, capacity=1)
+    assert slow.acquire(timeout=0)
+    start = time.monotonic()
+    assert not slow.acquire(timeout=1)
+    # No sleeping when the token cannot arrive before the deadline
+    assert time.monotonic() - start < 0.05
+
+def test_serp_limit_is_shared_and_skips_instead_of_sleeping():
+    """Services share one limiter; once the burst is spent, requests fail fast instead of sleeping."""
+    calls = []
+
+    def fake_search(params, timeout=None):
+        calls.append(params["q"])
+        return {"organic_results": []}
+
+    cache = SerpCache(path=os.path.join(tempfile.mkdtemp(), "serp.sqlite3"))
+    limiter = TokenBucket(rate=1 / 60, capacity=2)
+    original_search = search_backends.serpapi.search
+    search_backends.serpapi.search = fake_search
+    try:
+        services = [SerpService(api_key="test-key", cache=cache, limiter=limiter, acquire_timeout=0.1) for _ in range(3)]
+        services[0].search_medical_info("asthma")
+        services[1].search_medical_info("eczema")
+
+        start = time.monotonic()
+        try:
+            services[2].search_medical_info("psoriasis")
+            raised = False
+        except SerpRateLimitError:
+            raised = True
+        elapsed = time.monotonic() - start
+
+        # Cached queries do not need a token
+        assert services[2].search_medical_info("asthma") == []
+    finally:
+        search_backends.serpapi.search = original_search
+
+    print(f"Rate-limited request returned after {elapsed * 1000:.1f} ms")
+    assert raised
+    assert elapsed < 0.1
+    assert len(calls) == 2
+
+if __name__ == "__main__":
+    test_acquire_waits_only_until_deadline()
+    test_serp_limit_is_shared_and_skips_instead_of_sleeping()
+    print("\nAll rate limiting tests passed.")
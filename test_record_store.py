@@ -0,0 +1,73 @@
+"""
+Test script for the on-disk record store.
+This script checks that record text is moved out of the session's index and
+loaded lazily, and that eviction keeps recently used records.
+
+Usage:
+    python test_record_store.py
+"""
+
+import os
+import tempfile
+import time
+from document_index import CorpusIndex, build_page_index
+from record_store import RecordStore, load_chunk_texts, spill_record
+
+def make_store(**kwargs):
+    """Create a record store in a temporary directory."""
+    return RecordStore(path=os.path.join(tempfile.mkdtemp(), "records.sqlite3"), **kwargs)
+
+def make_result(digest, pages, filename="record.pdf"):
+    """Build a minimal successful process_pdf result."""
+    return {
+        "success": True,
+        "metadata": {"filename": filename, "page_count": len(pages), "sha256": digest},
+        "pages": pages,
+        "page_offsets": [],
+        "index": build_page_index(pages),
+        "lab_results": []
+    }
+
+def test_text_is_loaded_lazily():
+    """The session keeps a text-free index; retrieved chunks are loaded from the store."""
+    store = make_store()
+    record = spill_record(make_result("a" * 64, ["Demographics", "Ferritin 12 ng/mL low"]), store)
+
+    assert "text" not in record and "pages" not in record
+    assert all("text" not in chunk for chunk in record["index"].chunks)
+    assert record["index"].chunks[1]["chars"] == len("Ferritin 12 ng/mL low")
+
+    corpus = CorpusIndex()
+    corpus.add_document("a" * 64, "record.pdf", record["index"])
+    chunks = load_chunk_texts(corpus.search_within_budget("ferritin", token_budget=100), store)
+    print(f"Loaded chunk: {chunks[0]}")
+
+    assert [chunk["text"] for chunk in chunks] == ["Ferritin 12 ng/mL low"]
+    assert chunks[0]["filename"] == "record.pdf" and chunks[0]["page"] == 2
+    assert store.get_pages("a" * 64) == ["Demographics", "Ferritin 12 ng/mL low"]
+
+def test_eviction_keeps_recently_used_records():
+    """Only records unused for longer than min_age are evicted to meet the size limit."""
+    store = make_store(min_age=60)
+    store.put("old", ["x" * 1000], ["x" * 1000])
+    store.put("new", ["y" * 1000], ["y" * 1000])
+
+    # Make "old" look unused for an hour, then shrink the limit
+    with store._connect() as conn:
+        conn.execute("UPDATE documents SET accessed = ? WHERE document_id = 'old'", (time.time() - 3600,))
+    store.max_bytes = 2500
+    store.evict()
+
+    assert not store.has("old")
+    assert store.has("new")
+
+    # Recently used records stay even when the store is still over its limit
+    store.max_bytes = 0
+    store.evict()
+    assert store.has("new")
+    assert load_chunk_texts([{"document_id": "old", "chunk_id": 0}], store) == []
+
+if __name__ == "__main__":
+    test_text_is_loaded_lazily()
+    test_eviction_keeps_recently_used_records()
+    print("\nAll record store tests passed.")
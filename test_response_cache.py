@@ -0,0 +1,79 @@
+"""
+Test script for the shared response cache.
+This script checks question classification, near-duplicate matching, expiry and eviction.
+
+Usage:
+    python test_response_cache.py
+"""
+
+import time
+from response_cache import ResponseCache, is_cacheable_question, normalize_query, tokenize_query
+
+def test_question_classification():
+    """Only general medical questions are cacheable."""
+    assert is_cacheable_question("What are the symptoms of migraine?")
+    assert is_cacheable_question("how to treat asthma")
+    assert not is_cacheable_question("What are the symptoms of my migraine?")
+    assert not is_cacheable_question("I have a headache, what is causing it?")
+    assert not is_cacheable_question("What is the latest research on migraine?")
+    assert not is_cacheable_question("Thanks, that helps")
+
+def test_follow_up_questions_are_not_cached():
+    """Questions that depend on the conversation, or name no medical term, are not cacheable."""
+    for question in ["How is it treated?", "What are the side effects?", "What is that?",
+                     "What is the dose for the drug you mentioned?", "What are the symptoms of these conditions?",
+                     "how to treat a sprained ankle"]:
+        assert not is_cacheable_question(question), question
+    assert tokenize_query("What is this diagnosis?") == ["this", "diagnosis"]
+
+def test_near_duplicate_questions_share_answers():
+    """Rephrased questions about the same topic hit the cache; different topics do not."""
+    cache = ResponseCache()
+    cache.put("What are the symptoms of migraine?", "model-a", "Migraine symptoms include...")
+
+    assert normalize_query("what are the symptoms of migraine") == normalize_query("Migraine symptoms?")
+    assert cache.get("what are the symptoms of migraines", "model-a") == "Migraine symptoms include..."
+    assert cache.get("What are migraine symptoms", "model-a") == "Migraine symptoms include..."
+    assert cache.get("What are the causes of migraine?", "model-a") is None
+    assert cache.get("What are the symptoms of migraine?", "model-b") is None
+    print(f"Cache stats: {cache.stats}")
+
+def test_qualified_questions_do_not_share_answers():
+    """A question that adds or drops a qualifier gets its own answer."""
+    cache = ResponseCache()
+    cache.put("What are the symptoms of migraine?", "m", "Migraine symptoms include...")
+    assert cache.get("What are the symptoms of migraine in children?", "m") is None
+
+    cache = ResponseCache()
+    cache.put("What are the symptoms of migraine in children?", "m", "In children, migraine...")
+    assert cache.get("What are the symptoms of migraine?", "m") is None
+
+def test_expiry_and_eviction():
+    """Entries expire after the TTL and the least recently used entry is evicted first."""
+    cache = ResponseCache(ttl=0.05)
+    cache.put("What is asthma?", "m", "Asthma is...")
+    time.sleep(0.1)
+    assert cache.get("What is asthma?", "m") is None
+    assert len(cache) == 0
+
+    cache = ResponseCache(max_entries=2)
+    cache.put("What is asthma?", "m", "Asthma is...")
+    cache.put("What is gout?", "m", "Gout is...")
+    cache.get("What is asthma?", "m")
+    cache.put("What is anemia?", "m", "Anemia is...")
+    assert cache.get("What is gout?", "m") is None
+    assert cache.get("What is asthma?", "m") == "Asthma is..."
+    assert cache.stats["evictions"] == 1
+
+    cache = ResponseCache(max_bytes=20)
+    cache.put("What is asthma?", "m", "x" * 15)
+    cache.put("What is gout?", "m", "y" * 15)
+    assert len(cache) == 1
+
+if __name__ == "__main__":
+    test_question_classification()
+    test_follow_up_questions_are_not_cached()
+    test_near_duplicate_questions_share_answers()
+    test_qualified_questions_do_not_share_answers()
+    test_expiry_and_eviction()
+    print("\nAll response cache tests passed.")
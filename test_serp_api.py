@@ -8,6 +8,8 @@ Usage:
 Requirements:
     - SERP API key in .streamlit/secrets.toml
     - serpapi-python package installed
+
+Without an API key, searches are served by the local backend from data/search_corpus.jsonl.
 """
 
 import os
@@ -15,10 +17,11 @@ import sys
 import json
 import toml
 import serpapi
+from search_backends import LocalSearchBackend
 from serp_service import SerpService
 
 def load_api_key():
-    """Load SERP API key from .streamlit/secrets.toml file."""
+    """Load SERP API key from .streamlit/secrets.toml file, or None if it is not configured."""
     try:
         # Try to load from .streamlit/secrets.toml
         secrets_path = os.path.join('.streamlit', 'secrets.toml')
@@ -33,18 +36,24 @@ def load_api_key():
         if api_key:
             return api_key
         
-        print("Error: SERP API key not found in .streamlit/secrets.toml or environment variables.")
-        print("Please add your SERP API key to .streamlit/secrets.toml or set the SERP_API_KEY environment variable.")
-        sys.exit(1)
+        return None
     
     except Exception as e:
         print(f"Error loading API key: {e}")
         sys.exit(1)
 
+def create_serp_service():
+    """Create a SERP service, using the local search backend if no API key is configured."""
+    api_key = load_api_key()
+    if api_key:
+        return SerpService(api_key=api_key)
+    
+    print("SERP API key not found; using the local search backend.")
+    return SerpService(backend=LocalSearchBackend())
+
 def test_medical_search():
     """Test searching for medical information."""
-    api_key = load_api_key()
-    serp_service = SerpService(api_key=api_key)
+    serp_service = create_serp_service()
     
     # Test queries
     test_queries = [
@@ -83,8 +92,7 @@ def test_medical_search():
 
 def test_medical_news():
     """Test retrieving medical news."""
-    api_key = load_api_key()
-    serp_service = SerpService(api_key=api_key)
+    serp_service = create_serp_service()
     
     # Test topics
     test_topics = [
@@ -120,8 +128,7 @@ def test_medical_news():
 
 def test_source_validation():
     """Test source validation."""
-    api_key = load_api_key()
-    serp_service = SerpService(api_key=api_key)
+    serp_service = create_serp_service()
     
     # Test URLs
     test_urls = [
@@ -1,6 +1,7 @@
 """
 Simple script to test the SERP API key directly using the requests library.
 This will help determine if the issue is with the API key or with the serpapi package.
+The test is skipped when no API key is configured, since it checks the key itself.
 """
 
 import os
@@ -8,9 +9,10 @@ import sys
 import json
 import toml
 import requests
+import pytest
 
 def load_api_key():
-    """Load SERP API key from .streamlit/secrets.toml file."""
+    """Load SERP API key from .streamlit/secrets.toml file, or None if it is not configured."""
     try:
         # Try to load from .streamlit/secrets.toml
         secrets_path = os.path.join('.streamlit', 'secrets.toml')
@@ -25,9 +27,7 @@ def load_api_key():
         if api_key:
             return api_key
         
-        print("Error: SERP API key not found in .streamlit/secrets.toml or environment variables.")
-        print("Please add your SERP API key to .streamlit/secrets.toml or set the SERP_API_KEY environment variable.")
-        sys.exit(1)
+        return None
     
     except Exception as e:
         print(f"Error loading API key: {e}")
@@ -36,6 +36,8 @@ def load_api_key():
 def test_serp_api_direct():
     """Test the SERP API key directly using the requests library."""
     api_key = load_api_key()
+    if not api_key:
+        pytest.skip("SERP API key not found in .streamlit/secrets.toml or environment variables")
     
     print(f"Using API key: {api_key}")
     
@@ -87,4 +89,9 @@ def test_serp_api_direct():
         print(f"Error making request: {e}")
 
 if __name__ == "__main__":
-    test_serp_api_direct()
+    if load_api_key():
+        test_serp_api_direct()
+    else:
+        print("Error: SERP API key not found in .streamlit/secrets.toml or environment variables.")
+        print("Please add your SERP API key to .streamlit/secrets.toml or set the SERP_API_KEY environment variable.")
+        sys.exit(1)
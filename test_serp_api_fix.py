@@ -1,6 +1,9 @@
 """
 Test script to diagnose and fix the SerpAPI issue.
 This script tests different approaches to the site search parameter.
+
+Without an API key, searches are served by the local backend from data/search_corpus.jsonl,
+which supports site: operators but ignores as_sitesearch.
 """
 
 import os
@@ -8,9 +11,10 @@ import sys
 import json
 import toml
 import serpapi
+from search_backends import LocalSearchBackend
 
 def load_api_key():
-    """Load SERP API key from .streamlit/secrets.toml file."""
+    """Load SERP API key from .streamlit/secrets.toml file, or None if it is not configured."""
     try:
         # Try to load from .streamlit/secrets.toml
         secrets_path = os.path.join('.streamlit', 'secrets.toml')
@@ -25,9 +29,7 @@ def load_api_key():
         if api_key:
             return api_key
         
-        print("Error: SERP API key not found in .streamlit/secrets.toml or environment variables.")
-        print("Please add your SERP API key to .streamlit/secrets.toml or set the SERP_API_KEY environment variable.")
-        sys.exit(1)
+        return None
     
     except Exception as e:
         print(f"Error loading API key: {e}")
@@ -53,7 +55,7 @@ def test_original_query():
     print(f"Site search: {params['as_sitesearch']}")
     
     try:
-        results = serpapi.search(params)
+        results = run_search(params)
         print_results(results)
     except Exception as e:
         print(f"Error: {e}")
@@ -80,7 +82,7 @@ def test_site_operator():
     print(f"Query: {params['q']}")
     
     try:
-        results = serpapi.search(params)
+        results = run_search(params)
         print_results(results)
     except Exception as e:
         print(f"Error: {e}")
@@ -106,7 +108,7 @@ def test_individual_sites():
         }
         
         try:
-            results = serpapi.search(params)
+            results = run_search(params)
             print_results(results)
         except Exception as e:
             print(f"Error: {e}")
@@ -128,11 +130,17 @@ def test_without_site_restriction():
     print(f"Query: {params['q']}")
     
     try:
-        results = serpapi.search(params)
+        results = run_search(params)
         print_results(results)
     except Exception as e:
         print(f"Error: {e}")
 
+def run_search(params):
+    """Run a search through SerpAPI, or through the local search backend if no API key is configured."""
+    if params.get("api_key"):
+        return serpapi.search(params)
+    return LocalSearchBackend().search(params)
+
 def print_results(results):
     """Print the search results in a readable format."""
     if "organic_results" in results and results["organic_results"]:
@@ -1,16 +1,19 @@
 """
 Simple test script to verify the fix for the SerpAPI issue.
 This script tests the updated implementation of the SerpService class.
+
+Without an API key, searches are served by the local backend from data/search_corpus.jsonl.
 """
 
 import os
 import sys
 import json
 import toml
+from search_backends import LocalSearchBackend
 from serp_service import SerpService
 
 def load_api_key():
-    """Load SERP API key from .streamlit/secrets.toml file."""
+    """Load SERP API key from .streamlit/secrets.toml file, or None if it is not configured."""
     try:
         # Try to load from .streamlit/secrets.toml
         secrets_path = os.path.join('.streamlit', 'secrets.toml')
@@ -25,18 +28,24 @@ def load_api_key():
         if api_key:
             return api_key
         
-        print("Error: SERP API key not found in .streamlit/secrets.toml or environment variables.")
-        print("Please add your SERP API key to .streamlit/secrets.toml or set the SERP_API_KEY environment variable.")
-        sys.exit(1)
+        return None
     
     except Exception as e:
         print(f"Error loading API key: {e}")
         sys.exit(1)
 
+def create_serp_service():
+    """Create a SERP service, using the local search backend if no API key is configured."""
+    api_key = load_api_key()
+    if api_key:
+        return SerpService(api_key=api_key)
+    
+    print("SERP API key not found; using the local search backend.")
+    return SerpService(backend=LocalSearchBackend())
+
 def test_search_medical_info():
     """Test the search_medical_info method with the updated implementation."""
-    api_key = load_api_key()
-    serp_service = SerpService(api_key=api_key)
+    serp_service = create_serp_service()
     
     print("\n=== Testing search_medical_info Method ===")
     
@@ -69,8 +78,7 @@ def test_search_medical_info():
 
 def test_get_medical_news():
     """Test the get_medical_news method with the updated implementation."""
-    api_key = load_api_key()
-    serp_service = SerpService(api_key=api_key)
+    serp_service = create_serp_service()
     
     print("\n=== Testing get_medical_news Method ===")
     
@@ -0,0 +1,146 @@
+"""
+Test script for the persistent SERP response cache.
+This script checks expiry, size-bounded eviction and hit/miss counters, and that
+SerpService only calls the API on a cache miss and shares one call between concurrent
+identical queries (the API call is replaced by a local fake).
+
+Usage:
+    python test_serp_cache.py
+"""
+
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import search_backends
+from serp_cache import SerpCache, make_cache_key
+from serp_service import SerpService
+from single_flight import SingleFlight
+
+def make_cache(**kwargs):
+    """Create a SERP cache in a temporary directory."""
+    return SerpCache(path=os.path.join(tempfile.mkdtemp(), "serp.sqlite3"), **kwargs)
+
+def test_keys_are_normalized():
+    """Case, punctuation and spacing do not create separate entries."""
+    assert make_cache_key("search", "Diabetes  treatment?", {"num": 5}) == make_cache_key("search", "diabetes treatment", {"num": 5})
+    assert make_cache_key("search", "diabetes", {"num": 5}) != make_cache_key("news", "diabetes", {"num": 5})
+    assert make_cache_key("search", "diabetes", {"num": 5}) != make_cache_key("search", "diabetes", {"num": 3})
+
+def test_entries_expire_per_endpoint():
+    """News expires on its own TTL while search results are still served."""
+    cache = make_cache(ttls={"news": 0.05, "search": 60})
+    cache.put("news", "flu", {}, [{"title": "Flu news"}])
+    cache.put("search", "flu", {}, [{"title": "Flu overview"}])
+    time.sleep(0.1)
+
+    assert cache.get("news", "flu") is None
+    assert cache.get("search", "flu") == [{"title": "Flu overview"}]
+    stats = cache.get_stats()
+    print(f"Cache stats: {stats}")
+    assert (stats["hits"], stats["misses"], stats["expired"], stats["entries"]) == (1, 1, 1, 1)
+
+def test_size_limit_evicts_least_recently_used():
+    """The least recently used entries are dropped when the cache is over its size limit."""
+    cache = make_cache()
+    for topic in ("asthma", "migraine", "gout"):
+        cache.put("search", topic, {}, ["x" * 100])
+        time.sleep(0.01)
+    cache.get("search", "asthma")
+
+    cache.max_bytes = 250
+    cache.evict()
+
+    assert cache.get("search", "migraine") is None
+    assert cache.get("search", "asthma") is not None
+    assert cache.get_stats()["evictions"] == 1
+
+def test_service_calls_api_only_on_miss():
+    """Repeated searches are answered from the cache, even from a new service instance."""
+    calls = []
+
+    def fake_search(params, timeout=None):
+        calls.append(params["q"])
+        return {"organic_results": [{"title": "Gout", "link": "https://www.mayoclinic.org/gout", "snippet": "Gout is..."}]}
+
+    cache = make_cache()
+    original_search = search_backends.serpapi.search
+    search_backends.serpapi.search = fake_search
+    try:
+        first = SerpService(api_key="test-key", rate_limit=6000, cache=cache).search_medical_info("Gout treatment")
+        second = SerpService(api_key="test-key", rate_limit=6000, cache=cache).search_medical_info("gout treatment")
+    finally:
+        search_backends.serpapi.search = original_search
+
+    assert len(calls) == 1
+    assert first == second
+    assert first[0]["is_trusted"]
+
+def test_concurrent_identical_queries_share_one_request():
+    """Sessions asking the same question at once wait for a single API call."""
+    calls = []
+    release = threading.Event()
+
+    def slow_search(params, timeout=None):
+        calls.append(params["q"])
+        release.wait(5)
+        return {"organic_results": [{"title": "Measles", "link": "https://www.cdc.gov/measles", "snippet": "..."}]}
+
+    cache = make_cache()
+    original_search = search_backends.serpapi.search
+    search_backends.serpapi.search = slow_search
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [
+                executor.submit(SerpService(api_key="test-key", rate_limit=6000, cache=cache).search_medical_info,
+                                "measles outbreak")
+                for _ in range(8)
+            ]
+            time.sleep(0.2)
+            release.set()
+            results = [future.result(timeout=5) for future in futures]
+    finally:
+        search_backends.serpapi.search = original_search
+
+    print(f"API calls for 8 concurrent identical queries: {len(calls)}")
+    assert len(calls) == 1
+    assert all(result == results[0] for result in results)
+
+def test_single_flight_shares_errors():
+    """Callers that joined a failing call all receive its exception."""
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("quota exceeded")
+
+    def call():
+        try:
+            flight.do("key", failing)
+        except RuntimeError as e:
+            return str(e)
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        first = executor.submit(call)
+        started.wait(5)
+        others = [executor.submit(call) for _ in range(2)]
+        time.sleep(0.1)
+        release.set()
+        errors = [first.result(timeout=5)] + [future.result(timeout=5) for future in others]
+
+    assert errors == ["quota exceeded"] * 3
+    assert flight.stats == {"calls": 1, "coalesced": 2}
+    assert flight.in_flight() == 0
+
+if __name__ == "__main__":
+    test_keys_are_normalized()
+    test_entries_expire_per_endpoint()
+    test_size_limit_evicts_least_recently_used()
+    test_service_calls_api_only_on_miss()
+    test_concurrent_identical_queries_share_one_request()
+    test_single_flight_shares_errors()
+    print("\nAll SERP cache tests passed.")
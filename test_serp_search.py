@@ -0,0 +1,117 @@
+"""
+Test script for concurrent multi-query SERP searches and the local search backend.
+The SERP API call is replaced by a local fake with per-query delays.
+
+Usage:
+    python test_serp_search.py
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+import search_backends
+from search_backends import LocalSearchBackend
+from serp_cache import SerpCache
+from rate_limiting import TokenBucket
+from serp_service import AsyncSerpService, SerpRateLimitError, SerpService, merge_search_results, normalize_result_url
+
+# Seconds the fake API takes to answer each query
+DELAYS = {"asthma": 0.05, "eczema": 0.05, "psoriasis": 2.0}
+
+def fake_search(params, timeout=None):
+    """Answer after a per-query delay with a shared page and a query-specific page."""
+    assert timeout, "SerpAPI requests must have a timeout"
+    query = params["q"].split()[0]
+    time.sleep(DELAYS[query])
+    return {"organic_results": [
+        {"title": "Skin and lung conditions", "link": "https://www.nih.gov/conditions/", "snippet": "..."},
+        {"title": query.title(), "link": f"https://www.mayoclinic.org/{query}", "snippet": "..."}
+    ]}
+
+def test_merge_dedupes_by_url():
+    """Results with the same normalized URL appear once, interleaved by rank."""
+    assert normalize_result_url("https://WWW.cdc.gov/flu/#symptoms") == normalize_result_url("http://cdc.gov/flu")
+    merged = merge_search_results([
+        [{"link": "https://a.org/1"}, {"link": "https://b.org/shared"}],
+        [{"link": "https://www.b.org/shared/"}, {"link": "https://c.org/3"}]
+    ])
+    assert [result["link"] for result in merged] == ["https://a.org/1", "https://www.b.org/shared/", "https://c.org/3"]
+
+def test_search_many_returns_what_finished_by_deadline():
+    """Slow searches are dropped at the deadline while fast ones are merged concurrently."""
+    cache = SerpCache(path=os.path.join(tempfile.mkdtemp(), "serp.sqlite3"))
+    service = SerpService(api_key="test-key", rate_limit=6000, cache=cache)
+    original_search = search_backends.serpapi.search
+    search_backends.serpapi.search = fake_search
+    try:
+        # Leaving the executor waits for the abandoned search, so it does not outlive the fake
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            async def scenario():
+                start = time.monotonic()
+                results = await AsyncSerpService(service, executor).search_many(["asthma", "eczema", "psoriasis"],
+                                                                                deadline=0.5)
+                return results, time.monotonic() - start
+
+            results, elapsed = asyncio.run(scenario())
+    finally:
+        search_backends.serpapi.search = original_search
+
+    links = [result["link"] for result in results]
+    print(f"Merged {len(results)} results in {elapsed * 1000:.0f} ms: {links}")
+
+    assert elapsed < 1.0
+    assert links.count("https://www.nih.gov/conditions/") == 1
+    assert "https://www.mayoclinic.org/asthma" in links
+    assert "https://www.mayoclinic.org/eczema" in links
+    assert "https://www.mayoclinic.org/psoriasis" not in links
+
+def test_search_many_reports_rate_limit():
+    """When every search is refused by the rate limiter, the caller is told so instead of getting no results."""
+    cache = SerpCache(path=os.path.join(tempfile.mkdtemp(), "serp.sqlite3"))
+    limiter = TokenBucket(rate=1 / 60, capacity=1)
+    service = SerpService(api_key="test-key", cache=cache, limiter=limiter, acquire_timeout=0.05)
+    original_search = search_backends.serpapi.search
+    search_backends.serpapi.search = fake_search
+    try:
+        assert asyncio.run(AsyncSerpService(service).search_many(["asthma"]))
+        try:
+            asyncio.run(AsyncSerpService(service).search_many(["eczema"]))
+            raised = False
+        except SerpRateLimitError:
+            raised = True
+    finally:
+        search_backends.serpapi.search = original_search
+
+    assert raised
+
+def test_local_backend_serves_searches_offline():
+    """The local backend answers from its corpus in the SerpAPI shape, with injected latency."""
+    cache = SerpCache(path=os.path.join(tempfile.mkdtemp(), "serp.sqlite3"))
+    backend = LocalSearchBackend(latency=0.05)
+    service = SerpService(rate_limit=6000, cache=cache, backend=backend)
+
+    raw = backend.search({"q": "asthma inhaler (site:who.int)", "num": 5})
+    assert [result["link"] for result in raw["organic_results"]] == ["https://www.who.int/news-room/fact-sheets/detail/asthma"]
+    assert set(raw["organic_results"][0]) == {"position", "title", "link", "snippet", "source"}
+
+    start = time.monotonic()
+    results = service.search_medical_info("asthma inhaler types", num_results=3)
+    elapsed = time.monotonic() - start
+    print(f"Local search returned {len(results)} results in {elapsed * 1000:.0f} ms")
+
+    assert elapsed >= 0.05
+    assert 0 < len(results) <= 3
+    assert "asthma" in results[0]["title"].lower()
+    assert all(result["is_trusted"] for result in results)
+
+    news = service.get_medical_news("covid-19 vaccine")
+    assert news and news[0]["date"]
+
+if __name__ == "__main__":
+    test_merge_dedupes_by_url()
+    test_search_many_returns_what_finished_by_deadline()
+    test_search_many_reports_rate_limit()
+    test_local_backend_serves_searches_offline()
+    print("\nAll SERP search tests passed.")
@@ -0,0 +1,59 @@
+"""
+Test script for trusted medical source matching.
+This script checks that only whole trusted domains match, that results are tiered
+by domain reputation and that trusted sources can be loaded from a config file.
+
+Usage:
+    python test_source_trust.py
+"""
+
+import json
+import os
+import tempfile
+from source_trust import SourceMatcher
+
+def test_only_whole_domains_match():
+    """Lookalike hosts and URLs that merely mention a trusted domain are rejected."""
+    matcher = SourceMatcher()
+    assert matcher.is_trusted("https://www.nih.gov/health-information")
+    assert matcher.is_trusted("https://NHLBI.NIH.GOV./health/high-blood-pressure")
+    assert matcher.is_trusted("mayoclinic.org/diseases-conditions/diabetes")
+    assert matcher.is_trusted("https://www.cdc.gov:443/flu")
+
+    assert not matcher.is_trusted("https://notnih.gov.evil.com/page")
+    assert not matcher.is_trusted("https://notnih.gov/page")
+    assert not matcher.is_trusted("https://example.com/?ref=nih.gov")
+    assert not matcher.is_trusted("https://cdc.gov@evil.com/flu")
+    assert not matcher.is_trusted("https://harvard.edu/diet")
+    assert not matcher.is_trusted("javascript://cdc.gov/%0aalert(1)")
+    assert not matcher.is_trusted("")
+
+def test_results_are_tiered():
+    """The most specific matching domain decides the tier, and tiers order results."""
+    matcher = SourceMatcher()
+    assert matcher.tier("https://pubmed.ncbi.nlm.nih.gov/12345/") == "authoritative"
+    assert matcher.tier("https://health.harvard.edu/heart-health") == "clinical"
+    assert matcher.tier("https://www.webmd.com/diabetes") == "consumer"
+    assert matcher.is_trusted("https://www.webmd.com/diabetes")
+    assert not matcher.is_trusted("https://www.webmd.com/diabetes", min_tier="clinical")
+
+    results = [{"trust_tier": "consumer"}, {"trust_tier": None}, {"trust_tier": "authoritative"}]
+    ranked = sorted(results, key=lambda result: matcher.rank(result["trust_tier"]))
+    assert [result["trust_tier"] for result in ranked] == ["authoritative", "consumer", None]
+
+def test_sources_load_from_config():
+    """A config file replaces the default trusted sources and can add tiers."""
+    path = os.path.join(tempfile.mkdtemp(), "trusted_sources.json")
+    with open(path, "w") as f:
+        json.dump({"authoritative": ["nhs.uk"], "regional": ["health.gov.au"]}, f)
+
+    matcher = SourceMatcher.from_file(path)
+    assert matcher.tier("https://www.nhs.uk/conditions/asthma/") == "authoritative"
+    assert matcher.tier("https://www.health.gov.au/topics") == "regional"
+    assert not matcher.is_trusted("https://www.cdc.gov/flu")
+
+if __name__ == "__main__":
+    test_only_whole_domains_match()
+    test_results_are_tiered()
+    test_sources_load_from_config()
+    print("\nAll source trust tests passed.")
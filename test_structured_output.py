@@ -0,0 +1,88 @@
+"""
+Test script for structured agent output.
+This script checks that agent output is parsed into the response schema from an
+instance, a dict or a JSON string, that malformed output is rejected, and that
+structured agent calls are charged to the shared token budget.
+
+Usage:
+    python test_structured_output.py
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+from pydantic import ValidationError
+import structured_output
+from structured_output import BMIAssessment, create_structured_agent, parse_structured_output
+
+VALID_BMI = {
+    "bmi_value": 22.9,
+    "bmi_category": "normal weight",
+    "health_assessment": "Your weight is in the healthy range.",
+    "recommendations": "Keep up regular exercise and a balanced diet."
+}
+
+def test_parse_valid_output():
+    """A validated instance is returned as is, and dicts and JSON strings are parsed into one."""
+    assessment = BMIAssessment(**VALID_BMI)
+    assert parse_structured_output(assessment, BMIAssessment) is assessment
+    assert parse_structured_output(VALID_BMI, BMIAssessment) == assessment
+    assert parse_structured_output(json.dumps(VALID_BMI), BMIAssessment) == assessment
+
+def test_parse_malformed_output():
+    """Output that is not valid JSON, or lacks a field, raises a validation error."""
+    for output in ["The BMI is 22.9 (normal weight)", json.dumps(VALID_BMI)[:-10],
+                   {key: value for key, value in VALID_BMI.items() if key != "recommendations"}]:
+        try:
+            parse_structured_output(output, BMIAssessment)
+        except ValidationError:
+            continue
+        raise AssertionError(f"Malformed output was accepted: {output!r}")
+
+def test_bmi_assessment_validation():
+    """A numeric BMI given as a string is converted, and a non-numeric one is rejected."""
+    assert BMIAssessment.model_validate({**VALID_BMI, "bmi_value": "22.9"}).bmi_value == 22.9
+    try:
+        BMIAssessment.model_validate({**VALID_BMI, "bmi_value": "normal"})
+    except ValidationError as e:
+        print(f"Rejected BMI value: {e.errors()[0]['msg']}")
+    else:
+        raise AssertionError("A non-numeric BMI value was accepted")
+
+class RecordingController:
+    """Admission controller stand-in that records the estimate of each call."""
+
+    def __init__(self):
+        self.estimates = []
+
+    async def run(self, session_id, call, estimated_tokens=0):
+        self.estimates.append(estimated_tokens)
+        return await call()
+
+def test_run_debits_estimated_tokens():
+    """Running a structured agent passes a token estimate to the admission controller."""
+    async def fake_run(agent, prompt):
+        return SimpleNamespace(final_output=BMIAssessment(**VALID_BMI))
+
+    controller = RecordingController()
+    originals = (structured_output.get_admission_controller, structured_output.run_async, structured_output.Runner)
+    structured_output.get_admission_controller = lambda: controller
+    structured_output.run_async = asyncio.run
+    structured_output.Runner = SimpleNamespace(run=fake_run)
+    try:
+        agent = create_structured_agent("BMI Calculator", "Calculate the BMI.", BMIAssessment)
+        assessment = structured_output.run_structured_agent(agent, "Height: 180 cm, weight: 74 kg")
+    finally:
+        (structured_output.get_admission_controller, structured_output.run_async,
+         structured_output.Runner) = originals
+
+    print(f"Estimated tokens: {controller.estimates}")
+    assert assessment.bmi_value == 22.9
+    assert len(controller.estimates) == 1 and controller.estimates[0] > 0
+
+if __name__ == "__main__":
+    test_parse_valid_output()
+    test_parse_malformed_output()
+    test_bmi_assessment_validation()
+    test_run_debits_estimated_tokens()
+    print("\nAll structured output tests passed.")
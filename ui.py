@@ -1583,6 +1583,111 @@ def render_feedback_modal():
                 # Redirect to input data view
                 st.rerun()
 
+# Seconds between status checks of documents being processed in the background
+INGESTION_POLL_INTERVAL = 1
+
+def attach_processed_record(result):
+    """
+    Add a processed medical record to the session: the record itself, its lab results
+    and a note in the chat and agent context. The record's text stays in the record
+    store; the session keeps only its metadata and text-free page index.
+    
+    Args:
+        result (dict): Successful ingestion result (see record_store.spill_record)
+    """
+    import time
+    
+    # Store the document in session state
+    if 'medical_records' not in st.session_state:
+        st.session_state.medical_records = []
+    
+    st.session_state.medical_records.append({
+        "metadata": result["metadata"],
+        "index": result["index"],
+        "timestamp": time.time()
+    })
+    
+    # Add the record's lab results to the session's lab table and
+    # pass abnormal findings to the Bayesian engine
+    if result["lab_results"] and 'lab_table' in st.session_state:
+        filename = result['metadata']['filename']
+        st.session_state.lab_table.add_rows(result["lab_results"], filename)
+        if 'bayesian_integration' in st.session_state:
+            st.session_state.bayesian_integration.update_from_lab_results(
+                [{**row, "filename": filename} for row in result["lab_results"]]
+            )
+    
+    # Notify the user
+    st.success(f"Medical record '{result['metadata']['filename']}' processed successfully!")
+    
+    # Add a message to the chat
+    st.session_state.messages.append({
+        "role": "assistant",
+        "content": f"I've processed your medical record '{result['metadata']['filename']}'. You can now ask me questions about it, and I'll reference the relevant information in my answers."
+    })
+    
+    # Add a system message to the agent context
+    if 'agent_messages' in st.session_state:
+        st.session_state.agent_messages.append({
+            "role": "system",
+            "content": f"The user has uploaded a medical record: '{result['metadata']['filename']}'. The document contains {result['metadata']['page_count']} pages. You can reference this document when answering the user's questions."
+        })
+
+def collect_ingestion_jobs():
+    """
+    Attach the results of this session's finished background ingestion jobs.
+    
+    Returns:
+        int: Number of jobs collected
+    """
+    if not st.session_state.get('ingestion_jobs'):
+        return 0
+    
+    from document_jobs import get_ingestion_queue
+    queue = get_ingestion_queue()
+    
+    pending = []
+    collected = 0
+    for job_id in st.session_state.ingestion_jobs:
+        status = queue.status(job_id)
+        if status is None:
+            # The job was dropped (e.g. the server restarted)
+            continue
+        if status["status"] in ("queued", "running"):
+            pending.append(job_id)
+            continue
+        
+        result = queue.pop_result(job_id)
+        collected += 1
+        if result["success"]:
+            attach_processed_record(result)
+        else:
+            # Show error message
+            st.error(f"Error processing PDF: {result['error']}")
+            # Allow the same file to be uploaded again
+            st.session_state.last_uploaded_file = None
+    
+    st.session_state.ingestion_jobs = pending
+    return collected
+
+@st.fragment(run_every=INGESTION_POLL_INTERVAL)
+def render_ingestion_status():
+    """Show the progress of documents being processed and rerun the app when one finishes."""
+    from document_jobs import get_ingestion_queue
+    queue = get_ingestion_queue()
+    
+    for job_id in st.session_state.get('ingestion_jobs', []):
+        status = queue.status(job_id)
+        if status is None or status["status"] in ("done", "failed"):
+            # Rerun the whole app so the finished document is attached and announced
+            st.rerun()
+        
+        if status["page_count"]:
+            st.progress(status["pages_done"] / status["page_count"],
+                        text=f"Processing '{status['filename']}' in the background... page {status['pages_done']} of {status['page_count']}")
+        else:
+            st.progress(0.0, text=f"Processing '{status['filename']}' in the background... you can keep chatting meanwhile.")
+
 # Function to render the chat interface
 def render_chat_interface(model_option, call_openai_api):
     # Store the model option in session state for feedback
@@ -1625,49 +1730,25 @@ def render_chat_interface(model_option, call_openai_api):
                 help="Upload your medical records in PDF format to allow the virtual doctor to reference them."
             )
         
-        # Process uploaded file
+        # Hand new uploads to the background ingestion queue so the chat stays usable
         if uploaded_file is not None:
-            # Check if this is a new file upload
-            if 'last_uploaded_file' not in st.session_state or st.session_state.last_uploaded_file != uploaded_file.name:
-                st.session_state.last_uploaded_file = uploaded_file.name
-                
-                # Import the document processor
-                from document_processor import process_pdf
-                import time
-                
-                # Process the PDF file
-                with st.spinner("Processing your medical records..."):
-                    result = process_pdf(uploaded_file)
+            from document_jobs import get_ingestion_queue
+            from document_cache import hash_upload
+            
+            # Check if this is a new file upload (by content, not filename)
+            file_digest = hash_upload(uploaded_file)
+            known_digests = {record["metadata"].get("sha256") for record in st.session_state.get('medical_records', [])}
+            if st.session_state.get('last_uploaded_file') != file_digest and file_digest not in known_digests:
+                st.session_state.last_uploaded_file = file_digest
                 
-                if result["success"]:
-                    # Store the document in session state
-                    if 'medical_records' not in st.session_state:
-                        st.session_state.medical_records = []
-                    
-                    st.session_state.medical_records.append({
-                        "metadata": result["metadata"],
-                        "text": result["text"],
-                        "timestamp": time.time()
-                    })
-                    
-                    # Notify the user
-                    st.success(f"Medical record '{result['metadata']['filename']}' processed successfully!")
-                    
-                    # Add a message to the chat
-                    st.session_state.messages.append({
-                        "role": "assistant",
-                        "content": f"I've processed your medical record '{result['metadata']['filename']}'. You can now ask me questions about it, and I'll reference the relevant information in my answers."
-                    })
-                    
-                    # Add a system message to the agent context
-                    if 'agent_messages' in st.session_state:
-                        st.session_state.agent_messages.append({
-                            "role": "system",
-                            "content": f"The user has uploaded a medical record: '{result['metadata']['filename']}'. The document contains {result['metadata']['page_count']} pages. You can reference this document when answering the user's questions."
-                        })
-                else:
-                    # Show error message
-                    st.error(f"Error processing PDF: {result['error']}")
+                if 'ingestion_jobs' not in st.session_state:
+                    st.session_state.ingestion_jobs = []
+                st.session_state.ingestion_jobs.append(get_ingestion_queue().submit(uploaded_file))
+        
+        # Attach documents whose processing has finished, then show progress of the rest
+        collect_ingestion_jobs()
+        if st.session_state.get('ingestion_jobs'):
+            render_ingestion_status()
         
         if end_session:
             st.session_state.show_feedback = True